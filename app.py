@@ -1,14 +1,18 @@
+import os
+
 from dash import Dash, Input, Output, html, dcc
 import dash_bootstrap_components as dbc
 
 from components.header import create_header
-from components.temperature.layout import create_temperature_layout
-from components.sea_levels.layout import create_sea_levels_layout
-from components.correlation.layout import create_correlation_layout
-from components.deforestation.layout import create_deforestation_layout
-from components.greenhouse_gas import get_layout as create_ghg_layout
-from components.air_quality import get_layout as create_air_quality_layout
-
+from components.pages import PageRegistry
+from components import compression, figures, images, metrics, payload
+
+# Callback modules are imported eagerly: Dash only picks up callbacks that are
+# registered before the first request.  They must not build any figures.
+import components.greenhouse_gas  # noqa: F401
+import components.air_quality  # noqa: F401
+import components.sea_levels  # noqa: F401
+from components.temperature import geo
 from components.temperature.callbacks import register_temperature_callbacks
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
@@ -21,100 +25,38 @@ app.layout = html.Div([
 
 homepage_layout = create_header()
 
+# Page layouts are imported and built on their first hit (lower priority warms up first)
+pages = PageRegistry(default=homepage_layout)
+pages.register('/ghg', 'components.greenhouse_gas', 'get_layout', priority=10)
+pages.register('/temperature', 'components.temperature.layout', 'create_temperature_layout', priority=20)
+pages.register('/air-quality', 'components.air_quality', 'get_layout', priority=30)
+pages.register('/sea', 'components.sea_levels', 'get_layout', priority=40)
+pages.register('/deforestation', 'components.deforestation.layout', 'create_deforestation_layout', priority=50)
+pages.register('/correlation', 'components.correlation.layout', 'create_correlation_layout', priority=60)
+
 @app.callback(
     Output('page-content', 'children'),
     Input('url', 'pathname')
 )
 def display_page(pathname):
-    if pathname == '/temperature':
-        return create_temperature_layout()
-    elif pathname == '/ghg':
-        return create_ghg_layout()
-    elif pathname == '/sea':
-        return create_sea_levels_layout()
-    elif pathname == '/correlation':
-        return create_correlation_layout()
-    elif pathname == '/deforestation':
-        return create_deforestation_layout()
-    elif pathname == '/air-quality':
-        return create_air_quality_layout()
-    else:
-        return homepage_layout
+    return pages.render(pathname)
 
 register_temperature_callbacks(app)
+images.init_app(app)
+figures.init_app(app)
+geo.init_app(app)
+# after_request hooks run in reverse order: compression is registered first so
+# that the payload accounting and metrics see uncompressed responses
+compression.init_app(app)
+payload.init_app(app)
+metrics.init_app(app, pathnames=pages.pathnames)
+
+@server.before_request
+def _release_page_warm_up():
+    pages.notify_serving()
+
+if os.environ.get('PAGE_WARM_UP', '1') != '0':
+    pages.start_warm_up(delay=float(os.environ.get('PAGE_WARM_UP_DELAY', '5')))
 
 if __name__ == '__main__':
     app.run(debug=True)
-
-
-
-
-
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-
-import pandas as pd
-import seaborn as sns
-
-data = pd.read_csv('avg_dataset.csv')
-sns.pairplot(data)
-
-
-
-import pandas as pd
-import plotly.express as px
-
-# Load data from CSV file
-data_emissions = pd.read_csv('dataset/avg_dataset.csv')
-
-# Create a stacked bar chart with Plotly
-fig_emissions = px.bar(data_emissions, x='Year', y=['Average_Emissions (MtCO₂e)', 'Average_Land_Temperature (celsius)', 'Average_LandOcean_Temperature (celsius)'],
-                      title='Greenhouse Gas Emissions vs Temperature')
-
-# Customize the layout
-fig_emissions.update_layout(
-    font_family='Arial',
-    title_font_size=24,
-    title_font_color='#404040',
-    xaxis=dict(
-        title='Year',
-        title_font_size=18,
-        tickfont_size=14,
-        showgrid=True,
-        gridcolor='lightgray',
-        gridwidth=0.1
-    ),
-    yaxis=dict(
-        title='Value',
-        title_font_size=18,
-        tickfont_size=14,
-        showgrid=True,
-        gridcolor='lightgray',
-        gridwidth=0.1
-    ),
-    legend=dict(
-        title='Variable',
-        title_font_size=18,
-        font_size=10,
-        bgcolor='rgba(0,0,0,0)',
-        yanchor='top',
-        y=0.001,
-        xanchor='right',
-        x=1
-    ),
-    barmode='stack',
-    plot_bgcolor='white',
-    hoverlabel=dict(
-        font_size=16,
-        font_family='Arial',
-        bgcolor='white',
-        bordercolor='black'
-    )
-)
-
-# Show the chart
-fig_emissions.show()
-
-
-
@@ -0,0 +1,55 @@
+// Country switching for the state choropleths on the temperature page.
+//
+// The six state maps are static figures.  Each one is fetched from its
+// versioned /_figures/ URL the first time its country is picked and kept for
+// the life of the page, so switching back and forth never calls the server.
+// The URLs are immutable, so the HTTP cache also serves later page loads.
+// Those figures show each country's latest year, so stateYears moves the
+// year slider back to it; other years are patched in by the server.
+(function () {
+    const stateMaps = new Map();
+
+    function fetchFigure(url) {
+        return fetch(url, {credentials: 'same-origin'}).then(function (response) {
+            if (!response.ok) {
+                throw new Error('Could not load ' + url + ': ' + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        temperature: {
+            stateMap: function (value, urls) {
+                if (!value || !urls || !urls[value]) {
+                    return window.dash_clientside.no_update;
+                }
+                if (!stateMaps.has(value)) {
+                    const figure = fetchFigure(urls[value]).catch(function (err) {
+                        // Let the next selection retry instead of caching the failure
+                        stateMaps.delete(value);
+                        throw err;
+                    });
+                    stateMaps.set(value, figure);
+                }
+                return stateMaps.get(value);
+            },
+
+            stateYears: function (value, ranges, current) {
+                const noUpdate = window.dash_clientside.no_update;
+                if (!value || !ranges || !ranges[value]) {
+                    return [noUpdate, noUpdate, noUpdate, noUpdate];
+                }
+                const first = ranges[value][0];
+                const last = ranges[value][1];
+                // Same step as YEAR_MARK_STEP in components/temperature/layout.py
+                const marks = {};
+                for (let year = Math.ceil(first / 50) * 50; year <= last; year += 50) {
+                    marks[year] = String(year);
+                }
+                // Leave an unchanged value alone so no year patch is requested
+                return [first, last, current === last ? noUpdate : last, marks];
+            }
+        }
+    });
+})();
@@ -0,0 +1,274 @@
+"""Latency benchmark for every server-side Dash callback registered on ``app``.
+
+Callbacks are discovered from ``/_dash-dependencies`` and driven through the
+real ``/_dash-update-component`` endpoint, so the numbers include argument
+parsing and JSON serialisation exactly as a browser would see them.  Each
+callback is called with a representative input matrix (every gas, every
+country, every metric, ...), see :func:`input_matrix`.  The matrix may also
+give ``State`` values, and values for several inputs that only make sense
+together (e.g. a country and a year in its range).
+
+Usage (from the repository root)::
+
+    python -m benchmarks.callbacks --output benchmarks/baseline.json
+    python -m benchmarks.callbacks --compare benchmarks/baseline.json
+
+The report holds p50/p95/p99 wall time, the peak memory allocated while
+the callback runs and the serialised response size per callback.  Memory is
+traced with ``tracemalloc`` in a separate pass over the same cases, so the
+tracing does not slow down the timed calls.  ``--compare`` exits with status 1 when any
+callback got slower or heavier than the baseline by more than ``--threshold``.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+os.environ.setdefault('PAGE_WARM_UP', '0')
+# Run background callbacks inline: otherwise only queueing the job is timed
+# and a failing job still answers 200
+os.environ.setdefault('BACKGROUND_CALLBACKS', '0')
+
+logger = logging.getLogger(__name__)
+
+# Regressions smaller than these absolute amounts are treated as noise
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_BYTES_DELTA = 1024
+
+
+# ---------------------------------------------------------------------------
+# Input matrix
+# ---------------------------------------------------------------------------
+
+def _safe(values_fn, fallback):
+    try:
+        values = list(values_fn())
+        return values or fallback
+    except Exception as e:
+        # Missing datasets should not stop the rest of the suite from running
+        logger.warning(f"Could not build input values: {e}")
+        return fallback
+
+
+def input_matrix(app_module):
+    """Representative values for every ``(component id, property)`` input.
+
+    A key may also be a tuple of such pairs, mapped to tuples of values that
+    are only sent together.
+    """
+    from components.greenhouse_gas.data import available_gases, get_all_countries, load_clean_data
+    from components.air_quality.data import get_countries, get_metrics, load_air_quality_data
+
+    def ghg_years():
+        years = load_clean_data()['year']
+        return range(int(years.min()), int(years.max()) + 1, 5)
+
+    def aq_cities():
+        return sorted(load_air_quality_data()['city'].unique())
+
+    def state_map_years():
+        from components.temperature.layout import state_year_ranges
+        ranges = state_year_ranges()
+        return [(key, int(year), ranges) for key, (first, last) in ranges.items()
+                for year in np.linspace(first, last, 5).round()]
+
+    return {
+        ('url', 'pathname'): ['/'] + app_module.pages.pathnames,
+        ('ghg-gas-dropdown', 'value'): _safe(available_gases, [None]),
+        ('ghg-country-dropdown', 'value'): [[c] for c in _safe(get_all_countries, [])] or [None],
+        ('ghg-year-slider-pie', 'value'): _safe(ghg_years, [None]),
+        ('aq-country-dropdown', 'value'): _safe(get_countries, [None]),
+        ('aq-city-dropdown', 'value'): _safe(aq_cities, [None]),
+        ('aq-metric-dropdown', 'value'): _safe(get_metrics, [None]),
+        ('Sea-Levels', 'children'): [None],
+        (('choro-dropdown', 'value'), ('choro-year-slider', 'value'), ('choro-year-ranges', 'data')):
+            _safe(state_map_years, [(None, None, None)]),
+        # World, continent, across the antimeridian, and city zoom
+        ('city-heatmap', 'relayoutData'): [
+            {'map.center': {'lon': 0, 'lat': 20}, 'map.zoom': 1},
+            {'map.center': {'lon': 15, 'lat': 50}, 'map.zoom': 3},
+            {'map.center': {'lon': 180, 'lat': -20}, 'map.zoom': 3},
+            {'map.center': {'lon': -74.0, 'lat': 40.7}, 'map.zoom': 6},
+        ],
+    }
+
+
+def _cases(dep, matrix, max_cases):
+    """Cartesian product of the input and state values, evenly thinned to ``max_cases``.
+
+    Each case lists the inputs' values followed by the states'.
+    """
+    keys = [(d['id'], d['property']) for d in dep['inputs'] + dep['state']]
+    groups, covered = [], set()
+    for joint, rows in matrix.items():
+        if isinstance(joint[0], tuple) and set(joint) <= set(keys):
+            groups.append((joint, rows))
+            covered.update(joint)
+    for i, key in enumerate(keys):
+        if key in covered:
+            continue
+        if key not in matrix and i < len(dep['inputs']):
+            logger.warning(f"No representative values for input {key}; using None")
+        groups.append(((key,), [(v,) for v in matrix.get(key, [None])]))
+
+    cases = []
+    for combo in itertools.product(*(rows for _, rows in groups)):
+        values = {}
+        for (joint, _), row in zip(groups, combo):
+            values.update(zip(joint, row))
+        cases.append([values[key] for key in keys])
+    if max_cases and len(cases) > max_cases:
+        step = len(cases) / max_cases
+        cases = [cases[int(i * step)] for i in range(max_cases)]
+    return cases
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+def _split_outputs(output):
+    if output.startswith('..'):
+        parts = output[2:-2].split('...')
+    else:
+        parts = [output]
+    return [dict(zip(('id', 'property'), part.rsplit('.', 1))) for part in parts]
+
+
+def _payload(dep, args):
+    outputs = _split_outputs(dep['output'])
+    inputs = [dict(i, value=v) for i, v in zip(dep['inputs'], args)]
+    return {
+        'output': dep['output'],
+        'outputs': outputs if dep['output'].startswith('..') else outputs[0],
+        'inputs': inputs,
+        'changedPropIds': [f"{i['id']}.{i['property']}" for i in inputs],
+        'state': [dict(s, value=v) for s, v in zip(dep['state'], args[len(inputs):])],
+    }
+
+
+def _peak_alloc_kb(client, bodies):
+    """Largest memory allocated above the starting point by any single call."""
+    peak = 0
+    tracemalloc.start()
+    try:
+        for body in bodies:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            client.post('/_dash-update-component', json=body)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+def run(repeat=3, max_cases=200, only=None):
+    import app as app_module
+
+    client = app_module.server.test_client()
+    dependencies = client.get('/_dash-dependencies').get_json()
+    matrix = input_matrix(app_module)
+
+    results = {}
+    for dep in dependencies:
+        if dep.get('clientside_function') or (only and only not in dep['output']):
+            continue
+        timings, sizes, errors = [], [], 0
+        bodies = [_payload(dep, args) for args in _cases(dep, matrix, max_cases)]
+        for body in bodies:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = client.post('/_dash-update-component', json=body)
+                elapsed = (time.perf_counter() - start) * 1000.0
+                if response.status_code not in (200, 204):
+                    errors += 1
+                    continue
+                timings.append(elapsed)
+                sizes.append(len(response.get_data()))
+
+        stats = {'calls': len(timings) + errors, 'errors': errors,
+                 'peak_alloc_kb': _peak_alloc_kb(client, bodies)}
+        if timings:
+            p50, p95, p99 = (float(p) for p in np.percentile(timings, [50, 95, 99]))
+            stats.update(p50_ms=round(p50, 3), p95_ms=round(p95, 3), p99_ms=round(p99, 3),
+                         max_ms=round(max(timings), 3),
+                         mean_bytes=int(np.mean(sizes)), max_bytes=int(max(sizes)))
+        results[dep['output']] = stats
+        logger.info(f"{dep['output']}: {stats}")
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'max_cases': max_cases,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'callbacks': results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+def compare(baseline, current, threshold=0.2):
+    """Return a list of human readable regressions of ``current`` vs ``baseline``."""
+    regressions = []
+    for callback_id, stats in current['callbacks'].items():
+        base = baseline['callbacks'].get(callback_id)
+        if not base:
+            continue
+        for metric, min_delta in (('p50_ms', MIN_LATENCY_DELTA_MS), ('p95_ms', MIN_LATENCY_DELTA_MS),
+                                  ('p99_ms', MIN_LATENCY_DELTA_MS), ('max_bytes', MIN_BYTES_DELTA)):
+            old, new = base.get(metric), stats.get(metric)
+            if old is None or new is None:
+                continue
+            if new - old > min_delta and new > old * (1 + threshold):
+                regressions.append(f"{callback_id} {metric}: {old} -> {new} (+{(new / old - 1) * 100 if old else float('inf'):.0f}%)")
+        if stats.get('errors', 0) > base.get('errors', 0):
+            regressions.append(f"{callback_id} errors: {base.get('errors', 0)} -> {stats['errors']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against a saved report')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative regression threshold (default 0.2)')
+    parser.add_argument('--repeat', type=int, default=3, help='calls per input combination')
+    parser.add_argument('--max-cases', type=int, default=200, help='input combinations per callback (0 = all)')
+    parser.add_argument('--only', help='only run callbacks whose output id contains this string')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    report = run(repeat=args.repeat, max_cases=args.max_cases, only=args.only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Wrote {args.output}")
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print('No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
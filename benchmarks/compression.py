@@ -0,0 +1,115 @@
+"""CPU cost against bytes saved for each compression encoding and level.
+
+The payloads are the real responses of ``app.server`` with compression
+switched off: the Dash layout and dependencies, and the ``display_page``
+response of every page (which embeds all of its static figures).
+
+Usage (from the repository root)::
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --output benchmarks/compression.json
+
+Pick ``COMPRESS_GZIP_LEVEL`` / ``COMPRESS_BROTLI_QUALITY`` from the knee of
+the ``ms/MB`` vs ``saved`` columns; the defaults (gzip 6, brotli 4) keep
+callback latency low while saving most of the bytes.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault('PAGE_WARM_UP', '0')
+os.environ['COMPRESS'] = '0'
+
+logger = logging.getLogger(__name__)
+
+LEVELS = {
+    'gzip': [1, 3, 6, 9],
+    'br': [1, 4, 6, 9, 11],
+}
+
+
+def collect_payloads():
+    """``{name: bytes}`` of uncompressed responses from every page."""
+    import app as app_module
+
+    client = app_module.server.test_client()
+    payloads = {
+        '_dash-layout': client.get('/_dash-layout').get_data(),
+        '_dash-dependencies': client.get('/_dash-dependencies').get_data(),
+    }
+    for pathname in ['/'] + app_module.pages.pathnames:
+        body = {
+            'output': 'page-content.children',
+            'outputs': {'id': 'page-content', 'property': 'children'},
+            'inputs': [{'id': 'url', 'property': 'pathname', 'value': pathname}],
+            'changedPropIds': ['url.pathname'],
+        }
+        response = client.post('/_dash-update-component', json=body)
+        if response.status_code != 200:
+            logger.warning(f"Skipping {pathname}: status {response.status_code}")
+            continue
+        payloads[f'page {pathname}'] = response.get_data()
+    return payloads
+
+
+def run(repeat=5):
+    from components.compression import encoders
+
+    payloads = collect_payloads()
+    total = sum(len(p) for p in payloads.values())
+    results = []
+    for encoding, compress in encoders().items():
+        for level in LEVELS[encoding]:
+            seconds, compressed = 0.0, 0
+            for data in payloads.values():
+                timings = []
+                for _ in range(repeat):
+                    start = time.process_time()
+                    out = compress(data, level)
+                    timings.append(time.process_time() - start)
+                seconds += min(timings)
+                compressed += len(out)
+            results.append({
+                'encoding': encoding,
+                'level': level,
+                'bytes': compressed,
+                'saved': round(1 - compressed / total, 4),
+                'cpu_ms': round(seconds * 1000.0, 2),
+                'cpu_ms_per_mb': round(seconds * 1000.0 / (total / 1e6), 2),
+            })
+    return {
+        'payloads': {name: len(data) for name, data in payloads.items()},
+        'total_bytes': total,
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per payload (best is kept)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run(repeat=args.repeat)
+
+    for name, size in report['payloads'].items():
+        print(f"{name:35s} {size:>12,d} bytes")
+    print(f"{'total':35s} {report['total_bytes']:>12,d} bytes\n")
+    print(f"{'encoding':8s} {'level':>5s} {'bytes':>12s} {'saved':>7s} {'cpu ms':>9s} {'ms/MB':>8s}")
+    for r in report['results']:
+        print(f"{r['encoding']:8s} {r['level']:>5d} {r['bytes']:>12,d} {r['saved']:>7.1%} "
+              f"{r['cpu_ms']:>9.2f} {r['cpu_ms_per_mb']:>8.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Latency of the GHG queries as the merged table grows.
+
+Builds synthetic merged GHG tables with every gas for ``--countries``
+countries per source, for each number of sources and decades of yearly
+data in the grid.  Each table is queried the way the callbacks used to
+(boolean masks over the whole frame, then a ``groupby``) and through
+:class:`components.greenhouse_gas.query.GHGTable`:
+
+``rows``
+    every row of one gas;
+``series``
+    the yearly series of five countries under one gas;
+``section``
+    the countries of one gas in one year.
+
+Index latency should stay flat as sources and decades are added, while
+the masks grow linearly with the table.  ``rows`` stays flat too because the
+index returns views of its columns where the masks copy every matching row.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.ghg_query
+    python -m benchmarks.ghg_query --sources 1 4 16 --decades 3 12 --output benchmarks/ghg_query.json
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from components.greenhouse_gas.query import GHGTable
+
+logger = logging.getLogger(__name__)
+
+GASES = ['CH4', 'CO2', 'HFC', 'N2O', 'PFC', 'SF6', 'Total GHG']
+LAST_YEAR = 2020
+
+
+def synthetic_frame(sources, decades, countries=200, seed=0):
+    """A frame shaped like ``load_clean_data()``: one row per (country, year, gas)."""
+    rng = np.random.default_rng(seed)
+    names = [f'Country {i} ({s})' for s in range(sources) for i in range(countries)]
+    years = np.arange(LAST_YEAR - 10 * decades + 1, LAST_YEAR + 1)
+    gas, country, year = (a.ravel() for a in np.meshgrid(np.arange(len(GASES)), np.arange(len(names)), years,
+                                                         indexing='ij'))
+    # Shuffled, like the concatenation of several sources
+    order = rng.permutation(len(gas))
+    return pd.DataFrame({
+        'country': pd.Categorical.from_codes(country[order], categories=names),
+        'year': year[order].astype(np.int16),
+        'gas': pd.Categorical.from_codes(gas[order], categories=GASES),
+        'value': rng.gamma(2.0, 1000.0, len(order)).astype(np.float32),
+    })
+
+
+def _mask_queries(df, gas, countries, year):
+    return {
+        'rows': lambda: df[df['gas'] == gas],
+        'series': lambda: [df[(df['country'] == c) & (df['gas'] == gas)].groupby('year')['value'].sum()
+                           for c in countries],
+        'section': lambda: df[(df['gas'] == gas) & (df['year'] == year)],
+    }
+
+
+def _index_queries(table, gas, countries, year):
+    return {
+        'rows': lambda: table.gas_rows(gas),
+        'series': lambda: [table.series(gas, c) for c in countries],
+        'section': lambda: table.cross_section(gas, year),
+    }
+
+
+def _time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000.0
+
+
+def run(sources, decades, countries=200, repeat=20):
+    results = []
+    for n_sources in sources:
+        for n_decades in decades:
+            df = synthetic_frame(n_sources, n_decades, countries)
+            start = time.perf_counter()
+            table = GHGTable(df)
+            build_ms = (time.perf_counter() - start) * 1000.0
+            names = list(df['country'].cat.categories)
+            picked = [names[i] for i in np.linspace(0, len(names) - 1, 5).astype(int)]
+            args = ('CO2', picked, LAST_YEAR - 5)
+            masks, index = _mask_queries(df, *args), _index_queries(table, *args)
+            for query in masks:
+                results.append({
+                    'sources': n_sources,
+                    'decades': n_decades,
+                    'rows': len(df),
+                    'query': query,
+                    'mask_ms': round(_time(masks[query], repeat), 3),
+                    'index_ms': round(_time(index[query], repeat), 3),
+                    'build_ms': round(build_ms, 1),
+                })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sources', type=int, nargs='*', default=[1, 4, 16])
+    parser.add_argument('--decades', type=int, nargs='*', default=[3, 12])
+    parser.add_argument('--countries', type=int, default=200, help='countries per source')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per query (median is kept)')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run(args.sources, args.decades, args.countries, args.repeat)
+
+    print(f"{'sources':>7s} {'decades':>7s} {'rows':>11s} {'query':8s} {'mask ms':>9s} {'index ms':>9s} "
+          f"{'speedup':>8s} {'build ms':>9s}")
+    for r in results:
+        print(f"{r['sources']:>7d} {r['decades']:>7d} {r['rows']:>11,d} {r['query']:8s} {r['mask_ms']:>9.3f} "
+              f"{r['index_ms']:>9.3f} {r['mask_ms'] / max(r['index_ms'], 1e-6):>7.0f}x {r['build_ms']:>9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Unique memory per forked worker, with and without shared preloading.
+
+Mimics a pre-fork server: a master process forks ``--workers`` children and
+each child serves every page and the data-heavy callbacks through the test
+client, then reports its USS (memory no other process shares), PSS and RSS.
+
+``isolated``
+    The master forks before importing anything; each worker loads its own
+    data, like gunicorn without ``preload_app``.
+``shared``
+    The master imports ``app`` and runs :func:`components.shared.preload`
+    before forking, like ``gunicorn.conf.py``.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.memory --workers 4
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import psutil
+
+os.environ.setdefault('PAGE_WARM_UP', '0')
+
+logger = logging.getLogger(__name__)
+
+
+def _serve_everything():
+    import app as app_module
+
+    client = app_module.server.test_client()
+    for pathname in ['/'] + app_module.pages.pathnames:
+        client.post('/_dash-update-component', json={
+            'output': 'page-content.children',
+            'outputs': {'id': 'page-content', 'property': 'children'},
+            'inputs': [{'id': 'url', 'property': 'pathname', 'value': pathname}],
+            'changedPropIds': ['url.pathname'],
+        })
+    # Touch the cached frames the way the callbacks do
+    from components import shared
+    for loader in shared.cached_loaders():
+        try:
+            frame = loader()
+            frame.select_dtypes('number').sum()
+        except Exception as e:
+            logger.warning(f"{loader.__name__}: {e}")
+
+
+def _worker(queue):
+    _serve_everything()
+    info = psutil.Process().memory_full_info()
+    queue.put({'uss': info.uss, 'pss': getattr(info, 'pss', 0), 'rss': info.rss})
+
+
+def measure(mode, workers):
+    """Fork ``workers`` children in ``mode`` and return their memory figures."""
+    if mode == 'shared':
+        import app as app_module
+        from components import shared
+        shared.preload(app_module.pages)
+
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(queue,)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    # Collect before joining: every child must still be alive while the
+    # others measure, otherwise pages they shared would count as unique
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    master = psutil.Process().memory_full_info()
+    return {'mode': mode, 'master_uss': master.uss, 'workers': results}
+
+
+def _run_mode(mode, workers):
+    # Each mode gets a fresh interpreter so the master starts out clean
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.memory', '--mode', mode,
+                          '--workers', str(workers), '--json'],
+                         check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _mb(value):
+    return value / (1024 * 1024)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--mode', choices=['isolated', 'shared'], help='measure a single mode')
+    parser.add_argument('--json', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.mode:
+        result = measure(args.mode, args.workers)
+        print(json.dumps(result) if args.json else json.dumps(result, indent=2))
+        return 0
+
+    print(f"{'mode':10s} {'master USS':>11s} {'worker USS':>11s} {'worker PSS':>11s} {'worker RSS':>11s} {'total USS':>10s}")
+    for mode in ('isolated', 'shared'):
+        result = _run_mode(mode, args.workers)
+        workers = result['workers']
+        mean = {k: sum(w[k] for w in workers) / len(workers) for k in ('uss', 'pss', 'rss')}
+        total = result['master_uss'] + sum(w['uss'] for w in workers)
+        print(f"{mode:10s} {_mb(result['master_uss']):>9.1f}MB {_mb(mean['uss']):>9.1f}MB "
+              f"{_mb(mean['pss']):>9.1f}MB {_mb(mean['rss']):>9.1f}MB {_mb(total):>8.1f}MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,8 @@
 """Air Quality component package"""
-from .layout import create_layout as get_layout
-from . import callbacks  # noqa: F401 
\ No newline at end of file
+from . import callbacks  # noqa: F401
+
+
+def get_layout():
+    # Importing the layout pulls in plotly express; defer it to the first hit
+    from .layout import create_layout
+    return create_layout()
@@ -1,8 +1,10 @@
-from dash import callback, Input, Output
+from dash import callback, Input, Output, Patch, State
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 from .data import load_air_quality_data, get_cities
+from components.cache import memoize
+from components.figures import typed_array
 
 @callback(
     Output('aq-city-dropdown', 'options'),
@@ -17,40 +19,99 @@ def set_cities_options(selected_country):
     value = cities[0] if cities else None
     return options, value
 
-@callback(
-    Output('aq-timeseries-plot', 'figure'),
-    Output('aq-boxplot', 'figure'),
-    Input('aq-city-dropdown', 'value'),
-    Input('aq-metric-dropdown', 'value')
-)
-def update_air_quality_graphs(city, metric):
-    if not city or not metric:
-        empty_fig = go.Figure(layout={'paper_bgcolor': '#4482C1', 'plot_bgcolor': '#4482C1'})
-        return empty_fig, empty_fig
+def _metric_label(metric):
+    return f"{metric.replace('_', ' ').title()} (µg/m³)" if 'pm' in metric or 'co' in metric else metric.replace('_', ' ').title()
 
+
+def _city_data(city):
     df = load_air_quality_data()
-    city_df = df[df['city'] == city].sort_values(by='date')
-    metric_label = f"{metric.replace('_', ' ').title()} (µg/m³)" if 'pm' in metric or 'co' in metric else metric.replace('_', ' ').title()
+    return df[df['city'] == city].sort_values(by='date')
 
-    # Enhanced Time Series
-    city_df['smoothed'] = city_df[metric].rolling(window=30, center=True, min_periods=1).mean()
-    city_df['std'] = city_df[metric].rolling(window=30, center=True, min_periods=1).std()
-    
-    ts_fig = go.Figure()
-    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=city_df['smoothed'] + city_df['std'], mode='lines', line=dict(width=0), showlegend=False))
-    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=city_df['smoothed'] - city_df['std'], mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0,114,178,0.2)', name='±1 Std Dev'))
-    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=city_df['smoothed'], mode='lines', line=dict(color='#0072B2', width=3), name='30-Day Rolling Mean'))
-    
+
+def _violin_hovertemplate(metric):
+    # Set on the full figure too, so a Patch never relies on plotly express's own format
+    return f'{metric}=%{{y}}<extra></extra>'
+
+
+def _metric_series(city_df, metric):
+    """Rolling mean and std of a metric plus its (min, max) rows."""
+    rolling = city_df[metric].rolling(window=30, center=True, min_periods=1)
+    smoothed, std = rolling.mean(), rolling.std()
     min_point = city_df.loc[city_df[metric].idxmin()]
     max_point = city_df.loc[city_df[metric].idxmax()]
+    return smoothed, std, (min_point, max_point)
+
+
+@memoize()
+def build_air_quality_graphs(city, metric):
+    city_df = _city_data(city)
+    metric_label = _metric_label(metric)
+    smoothed, std, (min_point, max_point) = _metric_series(city_df, metric)
+
+    # Enhanced Time Series
+    ts_fig = go.Figure()
+    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=smoothed + std, mode='lines', line=dict(width=0), showlegend=False))
+    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=smoothed - std, mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0,114,178,0.2)', name='±1 Std Dev'))
+    ts_fig.add_trace(go.Scatter(x=city_df['date'], y=smoothed, mode='lines', line=dict(color='#0072B2', width=3), name='30-Day Rolling Mean'))
     ts_fig.add_trace(go.Scatter(x=[min_point['date'], max_point['date']], y=[min_point[metric], max_point[metric]], mode='markers+text', marker=dict(size=8, color='red'), text=['Min', 'Max'], textposition='top center', showlegend=False))
-    
+
     ts_fig.update_layout(title=f'{metric_label} Over Time in {city}', yaxis_title=metric_label)
 
     # Violin Plot for Distribution
     violin_fig = px.violin(city_df, y=metric, box=True, points="all", title=f'Distribution of {metric_label} in {city}')
-    
+    violin_fig.update_traces(hovertemplate=_violin_hovertemplate(metric))
+
     for fig in [ts_fig, violin_fig]:
         fig.update_layout(paper_bgcolor="white", plot_bgcolor="#f8f9fa", font_color="black")
 
-    return ts_fig, violin_fig 
\ No newline at end of file
+    return ts_fig, violin_fig
+
+
+def patch_air_quality_graphs(city, metric):
+    """Patches turning the figures of ``city`` into those of ``metric``.
+
+    Dates, trace styling and layout stay as they are; only the y values, the
+    min/max markers, the hover text and the titles change.  Arrays are sent in
+    plotly's typed-array encoding, like full figures.
+    """
+    city_df = _city_data(city)
+    metric_label = _metric_label(metric)
+    smoothed, std, (min_point, max_point) = _metric_series(city_df, metric)
+
+    ts_patch = Patch()
+    ts_patch['data'][0]['y'] = typed_array((smoothed + std).to_numpy())
+    ts_patch['data'][1]['y'] = typed_array((smoothed - std).to_numpy())
+    ts_patch['data'][2]['y'] = typed_array(smoothed.to_numpy())
+    ts_patch['data'][3]['x'] = [min_point['date'], max_point['date']]
+    ts_patch['data'][3]['y'] = [min_point[metric], max_point[metric]]
+    ts_patch['layout']['title']['text'] = f'{metric_label} Over Time in {city}'
+    ts_patch['layout']['yaxis']['title']['text'] = metric_label
+
+    violin_patch = Patch()
+    violin_patch['data'][0]['y'] = typed_array(city_df[metric].to_numpy())
+    violin_patch['data'][0]['hovertemplate'] = _violin_hovertemplate(metric)
+    violin_patch['layout']['title']['text'] = f'Distribution of {metric_label} in {city}'
+    violin_patch['layout']['yaxis']['title']['text'] = metric
+    return ts_patch, violin_patch
+
+
+@callback(
+    Output('aq-timeseries-plot', 'figure'),
+    Output('aq-boxplot', 'figure'),
+    Output('aq-graphs-state', 'data'),
+    Input('aq-city-dropdown', 'value'),
+    Input('aq-metric-dropdown', 'value'),
+    State('aq-graphs-state', 'data'),
+)
+def update_air_quality_graphs(city, metric, state):
+    if not city or not metric:
+        empty_fig = go.Figure(layout={'paper_bgcolor': '#4482C1', 'plot_bgcolor': '#4482C1'})
+        return empty_fig, empty_fig, None
+
+    # Only the metric changed: the dates and styling in the browser are still valid
+    if state and state.get('city') == city and state.get('metric') != metric:
+        ts_patch, violin_patch = patch_air_quality_graphs(city, metric)
+        return ts_patch, violin_patch, {'city': city, 'metric': metric}
+
+    ts_fig, violin_fig = build_air_quality_graphs(city, metric)
+    return ts_fig, violin_fig, {'city': city, 'metric': metric}
@@ -1,7 +1,12 @@
 import pandas as pd
 from functools import lru_cache
 
+from components.dtypes import lean
+from components.store import prepared
+
 @lru_cache(maxsize=1)
+@prepared('air_quality', sources=['dataset/global_air_quality_data_10000.csv'], version=2)
+@lean('air_quality')
 def load_air_quality_data():
     """Load, clean, and cache the air quality dataset."""
     try:
@@ -11,63 +11,65 @@ from .data import get_deaths_by_risk_factor_data
 from .data import get_death_rate_by_pollution_type
 import plotly.graph_objects as go
 
+from components import figures
+
 # ------------------------------------------------------------------
 # Build choropleth of composite air quality (considering all pollutants)
 # ------------------------------------------------------------------
 
-aq_df = load_air_quality_data()
-# Guard against empty
-if not aq_df.empty:
-    # Get all pollutants
-    pollutants = ['pm25', 'pm10', 'so2', 'no2', 'co', 'o3']
-    
-    # Calculate mean for each pollutant by country
-    country_means = {}
-    for pollutant in pollutants:
-        means = aq_df.groupby('country')[pollutant].mean()
-        # Normalize each pollutant (0-1 scale)
-        if not means.empty:
-            min_val = means.min()
-            max_val = means.max()
-            if max_val > min_val:  # Avoid division by zero
-                means = (means - min_val) / (max_val - min_val)
-            country_means[pollutant] = means
-    
-    # Create composite score (average of normalized pollutants)
-    composite_scores = pd.DataFrame()
-    for pollutant in pollutants:
-        if pollutant in country_means:
-            if composite_scores.empty:
-                composite_scores = country_means[pollutant].to_frame('score')
-            else:
-                composite_scores['score'] += country_means[pollutant]
-    
-    if not composite_scores.empty:
-        composite_scores['score'] /= len(pollutants)
-        composite_scores = composite_scores.reset_index()
-        
-        fig_aq_map = px.choropleth(
-            composite_scores,
-            locations='country',
-            locationmode='country names',
-            color='score',
-            color_continuous_scale='Blues',  # Now darker = worse air quality
-            range_color=(0, 1),
-            labels={'score': 'Air Quality Score<br>(Higher = Worse)'},
-            title='Composite Air Quality by Country<br>(Considering PM2.5, PM10, SO2, NO2, CO, O3)'
-        )
-        fig_aq_map.update_layout(
-            geo=dict(showframe=False, showcoastlines=True, projection_type='natural earth'),
-            margin=dict(l=0, r=0, t=50, b=0)
-        )
-else:
+@figures.static_figure('air_quality.fig_aq_map')
+def build_composite_map():
+    aq_df = load_air_quality_data()
     fig_aq_map = px.choropleth(title='Air quality data not available')
+    # Guard against empty
+    if not aq_df.empty:
+        # Get all pollutants
+        pollutants = ['pm25', 'pm10', 'so2', 'no2', 'co', 'o3']
 
+        # Calculate mean for each pollutant by country
+        country_means = {}
+        for pollutant in pollutants:
+            means = aq_df.groupby('country', observed=True)[pollutant].mean()
+            # Normalize each pollutant (0-1 scale)
+            if not means.empty:
+                min_val = means.min()
+                max_val = means.max()
+                if max_val > min_val:  # Avoid division by zero
+                    means = (means - min_val) / (max_val - min_val)
+                country_means[pollutant] = means
+
+        # Create composite score (average of normalized pollutants)
+        composite_scores = pd.DataFrame()
+        for pollutant in pollutants:
+            if pollutant in country_means:
+                if composite_scores.empty:
+                    composite_scores = country_means[pollutant].to_frame('score')
+                else:
+                    composite_scores['score'] += country_means[pollutant]
+
+        if not composite_scores.empty:
+            composite_scores['score'] /= len(pollutants)
+            composite_scores = composite_scores.reset_index()
+
+            fig_aq_map = px.choropleth(
+                composite_scores,
+                locations='country',
+                locationmode='country names',
+                color='score',
+                color_continuous_scale='Blues',  # Now darker = worse air quality
+                range_color=(0, 1),
+                labels={'score': 'Air Quality Score<br>(Higher = Worse)'},
+                title='Composite Air Quality by Country<br>(Considering PM2.5, PM10, SO2, NO2, CO, O3)'
+            )
+            fig_aq_map.update_layout(
+                geo=dict(showframe=False, showcoastlines=True, projection_type='natural earth'),
+                margin=dict(l=0, r=0, t=50, b=0)
+            )
+    return fig_aq_map
 
-def create_layout():
-    countries = get_countries()
-    metrics = get_metrics()
 
+@figures.static_figure('air_quality.deaths_by_risk')
+def build_deaths_by_risk():
     # --- Horizontal bar plot: Deaths by risk factor (World, 2021) ---
     risk_df = get_deaths_by_risk_factor_data()
     risk_df = risk_df.sort_values('Deaths', ascending=True)
@@ -91,7 +93,12 @@ def create_layout():
         height=800,
         xaxis=dict(tickformat=",d", gridcolor='#e5e5e5'),
     )
+    return bar_fig
 
+
+# Not placed on the page yet (needs dataset/deathbyair.csv)
+@figures.static_figure('air_quality.death_rate_by_type')
+def build_death_rate_by_type():
     # --- Multi-line plot: Death rate from air pollution by type (country/region, 1990 & 2021) ---
     dr_df = get_death_rate_by_pollution_type()
     line_fig = go.Figure()
@@ -127,13 +134,19 @@ def create_layout():
         yaxis=dict(gridcolor='#e5e5e5'),
         xaxis=dict(dtick=1, gridcolor='#e5e5e5', tickmode='array', tickvals=[1990, 2021]),
     )
+    return line_fig
+
+
+def create_layout():
+    countries = get_countries()
+    metrics = get_metrics()
 
     return html.Div([
         html.H1("Global Air Quality Analysis", style={'textAlign': 'center', 'color': 'white'}),
 
         # Choropleth Map section
         html.Div([
-            dcc.Graph(id='aq-global-map', figure=fig_aq_map, style={'height': '600px'})
+            dcc.Graph(id='aq-global-map', figure=figures.get('air_quality.fig_aq_map'), style={'height': '600px'})
         ], style={'padding': '20px', 'backgroundColor': 'white', 'borderRadius': '15px', 'margin': '20px'}),
 
         # Controls
@@ -163,11 +176,13 @@ def create_layout():
         html.Div([
             dcc.Graph(id='aq-timeseries-plot'),
             dcc.Graph(id='aq-boxplot'),
+            # City and metric the graphs show, so metric changes can be sent as patches
+            dcc.Store(id='aq-graphs-state'),
         ], style={'padding': '20px'}),
 
         # Bar plot section: Deaths by risk factor (moved to bottom)
         html.Div([
-            dcc.Graph(id='aq-deaths-by-risk-bar', figure=bar_fig)
+            dcc.Graph(id='aq-deaths-by-risk-bar', figure=figures.get('air_quality.deaths_by_risk'))
         ], style={'padding': '20px', 'backgroundColor': 'white', 'borderRadius': '15px', 'margin': '20px'}),
 
     ], style={'backgroundColor': '#363636', 'padding': '30px', 'minHeight': '100vh'}) 
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""Run slow callbacks outside the request workers.
+
+A callback registered with :func:`callback` runs as a Dash background
+callback.  The request that triggers it only queues a job, and the job
+runs in a separate process started by :class:`dash.DiskcacheManager`.  The
+browser then polls every ``BACKGROUND_POLL_MS`` for progress and the result,
+so the request worker is free as soon as the job is queued.  Progress and
+results pass through a diskcache directory (``BACKGROUND_CACHE_DIR``) that
+every worker on the host shares, so any worker can answer a poll.
+
+The callback receives a ``set_progress`` function as its first argument.
+``BACKGROUND_CALLBACKS=0``, or missing ``diskcache``/``multiprocess``
+packages, runs the same callbacks inline with a no-op ``set_progress``.
+"""
+import functools
+import logging
+import os
+import tempfile
+
+import dash
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('BACKGROUND_CALLBACKS', '1') != '0'
+_default_root = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+CACHE_DIR = os.environ.get('BACKGROUND_CACHE_DIR', os.path.join(_default_root, 'cs661-background'))
+POLL_MS = int(os.environ.get('BACKGROUND_POLL_MS', 500))
+# Results are read once by the polling browser; anything older was abandoned
+RESULT_TTL = float(os.environ.get('BACKGROUND_RESULT_TTL', 600))
+
+_manager = None
+
+
+def manager():
+    """The shared :class:`dash.DiskcacheManager`, or ``None`` when disabled."""
+    global _manager, ENABLED
+    if ENABLED and _manager is None:
+        try:
+            import diskcache
+            _manager = dash.DiskcacheManager(diskcache.Cache(CACHE_DIR), expire=RESULT_TTL)
+        except ImportError as e:
+            logger.warning(f"Background callbacks disabled, running inline: {e}")
+            ENABLED = False
+    return _manager
+
+
+def _no_progress(*_):
+    pass
+
+
+def callback(*args, progress=None, running=None, **kwargs):
+    """Register a background callback, like ``dash.callback(..., background=True)``.
+
+    ``progress`` and ``running`` are passed to Dash unchanged.
+    """
+    def decorator(func):
+        if manager() is not None:
+            return dash.callback(*args, background=True, manager=manager(), interval=POLL_MS,
+                                 progress=progress, running=running, **kwargs)(func)
+
+        @functools.wraps(func)
+        def inline(*inputs):
+            return func(_no_progress, *inputs)
+        return dash.callback(*args, running=running, **kwargs)(inline)
+    return decorator
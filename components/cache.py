@@ -0,0 +1,228 @@
+"""Result cache for pure callbacks, shared by all workers on a host.
+
+Callbacks such as ``update_sea_level_figures`` are pure functions of their
+inputs and the static datasets, yet every gunicorn worker recomputes them.
+:func:`memoize` stores results in two tiers:
+
+* an in-process LRU bounded by ``CALLBACK_CACHE_MEMORY_MB``;
+* a directory shared by every worker on the host, bounded by
+  ``CALLBACK_CACHE_DISK_MB``.  It defaults to ``/dev/shm`` (shared memory)
+  where available and to the system temp dir otherwise.
+
+Entries expire after ``CALLBACK_CACHE_TTL`` seconds and their keys include
+:func:`components.store.dataset_version` and
+:func:`components.store.code_version`, so neither new data nor a deploy that
+changes a callback serves stale figures from the shared tier.
+``CALLBACK_CACHE`` selects the tiers: ``disk`` (memory + shared, the
+default), ``memory`` or ``off``.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from plotly.basedatatypes import BaseFigure
+
+from components.store import code_version, dataset_version
+
+logger = logging.getLogger(__name__)
+
+MODE = os.environ.get('CALLBACK_CACHE', 'disk')
+TTL = float(os.environ.get('CALLBACK_CACHE_TTL', 3600))
+MEMORY_BYTES = int(float(os.environ.get('CALLBACK_CACHE_MEMORY_MB', 64)) * 1024 * 1024)
+DISK_BYTES = int(float(os.environ.get('CALLBACK_CACHE_DISK_MB', 512)) * 1024 * 1024)
+_default_root = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+DISK_DIR = os.environ.get('CALLBACK_CACHE_DIR', os.path.join(_default_root, 'cs661-callback-cache'))
+
+
+class MemoryBackend:
+    """Thread-safe LRU of pickled values, bounded by total size."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, blob = entry
+            if expires < time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return blob
+
+    def set(self, key, blob, expires):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires, blob)
+            self._size += len(blob)
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, blob = self._entries.pop(key)
+        self._size -= len(blob)
+
+
+class DiskBackend:
+    """One file per entry in a directory shared by every worker on the host.
+
+    Writes are atomic renames, so concurrent workers never see partial
+    entries.  The expiry time is stored in the first line of each file and
+    the directory is trimmed to ``max_bytes`` (least recently used first)
+    every ``sweep_every`` writes.
+    """
+
+    def __init__(self, directory, max_bytes, sweep_every=32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires = float(f.readline())
+                blob = f.read()
+        except (OSError, ValueError):
+            return None
+        if expires < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)  # mark as recently used for the LRU sweep
+        except OSError:
+            pass
+        return blob
+
+    def set(self, key, blob, expires):
+        if len(blob) > self.max_bytes:
+            return
+        tmp = self._path(f'.{key}.{os.getpid()}.{threading.get_ident()}')
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(f'{expires}\n'.encode())
+                f.write(blob)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write callback cache entry: {e}")
+            return
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.sweep()
+
+    def sweep(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def _backends():
+    if MODE == 'off':
+        return []
+    backends = [MemoryBackend(MEMORY_BYTES, TTL)]
+    if MODE == 'disk':
+        try:
+            backends.append(DiskBackend(DISK_DIR, DISK_BYTES))
+        except OSError as e:
+            logger.warning(f"Shared callback cache unavailable, using memory only: {e}")
+    return backends
+
+
+BACKENDS = _backends()
+
+# Called with (function name, hit) on every lookup, e.g. by components.metrics
+listeners = []
+
+
+def _portable(result):
+    """Store figures as plain dicts: unpickling a ``go.Figure`` re-runs all of
+    plotly's validation, which costs more than rebuilding small figures."""
+    if isinstance(result, BaseFigure):
+        return result.to_dict()
+    if isinstance(result, (tuple, list)):
+        return type(result)(_portable(r) for r in result)
+    return result
+
+
+def _make_key(name, args, kwargs):
+    raw = json.dumps([dataset_version(), code_version(), name, args, kwargs], sort_keys=True, default=repr)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def memoize(key=None, ttl=None):
+    """Cache a pure function's results across calls and workers.
+
+    ``key`` optionally maps the call arguments to the part that identifies
+    the result (e.g. ``lambda _: ()`` for an input that only triggers the
+    callback).  Arguments must be JSON serialisable, which every Dash
+    callback input is.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not BACKENDS:
+                return func(*args, **kwargs)
+            cache_key = _make_key(name, key(*args, **kwargs) if key else args, {} if key else kwargs)
+            for i, backend in enumerate(BACKENDS):
+                blob = backend.get(cache_key)
+                if blob is not None:
+                    for listener in listeners:
+                        listener(name, True)
+                    # Promote shared-tier hits into the faster tiers
+                    for faster in BACKENDS[:i]:
+                        faster.set(cache_key, blob, time.time() + (ttl or TTL))
+                    return pickle.loads(blob)
+
+            for listener in listeners:
+                listener(name, False)
+            result = _portable(func(*args, **kwargs))
+            blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            expires = time.time() + (ttl or TTL)
+            for backend in BACKENDS:
+                backend.set(cache_key, blob, expires)
+            return result
+
+        return wrapper
+    return decorator
@@ -0,0 +1,143 @@
+"""Negotiated gzip/brotli compression of ``app.server`` responses.
+
+Layouts and callback responses are large JSON documents (the state maps
+embed their geojson) and compress very well.  Every textual response
+(``_dash-layout``, ``_dash-update-component``, ``_dash-dependencies``,
+assets and component bundles) at least ``COMPRESS_MIN_SIZE`` bytes long is
+compressed with the best encoding the client accepts: brotli when the
+``brotli`` package is installed, gzip otherwise.
+
+``COMPRESS``
+    ``0`` disables compression (e.g. behind a proxy that already does it).
+``COMPRESS_MIN_SIZE``
+    Smaller bodies are sent as is (default 1024 bytes).
+``COMPRESS_GZIP_LEVEL`` / ``COMPRESS_BROTLI_QUALITY``
+    Compression effort, defaults 6 and 4.  ``python -m benchmarks.compression``
+    shows the CPU cost against the bytes saved for each level.
+"""
+import gzip
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('COMPRESS', '1') != '0'
+MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+
+MIMETYPES = {
+    'application/json',
+    'application/geo+json',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/html',
+    'text/plain',
+    'image/svg+xml',
+}
+
+
+def encoders():
+    """Available encodings, preferred first, as ``{name: compress(data, level)}``."""
+    available = {}
+    if brotli is not None:
+        available['br'] = lambda data, level: brotli.compress(data, quality=level)
+    available['gzip'] = lambda data, level: gzip.compress(data, compresslevel=level, mtime=0)
+    return available
+
+
+ENCODERS = encoders()
+LEVELS = {'br': BROTLI_QUALITY, 'gzip': GZIP_LEVEL}
+
+
+def choose_encoding(accept_encodings):
+    """Pick the first of our encodings the client accepts (quality > 0)."""
+    for name in ENCODERS:
+        if accept_encodings[name]:
+            return name
+    return None
+
+
+# Compressed bodies of static files (which carry an ETag), e.g. plotly.min.js
+_static = OrderedDict()
+STATIC_CACHE_ENTRIES = 64
+_static_lock = threading.Lock()
+
+
+def compress(data, encoding):
+    return ENCODERS[encoding](data, LEVELS[encoding])
+
+
+def _compress_static(etag, data, encoding):
+    key = (etag, encoding)
+    with _static_lock:
+        if key in _static:
+            _static.move_to_end(key)
+            return _static[key]
+    compressed = compress(data, encoding)
+    with _static_lock:
+        _static[key] = compressed
+        while len(_static) > STATIC_CACHE_ENTRIES:
+            _static.popitem(last=False)
+    return compressed
+
+
+def _should_compress(response):
+    return (response.status_code == 200
+            and response.mimetype in MIMETYPES
+            and 'Content-Encoding' not in response.headers
+            and not response.is_streamed)
+
+
+def init_app(app):
+    """Compress eligible responses of ``app.server``.
+
+    Register this before any other ``after_request`` hook that reads the
+    response body: Flask runs those hooks in reverse order, so this one then
+    runs last and the others still see plain JSON.
+    """
+    if not ENABLED:
+        return
+
+    @app.server.after_request
+    def _compress_response(response):
+        if not _should_compress(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if etag and request.if_none_match.contains_weak(f'{etag}-{encoding}'):
+            # The client revalidates the compressed variant we handed out earlier
+            response.status_code = 304
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+            response.set_data(b'')
+            response.headers.pop('Content-Type', None)
+            return response
+
+        # Static files are sent as passthrough file wrappers; read them in
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < MIN_SIZE:
+            return response
+
+        if etag:
+            response.set_data(_compress_static(etag, data, encoding))
+            # Compressed and identity bodies must not share a strong validator
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+        else:
+            response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
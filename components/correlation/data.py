@@ -1,4 +1,9 @@
 import pandas as pd
 
+from components.dtypes import lean
+from components.store import prepared
+
+@prepared('correlation', sources=['dataset/avg_dataset.csv'], version=2)
+@lean('correlation')
 def load_correlation_data():
     return pd.read_csv('dataset/avg_dataset.csv')
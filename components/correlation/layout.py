@@ -2,13 +2,16 @@ from dash import dcc, html
 import plotly.graph_objects as go
 import plotly.express as px
 
+from components import figures
+
 # Import temperature and sea level data loaders
 from components.temperature.data import load_avg_dataset
 from components.sea_levels.data import load_sea_level_data
 from .data import load_correlation_data
 import pandas as pd
 
-def create_correlation_layout():
+@figures.static_figure('correlation.fig_corr_merged')
+def build_corr_merged():
     data_temp = load_correlation_data()
     years = data_temp['Year']
     temp = data_temp['Average_Land_Temperature (celsius)']
@@ -31,14 +34,11 @@ def create_correlation_layout():
         yaxis3=dict(title='Sea level(mm)', range=[-25, 69], overlaying='y', side='right', position=.94, color='green', title_font=dict(size=16)),
         legend=dict(orientation='h', yanchor='bottom', y=-0.2),
     )
+    return fig_corr_merged
 
 
-    data_temp_subset = data_temp[['Year', 'Average_Land_Temperature (celsius)', 'Average_Emissions (MtCO₂e)', 'Average_Sealevel (mm)']]
-    # Remove the fig_corr2 definition and usage
-
-    data_emissions = data_temp
-    # --- Emissions + Temperature Grouped Bar Chart ---
-
+@figures.static_figure('correlation.fig_defor_em')
+def build_deforestation_vs_emissions():
     # --- Global Tree Cover Loss vs Global GHG Emissions (2001-2020) ---
     # Load tree cover loss by region dataset and aggregate globally
     tree_df = pd.read_csv('dataset/TreeCoverLoss_2001-2020_ByRegion.csv')
@@ -91,7 +91,11 @@ def create_correlation_layout():
         barmode='group',
         plot_bgcolor='white'
     )
+    return fig_defor_em
 
+
+@figures.static_figure('correlation.fig_temp_sea')
+def build_temperature_vs_sea_level():
     # ------------------------------------------------------------------
     # NEW: Sea Level vs Global Temperature Time-Series (Extended Period)
     # ------------------------------------------------------------------
@@ -154,7 +158,10 @@ def create_correlation_layout():
         plot_bgcolor='white',
         font_family='Arial'
     )
+    return fig_temp_sea
+
 
+def create_correlation_layout():
     return html.Div(
         children=[
             html.Div(
@@ -168,9 +175,9 @@ def create_correlation_layout():
             ),
             html.Div(
                 children=[
-                    dcc.Graph(id='sea_temp_timeseries', figure=fig_temp_sea, style={"margin-bottom": "10px", 'border': '3px solid #2A547E'}),
-                    dcc.Graph(id='corr_line_merged', figure=fig_corr_merged, style={"margin-bottom": "10px", 'border': '3px solid #2A547E'}),
-                    dcc.Graph(id='deforestation_vs_emissions', figure=fig_defor_em, style={"margin-bottom": "10px", 'border': '3px solid #2A547E'}),
+                    dcc.Graph(id='sea_temp_timeseries', figure=figures.get('correlation.fig_temp_sea'), style={"margin-bottom": "10px", 'border': '3px solid #2A547E'}),
+                    dcc.Graph(id='corr_line_merged', figure=figures.get('correlation.fig_corr_merged'), style={"margin-bottom": "10px", 'border': '3px solid #2A547E'}),
+                    dcc.Graph(id='deforestation_vs_emissions', figure=figures.get('correlation.fig_defor_em'), style={"margin-bottom": "10px", 'border': '3px solid #2A547E'}),
                 ],
                 style={'margin': '10px', 'display': 'block', 'flex-wrap': 'wrap'}
             )
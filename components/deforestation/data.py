@@ -1,5 +1,8 @@
 import pandas as pd
 
+from components.dtypes import lean
+from components.store import prepared
+
 # ---------------------------------------------------------------------------
 # Helper utilities
 # ---------------------------------------------------------------------------
@@ -40,6 +43,8 @@ REGION_MAP = {
 # ---------------------------------------------------------------------------
 
 
+@prepared('deforestation', sources=['dataset/Forest_Area.csv'], version=2)
+@lean('deforestation')
 def load_deforestation_data():
     """Load and preprocess forest-area data for deforestation analysis.
 
@@ -102,7 +107,7 @@ def load_deforestation_data():
 def calculate_regional_stats(df):
     """Calculate regional deforestation statistics."""
     # Group by region and calculate statistics
-    regional_stats = df.groupby('Region').agg({
+    regional_stats = df.groupby('Region', observed=True).agg({
         'Forest_Loss': ['sum', 'mean', 'std'],
         'forests_2020': 'mean'  # Current forest cover
     }).round(2)
@@ -0,0 +1,155 @@
+"""Memory-lean dtype policy applied by the loaders at load time.
+
+Every worker keeps the loaded frames for its whole life, so their footprint
+caps how many workers fit on a host.  :func:`lean` wraps a loader and
+converts its output:
+
+* label columns (``object`` strings) whose number of distinct values is at
+  most ``CATEGORY_RATIO`` of the rows become ``category``;
+* ``year``/``month``/``day`` style columns and other integer columns become
+  the smallest integer type that holds them;
+* remaining ``float64`` measurements become ``float32``.
+
+Apply it below :func:`components.store.prepared` so the prepared store keeps
+the lean frames too.  ``LEAN_DTYPES=0`` turns the policy off.  Run
+``python -m components.dtypes`` to print the bytes before and after for
+every loader.
+"""
+import functools
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('LEAN_DTYPES', '1') != '0'
+CATEGORY_RATIO = 0.5
+INTEGER_COLUMNS = {'year', 'month', 'day', 'dayofyear'}
+
+# (frame name, rows, bytes before, bytes after) of every frame converted so far
+_report = []
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _is_integral(series):
+    values = series.to_numpy()
+    return bool(np.isfinite(values).all() and (values == np.round(values)).all())
+
+
+def compact(df, categories=(), keep=()):
+    """Return ``df`` with the policy applied to every column not in ``keep``.
+
+    Columns listed in ``categories`` become categorical regardless of their
+    cardinality.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in keep:
+            continue
+        series = df[column]
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if dtype == object or pd.api.types.is_string_dtype(dtype):
+            if column in categories or (len(series) and series.nunique() <= CATEGORY_RATIO * len(series)):
+                df[column] = series.astype('category')
+        elif pd.api.types.is_bool_dtype(dtype):
+            continue
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[column] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(dtype):
+            if str(column).lower() in INTEGER_COLUMNS and len(series) and _is_integral(series):
+                df[column] = pd.to_numeric(series, downcast='integer')
+            elif dtype == np.float64:
+                df[column] = series.astype(np.float32)
+    return df
+
+
+def _compact_result(name, result, categories, keep):
+    if isinstance(result, tuple):
+        return tuple(_compact_result(f'{name}[{i}]', r, categories, keep) for i, r in enumerate(result))
+    if not isinstance(result, pd.DataFrame) or result.empty:
+        return result
+    before = frame_bytes(result)
+    result = compact(result, categories, keep)
+    after = frame_bytes(result)
+    _report.append((name, len(result), before, after))
+    logger.info(f"Lean dtypes for {name}: {before:,} -> {after:,} bytes")
+    return result
+
+
+def lean(name, categories=(), keep=()):
+    """Apply :func:`compact` to a loader's DataFrame (or tuple of them)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            if not ENABLED:
+                return result
+            label = f"{name}({', '.join(map(str, args))})" if args else name
+            return _compact_result(label, result, categories, keep)
+        return wrapper
+    return decorator
+
+
+def report():
+    """``[(frame, rows, bytes before, bytes after)]`` for frames converted so far."""
+    return list(_report)
+
+
+# ---------------------------------------------------------------------------
+# Report over every loader
+# ---------------------------------------------------------------------------
+
+def _loaders():
+    from components.greenhouse_gas.data import load_clean_data, load_continent_totals
+    from components.temperature.data import (
+        load_avg_dataset, load_continent_map, load_global_temps_by_country,
+        load_global_temps_by_country_v2, load_major_city_temps, load_temperatures_by_country,
+    )
+    from components.temperature.aggregates import load_temperature_index
+    from components.temperature.layout import STATE_MAPS
+    from components.air_quality.data import load_air_quality_data
+    from components.sea_levels.data import load_sea_ice_data, load_sea_level_data
+
+    loaders = [load_clean_data, load_continent_totals, load_air_quality_data, load_sea_level_data, load_sea_ice_data,
+               load_major_city_temps, load_temperature_index, load_continent_map,
+               load_global_temps_by_country, load_global_temps_by_country_v2, load_avg_dataset]
+    loaders += [functools.partial(load_temperatures_by_country, spec[2]) for spec in STATE_MAPS.values()]
+    return loaders
+
+
+def main():
+    from components import store
+
+    logging.basicConfig(level=logging.WARNING)
+    # Measure the raw conversion rather than frames already stored lean
+    store.ENABLED = False
+    for loader in _loaders():
+        try:
+            loader()
+        except Exception as e:
+            logger.warning(f"Skipping {getattr(loader, '__name__', loader)}: {e}")
+
+    total_before = total_after = 0
+    print(f"{'frame':60s} {'rows':>10s} {'before':>14s} {'after':>14s} {'saved':>7s}")
+    for name, rows, before, after in report():
+        total_before += before
+        total_after += after
+        print(f"{name:60s} {rows:>10,d} {before:>14,d} {after:>14,d} {1 - after / before:>7.1%}")
+    if total_before:
+        print(f"{'total':60s} {'':>10s} {total_before:>14,d} {total_after:>14,d} "
+              f"{1 - total_after / total_before:>7.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Run through the importable module so the loaders report into the same list
+    from components import dtypes
+    sys.exit(dtypes.main())
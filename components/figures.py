@@ -0,0 +1,274 @@
+"""Registry of static figures and the offline build step that serialises them.
+
+Most figures on the temperature, deforestation, correlation and air-quality
+pages do not depend on any user input.  Their builders are registered here
+with :func:`static_figure` and layouts fetch them through :func:`get`, which
+builds each figure once per process.
+
+Running ``python -m components.figures build`` renders every registered
+figure to compact JSON under ``PREBUILT_FIGURES_DIR`` (default
+``build/figures``).  With ``PREBUILT_FIGURES=1`` the layouts embed those
+pre-serialised blobs directly and never call plotly at import or per request.
+Artifacts built from a different :func:`components.store.dataset_version`
+or :func:`components.store.code_version` are ignored and the figure is
+rebuilt live instead.
+
+:func:`init_app` also serves every static figure as JSON from
+``/_figures/<version>/<name>.json`` (see :func:`url`), so the browser can
+fetch and cache figures itself, e.g. for clientside callbacks.  The version
+hashes the dataset and code versions, or a prebuilt artifact's contents, so
+new data or new code gives every figure a new URL without building any of
+them up front.
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import plotly.io as pio
+
+try:
+    from _plotly_utils.utils import to_typed_array_spec
+except ImportError:  # private helper of plotly >= 6
+    to_typed_array_spec = None
+
+from flask import Response, abort, request
+
+from components.store import code_version, dataset_version
+
+logger = logging.getLogger(__name__)
+
+PREBUILT = os.environ.get('PREBUILT_FIGURES', '0') == '1'
+PREBUILT_DIR = os.environ.get('PREBUILT_FIGURES_DIR', os.path.join('build', 'figures'))
+
+# Modules whose import registers static figure builders
+FIGURE_MODULES = [
+    'components.temperature.layout',
+    'components.deforestation.layout',
+    'components.correlation.layout',
+    'components.air_quality.layout',
+]
+
+ROUTE = '/_figures/'
+MAX_AGE = 365 * 24 * 3600
+
+_MANIFEST = 'manifest.json'
+_builders = {}
+_figures = {}
+_json = {}
+_versions = {}
+_lock = threading.Lock()
+
+
+def static_figure(name, builder=None):
+    """Register ``builder`` as the zero-argument function producing ``name``.
+
+    Usable as a decorator or called directly.
+    """
+    if builder is None:
+        return lambda func: static_figure(name, func)
+    _builders[name] = builder
+    return builder
+
+
+def _artifact_path(name):
+    return os.path.join(PREBUILT_DIR, f'{name}.json')
+
+
+def _current(manifest):
+    """Whether ``manifest`` was built from the current data and code."""
+    return (manifest.get('dataset_version') == dataset_version()
+            and manifest.get('code_version') == code_version())
+
+
+def _prebuilt_text(name):
+    try:
+        with open(os.path.join(PREBUILT_DIR, _MANIFEST), 'r') as f:
+            manifest = json.load(f)
+        if not _current(manifest):
+            logger.warning(f"Prebuilt figures are stale; building {name} live")
+            return None
+        with open(_artifact_path(name), 'r') as f:
+            return f.read()
+    except (OSError, ValueError) as e:
+        logger.warning(f"No usable prebuilt artifact for {name} ({e}); building it live")
+        return None
+
+
+def _load_prebuilt(name):
+    text = _prebuilt_text(name)
+    return json.loads(text) if text is not None else None
+
+
+def get(name):
+    """Return the figure registered as ``name``, built (or loaded) once."""
+    if name in _figures:
+        return _figures[name]
+    with _lock:
+        if name not in _figures:
+            figure = _load_prebuilt(name) if PREBUILT else None
+            if figure is None:
+                figure = _builders[name]()
+            _figures[name] = figure
+    return _figures[name]
+
+
+def to_json(figure):
+    """Compact JSON in the same encoding Dash uses on the wire."""
+    return pio.to_json(figure, validate=False, pretty=False)
+
+
+def typed_array(values):
+    """``values`` for a ``Patch``, encoded like the arrays of full figures.
+
+    Uses plotly's typed-array encoding where available and a plain list
+    otherwise.
+    """
+    values = np.asarray(values)
+    if to_typed_array_spec is None:
+        return values.tolist()
+    return to_typed_array_spec(values)
+
+
+# ---------------------------------------------------------------------------
+# Serving figures to the browser
+# ---------------------------------------------------------------------------
+
+def _digest(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def version(name):
+    """Version of figure ``name`` in its URL, known without building the figure.
+
+    A prebuilt artifact is hashed as is; a live figure takes the hash of the
+    dataset and code versions it would be built from.
+    """
+    if name not in _versions:
+        text = _prebuilt_text(name) if PREBUILT else None
+        if text is not None:
+            _json.setdefault(name, text)
+            _versions[name] = _digest(text)
+        else:
+            _versions[name] = _digest(f'{dataset_version()}:{code_version()}')
+    return _versions[name]
+
+
+def url(name):
+    """Versioned URL of the figure's JSON; safe for the browser to cache forever."""
+    return f'{ROUTE}{version(name)}/{name}.json'
+
+
+def figure_json(name):
+    """Serialised figure ``name``, encoded once per process."""
+    if name not in _json:
+        payload = _prebuilt_text(name) if PREBUILT else None
+        _json[name] = payload or to_json(get(name))
+    return _json[name]
+
+
+def init_app(app):
+    """Serve registered figures under ``/_figures/``."""
+
+    @app.server.route(f'{ROUTE}<digest>/<name>.json')
+    def _serve_figure(digest, name):
+        if name not in _builders:
+            register_all()
+        if name not in _builders:
+            abort(404)
+        current = version(name)
+        response = Response(figure_json(name), mimetype='application/json')
+        if digest == current:
+            response.set_etag(f'{current}-{name}')
+            response.cache_control.public = True
+            response.cache_control.max_age = MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            # A page rendered before the figure changed; serve the current one uncached
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+
+# ---------------------------------------------------------------------------
+# Offline build
+# ---------------------------------------------------------------------------
+
+def register_all():
+    """Import every module that registers figures; returns the sorted names."""
+    for module in FIGURE_MODULES:
+        importlib.import_module(module)
+    return sorted(_builders)
+
+
+def build(names=None, out_dir=None):
+    """Render the selected (default: all) static figures to ``out_dir``.
+
+    Returns a list of ``(name, bytes, seconds)`` for the figures written.
+    A figure whose builder fails is reported and skipped.
+    """
+    out_dir = out_dir or PREBUILT_DIR
+    register_all()
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest_path = os.path.join(out_dir, _MANIFEST)
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if not _current(manifest):
+        manifest = {'dataset_version': dataset_version(), 'code_version': code_version(), 'figures': {}}
+
+    written = []
+    for name in sorted(names or _builders):
+        if name not in _builders:
+            logger.error(f"Unknown figure {name}")
+            continue
+        start = time.perf_counter()
+        try:
+            payload = to_json(_builders[name]())
+        except Exception as e:
+            logger.error(f"Could not build figure {name}: {e}")
+            continue
+        tmp = os.path.join(out_dir, f'.{name}.json.tmp')
+        with open(tmp, 'w') as f:
+            f.write(payload)
+        os.replace(tmp, os.path.join(out_dir, f'{name}.json'))
+        elapsed = time.perf_counter() - start
+        manifest['figures'][name] = {'bytes': len(payload), 'build_seconds': round(elapsed, 3)}
+        written.append((name, len(payload), elapsed))
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pre-render static figures to JSON artifacts.')
+    parser.add_argument('command', choices=['build', 'list'])
+    parser.add_argument('names', nargs='*', help='figures to build (default: all)')
+    parser.add_argument('--out', default=PREBUILT_DIR, help=f'output directory (default {PREBUILT_DIR})')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    names = register_all()
+    if args.command == 'list':
+        print('\n'.join(names))
+        return 0
+
+    written = build(args.names or None, args.out)
+    for name, size, seconds in written:
+        print(f"{name:45s} {size:>12,d} bytes  {seconds:6.2f}s")
+    return 0 if len(written) == len(args.names or names) else 1
+
+
+if __name__ == '__main__':
+    # Run through the importable module so the layouts register into the same registry
+    from components import figures
+    sys.exit(figures.main())
@@ -1,4 +1,9 @@
 """Greenhouse Gas component package"""
-from .layout import create_layout as get_layout  # noqa: F401
 # Register callbacks on import
-from . import callbacks  # noqa: F401 
\ No newline at end of file
+from . import callbacks  # noqa: F401
+
+
+def get_layout():
+    # Imported lazily so that registering callbacks does not build the page
+    from .layout import create_layout
+    return create_layout()
@@ -1,36 +1,54 @@
-from dash import callback, Input, Output, State, no_update
+from dash import callback, Input, Output, Patch, State, no_update
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from .data import load_clean_data, get_top_bottom_countries, get_continent_emissions
-from functools import lru_cache
-
-df_cached = load_clean_data()
+from .data import get_top_bottom_countries, get_continent_emissions
+from .query import ghg_table
+from components.cache import memoize
 
 # Callback for the scatter plot
-@callback(
-    Output('ghg-scatterplot', 'figure'),
-    [Input('ghg-country-dropdown', 'value'),
-     Input('ghg-gas-dropdown', 'value')]
-)
-def update_scatterplot(countries, gas):
-    if not countries or not gas:
-        return go.Figure()
+# The figure only changes by whole countries while the gas stays the same, so
+# adding or removing a country sends a Patch with just that trace.
+# 'ghg-scatterplot-state' remembers the gas, the trace order and the colours
+# of the figure in the browser; anything else rebuilds the whole figure.
+# Countries without rows for the gas get no trace (nor legend entry), as
+# with px.line, and are left out of the state so its indices match the traces.
 
-    filtered_df = df_cached[(df_cached['country'].isin(countries)) & (df_cached['gas'] == gas)]
-    # Group by country and year to ensure only one line per country
-    grouped_df = filtered_df.groupby(['country', 'year'], as_index=False)['value'].sum()
+SCATTER_COLORS = px.colors.qualitative.Plotly
 
-    fig = px.line(
-        grouped_df,
-        x="year",
-        y="value",
-        color="country",
-        title=f"Line Chart - Average {gas} Emissions by Country",
-        labels={'value': f'{gas} Emissions', 'year': 'Year'},
-        hover_data=["country"]
-    )
+
+def _country_trace(table, country, gas, color):
+    years, values = table.series(gas, country)
+    return go.Scatter(
+        x=years, y=values, mode='lines', name=country,
+        legendgroup=country, line=dict(color=color, dash='solid'),
+        hovertemplate=f'country={country}<br>Year=%{{x}}<br>{gas} Emissions=%{{y}}<extra></extra>',
+    ).to_plotly_json()
+
+
+def _with_data(table, countries, gas):
+    return [c for c in countries if len(table.series(gas, c)[0])]
+
+
+def _assign_colors(countries, colors=None):
+    colors = dict(colors or {})
+    for country in countries:
+        if country not in colors:
+            used = set(colors.values())
+            free = [c for c in SCATTER_COLORS if c not in used]
+            colors[country] = free[0] if free else SCATTER_COLORS[len(colors) % len(SCATTER_COLORS)]
+    return {c: colors[c] for c in countries}
+
+
+@memoize()
+def build_scatterplot(countries, gas, colors):
+    table = ghg_table()
+    fig = go.Figure(data=[_country_trace(table, c, gas, colors[c]) for c in countries])
     fig.update_layout(
+        title=f"Line Chart - Average {gas} Emissions by Country",
+        xaxis_title='Year',
+        yaxis_title=f'{gas} Emissions',
+        legend_title_text='country',
         plot_bgcolor='white',
         paper_bgcolor='white',
         font=dict(family="Courier New, monospace", size=18, color="black"),
@@ -39,25 +57,59 @@ def update_scatterplot(countries, gas):
     )
     return fig
 
+
+@callback(
+    Output('ghg-scatterplot', 'figure'),
+    Output('ghg-scatterplot-state', 'data'),
+    [Input('ghg-country-dropdown', 'value'),
+     Input('ghg-gas-dropdown', 'value')],
+    State('ghg-scatterplot-state', 'data'),
+)
+def update_scatterplot(countries, gas, state):
+    if not countries or not gas:
+        return go.Figure(), None
+
+    table = ghg_table()
+    if state and state.get('gas') == gas:
+        shown = state['countries']
+        kept = [c for c in shown if c in countries]
+        added = _with_data(table, [c for c in countries if c not in shown], gas)
+        colors = _assign_colors(kept + added, {c: state['colors'][c] for c in kept})
+
+        patch = Patch()
+        # Delete from the back so the remaining indices stay valid
+        for i in reversed(range(len(shown))):
+            if shown[i] not in countries:
+                del patch['data'][i]
+        for country in added:
+            patch['data'].append(_country_trace(table, country, gas, colors[country]))
+        return patch, {'gas': gas, 'countries': kept + added, 'colors': colors}
+
+    shown = _with_data(table, countries, gas)
+    colors = _assign_colors(shown)
+    fig = build_scatterplot(shown, gas, colors)
+    return fig, {'gas': gas, 'countries': shown, 'colors': colors}
+
 # Callback for bar and line charts
 @callback(
     Output('ghg-top-5-bar', 'figure'),
     Output('ghg-bottom-5-bar', 'figure'),
     Input('ghg-gas-dropdown', 'value')
 )
+@memoize()
 def update_bar_line_charts(gas):
+    table = ghg_table()
     if not gas:
         return go.Figure(), go.Figure()
 
-    gas_df = df_cached[df_cached['gas'] == gas]
-    if gas_df.empty:
+    if table.years(gas) is None:
         return go.Figure(), go.Figure()
 
     top_countries, bottom_countries = get_top_bottom_countries(gas, n=5)
 
     # Top 5 charts
     if not top_countries.empty:
-        top5_df = gas_df[gas_df['country'].isin(top_countries['country'])]
+        top5_df = table.countries_rows(gas, top_countries['country'])
         fig_top_5_bar = px.bar(top5_df, x='country', y='value', color='year', barmode='group',
                                labels={'country': 'Country', 'value': f'{gas} Emissions', 'year': 'Year'},
                                title=f'Bar Chart - Top 5 Countries in {gas} Emissions')
@@ -68,7 +120,7 @@ def update_bar_line_charts(gas):
 
     # Bottom 5 charts
     if not bottom_countries.empty:
-        bottom5_df = gas_df[gas_df['country'].isin(bottom_countries['country'])]
+        bottom5_df = table.countries_rows(gas, bottom_countries['country'])
         fig_bottom_5_bar = px.bar(bottom5_df, x='country', y='value', color='year', barmode='group',
                                   labels={'country': 'Country', 'value': f'{gas} Emissions', 'year': 'Year'},
                                   title=f'Bar Chart - Bottom 5 Countries in {gas} Emissions')
@@ -93,6 +145,7 @@ def update_bar_line_charts(gas):
     [Input('ghg-gas-dropdown', 'value'),
      Input('ghg-year-slider-pie', 'value')]
 )
+@memoize()
 def update_continent_pie_chart(gas, year):
     if not gas or not year:
         return go.Figure()
@@ -127,13 +180,12 @@ def update_continent_pie_chart(gas, year):
 def update_pie_slider(gas):
     if not gas:
         return 2000, 2018, 2018, {}
-    
-    gas_df = df_cached[df_cached['gas'] == gas]
-    if gas_df.empty:
+
+    years = ghg_table().years(gas)
+    if years is None:
         return 2000, 2018, 2018, {}
-        
-    min_year = int(gas_df['year'].min())
-    max_year = int(gas_df['year'].max())
+
+    min_year, max_year = years
     marks = {str(year): str(year) for year in range(min_year, max_year + 1, 5)}
     
     return min_year, max_year, max_year, marks
@@ -154,18 +206,21 @@ def update_country_dropdown_defaults(gas):
     all_countries = get_all_countries()
     return all_countries[:2] if all_countries else []
 
-@lru_cache(maxsize=8) # cache for each gas
+@memoize() # cache for each gas, shared across workers
 def get_racing_bar_figure(gas):
-    gas_df = df_cached[df_cached['gas'] == gas]
-    years = sorted(gas_df['year'].unique())
-    if not years:
+    table = ghg_table()
+    span = table.years(gas)
+    if span is None:
         return None
-        
-    df_total = gas_df.groupby(['country', 'year'])['value'].sum().reset_index()
-    max_val = df_total['value'].max() * 1.2
+
+    # One row per country and year already: each frame is a cross-section
+    sections = {year: table.cross_section(gas, year) for year in range(span[0], span[1] + 1)}
+    sections = {year: section for year, section in sections.items() if len(section)}
+    years = list(sections)
+    max_val = max(section['value'].max() for section in sections.values()) * 1.2
 
     initial_year = years[0]
-    initial_data = df_total[df_total.year == initial_year].nlargest(10, 'value').sort_values('value')
+    initial_data = sections[initial_year].nlargest(10, 'value').sort_values('value')
     
     fig = go.Figure(
         data=[go.Bar(
@@ -187,7 +242,7 @@ def get_racing_bar_figure(gas):
 
     frames = []
     for year in years:
-        df_year = df_total[df_total['year'] == year].nlargest(10, 'value').sort_values('value')
+        df_year = sections[year].nlargest(10, 'value').sort_values('value')
         frame = go.Frame(
             data=[go.Bar(
                 x=df_year['value'], y=df_year['country'], orientation='h',
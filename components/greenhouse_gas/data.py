@@ -1,8 +1,12 @@
+import numpy as np
 import pandas as pd
 from functools import lru_cache
 import pycountry_convert as pc
 import re
 
+from components.dtypes import lean
+from components.store import prepared
+
 # Mapping for country names that differ between datasets or are aggregations
 COUNTRY_NAME_MAP = {
     'European Union (27)': None,
@@ -232,6 +236,11 @@ MANUAL_COUNTRY_TO_CONTINENT = {
     'Zimbabwe': 'Africa',
 }
 
+# Continent codes of the 'continent' column, in this order
+CONTINENTS = ['Africa', 'Americas', 'Asia', 'Europe', 'Oceania', 'Unknown']
+# Shown together as 'Rest of the World'
+REST_OF_WORLD = ['Oceania', 'Unknown']
+
 
 # Gas columns from the "worldwide" dataset
 GAS_COLUMN_MAP_WORLDWIDE = {
@@ -275,6 +284,8 @@ def _get_continent(country_name):
 
 
 @lru_cache(maxsize=1)
+@prepared('ghg_historical', sources=['dataset/ALL GHG_historical_emissions.csv'], version=2)
+@lean('ghg_historical')
 def load_historical_data() -> pd.DataFrame:
     """Loads and processes the historical total GHG emissions data from 'ALL GHG_historical_emissions.csv'."""
     df = pd.read_csv("dataset/ALL GHG_historical_emissions.csv")
@@ -288,6 +299,8 @@ def load_historical_data() -> pd.DataFrame:
     return df[['country', 'year', 'gas', 'value']].dropna()
 
 @lru_cache(maxsize=1)
+@prepared('ghg_worldwide', sources=['dataset/Greenhouse Gas Emissions worldwide.csv'], version=2)
+@lean('ghg_worldwide')
 def load_worldwide_data() -> pd.DataFrame:
     """Loads and processes per-gas emissions from 'Greenhouse Gas Emissions worldwide.csv'."""
     df = pd.read_csv("dataset/Greenhouse Gas Emissions worldwide.csv")
@@ -299,6 +312,8 @@ def load_worldwide_data() -> pd.DataFrame:
     return df[['country', 'year', 'gas', 'value']].dropna()
 
 @lru_cache(maxsize=1)
+@prepared('ghg_carbon', sources=['dataset/carbon_emissions.csv'], version=2)
+@lean('ghg_carbon')
 def load_carbon_data() -> pd.DataFrame:
     """Loads and processes CO2 data from 'carbon_emissions.csv'."""
     df = pd.read_csv("dataset/carbon_emissions.csv", usecols=lambda c: c not in ['Latitude', 'Longitude'])
@@ -312,6 +327,8 @@ def load_carbon_data() -> pd.DataFrame:
     return df[['country', 'year', 'gas', 'value']].dropna()
 
 @lru_cache(maxsize=1)
+@prepared('ghg_inventory', sources=['dataset/greenhouse_gas_inventory_data_data.csv'], version=2)
+@lean('ghg_inventory')
 def load_inventory_data() -> pd.DataFrame:
     """Loads and processes data from 'greenhouse_gas_inventory_data_data.csv'."""
     df = pd.read_csv("dataset/greenhouse_gas_inventory_data_data.csv")
@@ -322,9 +339,22 @@ def load_inventory_data() -> pd.DataFrame:
     df.loc[df['category'].str.contains('kilotonne'), 'value'] *= 1 # Convert kt to Gg
     return df[['country', 'year', 'gas', 'value']].dropna()
 
+GHG_SOURCES = [
+    'dataset/ALL GHG_historical_emissions.csv',
+    'dataset/Greenhouse Gas Emissions worldwide.csv',
+    'dataset/greenhouse_gas_inventory_data_data.csv',
+    'dataset/carbon_emissions.csv',
+]
+
 @lru_cache(maxsize=1)
+@prepared('ghg_clean', sources=GHG_SOURCES, version=3)
+@lean('ghg_clean')
 def load_clean_data() -> pd.DataFrame:
-    """Loads, merges, and cleans all available GHG emissions data, prioritizing sources."""
+    """Loads, merges, and cleans all available GHG emissions data, prioritizing sources.
+
+    The frame is shared by every callback: treat it as read-only.  Its
+    ``continent`` column is categorical with the codes of ``CONTINENTS``.
+    """
     df_hist = load_historical_data()
     df_world = load_worldwide_data()
     df_inv = load_inventory_data()
@@ -336,26 +366,73 @@ def load_clean_data() -> pd.DataFrame:
     
     df_combined = df_combined.dropna(subset=['country', 'year', 'gas', 'value'])
     df_combined['year'] = df_combined['year'].astype(int)
-    
+
+    # Resolve each country's continent once, here, rather than per call
+    continent_of = {country: _get_continent(country) for country in df_combined['country'].unique()}
+    df_combined['continent'] = pd.Categorical(df_combined['country'].map(continent_of), categories=CONTINENTS)
     return df_combined
 
+@lru_cache(maxsize=1)
+@prepared('ghg_continent_totals', sources=GHG_SOURCES, version=1)
+@lean('ghg_continent_totals')
+def load_continent_totals() -> pd.DataFrame:
+    """Total emissions and row count per (gas, year, continent)."""
+    df = load_clean_data()
+    # Sum in float64; the clean frame stores float32 values
+    df = pd.DataFrame({'gas': df['gas'], 'year': df['year'], 'continent': df['continent'],
+                       'value': df['value'].astype(np.float64)})
+    return df.groupby(['gas', 'year', 'continent'], observed=True).agg(
+        value=('value', 'sum'),
+        count=('value', 'size'),
+    ).reset_index()
+
+class ContinentCube:
+    """Continent totals as dense (gas, year, continent) arrays for O(1) lookups."""
+
+    def __init__(self, totals):
+        self.gases = sorted(totals['gas'].astype(str).unique())
+        self._gas_index = {gas: i for i, gas in enumerate(self.gases)}
+        years = totals['year'].to_numpy(np.int64)
+        self.first_year = int(years.min()) if len(years) else 0
+        self.last_year = int(years.max()) if len(years) else -1
+        shape = (len(self.gases), self.last_year - self.first_year + 1, len(CONTINENTS))
+        self.value = np.zeros(shape)
+        self.count = np.zeros(shape, dtype=np.int64)
+        g = totals['gas'].astype(str).map(self._gas_index).to_numpy(np.int64)
+        y = years - self.first_year
+        c = pd.Categorical(totals['continent'], categories=CONTINENTS).codes.astype(np.int64)
+        self.value[g, y, c] = totals['value'].to_numpy(np.float64)
+        self.count[g, y, c] = totals['count'].to_numpy(np.int64)
+        self.value.flags.writeable = False
+        self.count.flags.writeable = False
+
+    def lookup(self, gas, year):
+        """``(values, counts)`` per continent of ``CONTINENTS``; zeros when there is no data."""
+        i = self._gas_index.get(gas)
+        if i is None or not self.first_year <= year <= self.last_year:
+            return np.zeros(len(CONTINENTS)), np.zeros(len(CONTINENTS), dtype=np.int64)
+        return self.value[i, year - self.first_year], self.count[i, year - self.first_year]
+
+    def years(self, gas):
+        """Years with any data for ``gas``."""
+        i = self._gas_index.get(gas)
+        if i is None:
+            return []
+        return (np.flatnonzero(self.count[i].sum(axis=1)) + self.first_year).tolist()
+
+@lru_cache(maxsize=1)
+def continent_cube() -> ContinentCube:
+    return ContinentCube(load_continent_totals())
+
 def get_continent_emissions(gas: str, year: int) -> pd.DataFrame:
     """Calculate total emissions per continent for a given gas and year, merging Oceania and Unknown as 'Rest of the World'."""
-    df = load_clean_data()
-    # Add continent information for the calculation
-    df['continent'] = df['country'].apply(_get_continent)
-    df_year = df[(df['year'] == year) & (df['gas'] == gas)]
-    continent_emissions = df_year.groupby('continent')['value'].sum().reset_index()
-    # Merge Oceania and Unknown as 'Rest of the World'
-    mask = continent_emissions['continent'].isin(['Oceania', 'Unknown'])
-    rest_sum = continent_emissions.loc[mask, 'value'].sum()
-    continent_emissions = continent_emissions[~mask]
+    values, counts = continent_cube().lookup(gas, year)
+    rows = [(continent, values[i]) for i, continent in enumerate(CONTINENTS)
+            if counts[i] and continent not in REST_OF_WORLD]
+    rest_sum = sum(values[CONTINENTS.index(c)] for c in REST_OF_WORLD)
     if rest_sum > 0:
-        continent_emissions = pd.concat([
-            continent_emissions,
-            pd.DataFrame({'continent': ['Rest of the World'], 'value': [rest_sum]})
-        ], ignore_index=True)
-    return continent_emissions
+        rows.append(('Rest of the World', rest_sum))
+    return pd.DataFrame(rows, columns=['continent', 'value'])
 
 def available_gases():
     """Returns a list of available gases from the dataset."""
@@ -363,27 +440,27 @@ def available_gases():
 
 def latest_year(gas: str = None) -> int:
     """Returns the most recent year in the dataset, optionally for a specific gas."""
-    df = load_clean_data()
+    from .query import ghg_table
     if gas:
-        gas_df = df[df['gas'] == gas]
-        if not gas_df.empty:
-            return gas_df['year'].max()
-    return df['year'].max()
+        years = ghg_table().years(gas)
+        if years is not None:
+            return years[1]
+    return load_clean_data()['year'].max()
 
 def get_top_bottom_countries(gas: str, n: int = 5):
     """Gets the top and bottom N emitting countries for the latest year for that gas."""
-    df = load_clean_data()
-    gas_df = df[df['gas'] == gas]
-    
-    if gas_df.empty:
+    from .query import ghg_table
+    table = ghg_table()
+    years = table.years(gas)
+
+    if years is None:
         return pd.DataFrame(), pd.DataFrame()
-        
-    latest = gas_df['year'].max()
-    gas_df_latest = gas_df[gas_df['year'] == latest]
-    
+
+    gas_df_latest = table.cross_section(gas, years[1])
+
     top_countries = gas_df_latest.nlargest(n, 'value')
     bottom_countries = gas_df_latest[gas_df_latest['value'] > 0].nsmallest(n, 'value')
-    
+
     return top_countries, bottom_countries
 
 def get_all_countries():
@@ -7,6 +7,7 @@ from .data import (
     get_all_countries,
     latest_year,
     load_clean_data,
+    continent_cube,
     get_continent_emissions,
 )
 
@@ -20,10 +21,10 @@ def create_layout():
 
     # --- Continent GHG emissions stacked bar chart for latest year ---
     # Determine latest common year across all selected gases
-    df_years = load_clean_data()
-    common_years = set(df_years['year'].unique())
+    cube = continent_cube()
+    common_years = set(range(cube.first_year, cube.last_year + 1))
     for g in gases:
-        common_years &= set(df_years[df_years['gas'] == g]['year'].unique())
+        common_years &= set(cube.years(g))
     if common_years:
         latest_yr = max(common_years)
     else:
@@ -42,7 +43,7 @@ def create_layout():
     all_cont_df = pd.concat(continent_data, ignore_index=True)
     
     # Sort continents by total emissions
-    continent_totals = all_cont_df.groupby('continent')['value'].sum().sort_values(ascending=True)
+    continent_totals = all_cont_df.groupby('continent', observed=True)['value'].sum().sort_values(ascending=True)
     continents_ordered = continent_totals.index.tolist()
     
     # Create stacked bar chart
@@ -196,5 +197,7 @@ def create_layout():
                 style={'width': '700px'}
             ),
             dcc.Graph(id="ghg-scatterplot", style={"margin-bottom": "10px", 'border': '3px solid #2A547E', 'width': '100%'}),
+            # What the scatterplot currently shows, so country changes can be sent as patches
+            dcc.Store(id='ghg-scatterplot-state'),
         ], style={'marginBottom': '20px', 'display': 'flex', 'flex-direction': 'column', 'align-items': 'center', 'width': '95%', 'margin': 'auto'}),
     ], style={'backgroundColor': '#3B2F70', 'padding': '30px', 'minHeight': '100vh'}) 
\ No newline at end of file
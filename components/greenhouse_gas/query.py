@@ -0,0 +1,150 @@
+"""Sorted, code-indexed view of the merged GHG table for the callbacks.
+
+The callbacks used to filter the whole of ``load_clean_data()`` with
+boolean masks (``gas == G``, ``country.isin(C)``) and group the result, so
+every query cost time proportional to the whole table.  :class:`GHGTable`
+keeps the table as numpy columns with integer gas and country codes, in
+two orders:
+
+* by (gas, country, year): the rows of a gas, and one country's series
+  under it, are contiguous;
+* by (gas, year, country): so are the countries of a gas in one year.
+
+Queries find their range by binary search over a combined integer key and
+return slices, which are views of the columns, not copies.  Their cost
+grows with the size of the answer and only logarithmically with the
+table.  ``python -m benchmarks.ghg_query`` compares both approaches as the
+table grows.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .data import load_clean_data
+
+
+class GHGTable:
+    """The ``country``/``year``/``gas``/``value`` rows of a GHG frame, indexed.
+
+    Query results are frames of ``country`` (categorical), ``year`` and
+    ``value``.  Contiguous results hold views of the index's columns; treat
+    them as read-only.
+    """
+
+    def __init__(self, df):
+        gas = pd.Categorical(df['gas'].astype(str))
+        country = pd.Categorical(df['country'].astype(str))
+        self.gases = list(gas.categories)
+        self.countries = list(country.categories)
+        self._gas_code = {g: i for i, g in enumerate(self.gases)}
+        self._country_code = {c: i for i, c in enumerate(self.countries)}
+
+        gas_codes = gas.codes.astype(np.int64)
+        country_codes = country.codes
+        self._country_dtype = country.dtype
+        # Kept in the frame's dtypes so figures carry the same typed arrays
+        year = df['year'].to_numpy()
+        value = df['value'].to_numpy()
+        self.first_year = int(year.min()) if len(year) else 0
+        self._years = int(year.max()) - self.first_year + 1 if len(year) else 1
+        year_offset = year.astype(np.int64) - self.first_year
+
+        # (gas, country, year) order
+        order = np.lexsort((year, country_codes, gas_codes))
+        self.country = country_codes[order]
+        self.year = year[order]
+        self.value = value[order]
+        self._series_key = (gas_codes[order] * len(self.countries) + self.country.astype(np.int64)) * self._years \
+            + year_offset[order]
+
+        # (gas, year, country) order
+        order = np.lexsort((country_codes, year, gas_codes))
+        self.section_country = country_codes[order]
+        self.section_year = year[order]
+        self.section_value = value[order]
+        self._section_key = (gas_codes[order] * self._years + year_offset[order]) \
+            * len(self.countries) + self.section_country.astype(np.int64)
+
+        for column in (self.country, self.year, self.value, self._series_key,
+                       self.section_country, self.section_year, self.section_value, self._section_key):
+            column.flags.writeable = False
+
+    def __len__(self):
+        return len(self.value)
+
+    def _range(self, keys, low, high):
+        return slice(int(np.searchsorted(keys, low, 'left')), int(np.searchsorted(keys, high, 'left')))
+
+    def _gas_slice(self, gas):
+        g = self._gas_code.get(gas)
+        if g is None:
+            return slice(0, 0)
+        width = len(self.countries) * self._years
+        return self._range(self._series_key, g * width, (g + 1) * width)
+
+    def _series_slice(self, gas, country):
+        g, c = self._gas_code.get(gas), self._country_code.get(country)
+        if g is None or c is None:
+            return slice(0, 0)
+        start = (g * len(self.countries) + c) * self._years
+        return self._range(self._series_key, start, start + self._years)
+
+    def _section_slice(self, gas, year):
+        g = self._gas_code.get(gas)
+        y = int(year) - self.first_year
+        if g is None or not 0 <= y < self._years:
+            return slice(0, 0)
+        start = (g * self._years + y) * len(self.countries)
+        return self._range(self._section_key, start, start + len(self.countries))
+
+    def _frame(self, countries, years, values):
+        return pd.DataFrame({
+            'country': pd.Categorical.from_codes(countries, dtype=self._country_dtype, validate=False),
+            'year': years,
+            'value': values,
+        }, copy=False)
+
+    def gas_rows(self, gas):
+        """Rows of ``gas`` ordered by country and year."""
+        s = self._gas_slice(gas)
+        return self._frame(self.country[s], self.year[s], self.value[s])
+
+    def years(self, gas):
+        """``(first, last)`` year with data for ``gas``, or ``None``."""
+        g = self._gas_code.get(gas)
+        if g is None:
+            return None
+        # In (gas, year, country) order the gas's first and last rows hold its years
+        width = self._years * len(self.countries)
+        s = self._range(self._section_key, g * width, (g + 1) * width)
+        if s.start == s.stop:
+            return None
+        return int(self.section_year[s.start]), int(self.section_year[s.stop - 1])
+
+    def series(self, gas, country):
+        """``(years, values)`` of ``country`` under ``gas``, ordered by year (views)."""
+        s = self._series_slice(gas, country)
+        return self.year[s], self.value[s]
+
+    def countries_rows(self, gas, countries):
+        """Rows of ``gas`` for ``countries``, in their order and then by year."""
+        slices = [self._series_slice(gas, c) for c in dict.fromkeys(countries)]
+        slices = [s for s in slices if s.start != s.stop]
+        if len(slices) == 1:
+            s = slices[0]
+            return self._frame(self.country[s], self.year[s], self.value[s])
+        index = np.concatenate([np.arange(s.start, s.stop) for s in slices]) if slices \
+            else np.empty(0, dtype=np.int64)
+        return self._frame(self.country[index], self.year[index], self.value[index])
+
+    def cross_section(self, gas, year):
+        """Rows of ``gas`` in ``year``, one per country, ordered by country."""
+        s = self._section_slice(gas, year)
+        return self._frame(self.section_country[s], self.section_year[s], self.section_value[s])
+
+
+@lru_cache(maxsize=1)
+def ghg_table() -> GHGTable:
+    """The index over :func:`load_clean_data`, built once per process."""
+    return GHGTable(load_clean_data())
@@ -1,15 +1,13 @@
 from dash import dcc, html
 import dash_bootstrap_components as dbc
-import base64
 
-with open("dataset/earth_image1.png", "rb") as image_file:
-    encoded_image = base64.b64encode(image_file.read()).decode()
+from components.images import picture
 
 def create_header():
     return html.Div([
         html.Div(
             [
-                html.Img(src=f"data:image/jpg;base64,{encoded_image}", style={"height": "300px", "display": "block", "margin": "auto"}),
+                picture("dataset/earth_image1.png", height=300, alt="Earth", style={"display": "block", "margin": "auto"}),
                 html.H1("VISUALIZING EARTH CLIMATE", style={"text-align": "center", "font-family": "PT Sans Narrow", 'font-size': '60px', 'font-weight': 'bold'}),
             ],
             style={"padding-top": "10px", 'padding-bottom': '10px', "background-color": "black", "color": "white", 'box-shadow': '5px 5px 5px grey', "border-radius": "15px"}
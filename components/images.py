@@ -0,0 +1,169 @@
+"""Static images served from a cacheable route with resized and WebP variants.
+
+Images used to be inlined in layouts as base64 data URIs, which the browser
+can never cache and which add a third to their size.  :func:`picture` returns
+an ``html.Picture`` whose ``srcSet`` points at ``/static/img/...`` URLs.
+
+Each URL contains a hash of the source image, so the responses are served
+with a one year ``immutable`` Cache-Control and an ETag.  A new image gets a
+new URL.  Variants are written to ``IMAGE_VARIANTS_DIR`` (default
+``build/images``) on their first request, or ahead of time with
+``python -m components.images build``.  Without Pillow only the original
+file is served.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+
+from dash import html
+from flask import abort, send_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = os.environ.get('IMAGE_VARIANTS_DIR', os.path.join('build', 'images'))
+ROUTE = '/static/img/'
+MAX_AGE = 365 * 24 * 3600
+WEBP_QUALITY = 80
+
+# Variant file names: <stem>-<source hash>-<width>.<ext>
+_NAME = re.compile(r'^(?P<stem>[\w.]+)-(?P<digest>[0-9a-f]{12})-(?P<width>\d+)\.(?P<ext>png|webp)$')
+
+_images = {}
+_lock = threading.Lock()
+
+
+class _Source:
+    def __init__(self, path):
+        self.path = path
+        self.stem = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'rb') as f:
+            self.digest = hashlib.sha1(f.read()).hexdigest()[:12]
+        if Image is not None:
+            with Image.open(path) as im:
+                self.size = im.size
+        else:
+            self.size = None
+        self.widths = set()
+
+    def name(self, width, ext):
+        return f'{self.stem}-{self.digest}-{width}.{ext}'
+
+
+def register(path):
+    """Make the image at ``path`` servable; returns its source record."""
+    source = _Source(path)
+    return _images.setdefault((source.stem, source.digest), source)
+
+
+def _variant(source, width, ext):
+    """Path of the resized/re-encoded variant, writing it if needed."""
+    out = os.path.join(VARIANTS_DIR, source.name(width, ext))
+    if os.path.exists(out):
+        return out
+    with _lock:
+        if os.path.exists(out):
+            return out
+        os.makedirs(VARIANTS_DIR, exist_ok=True)
+        with Image.open(source.path) as im:
+            if width < im.width:
+                im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+            tmp = f'{out}.{os.getpid()}.tmp'
+            if ext == 'webp':
+                im.save(tmp, 'WEBP', quality=WEBP_QUALITY, method=6)
+            else:
+                im.save(tmp, 'PNG', optimize=True)
+        os.replace(tmp, out)
+        logger.info(f"Wrote image variant {out} ({os.path.getsize(out):,} bytes)")
+    return out
+
+
+def _widths(source, display_width):
+    """1x and 2x of the displayed width (plus a small one), capped at the original."""
+    full = source.size[0]
+    widths = {min(w, full) for w in (display_width // 2, display_width, display_width * 2)}
+    return sorted(widths)
+
+
+def picture(path, height, alt='', style=None):
+    """An ``html.Picture`` for the image at ``path`` displayed ``height`` px high."""
+    source = register(path)
+    style = dict(style or {}, height=f'{height}px')
+    if source.size is None:
+        ext = os.path.splitext(path)[1].lstrip('.')
+        return html.Img(src=f'{ROUTE}{source.name(0, ext)}', alt=alt, style=style)
+
+    width, full_height = source.size
+    display_width = round(height * width / full_height)
+    widths = _widths(source, display_width)
+    source.widths.update(widths)
+    sizes = f'{display_width}px'
+
+    def srcset(ext):
+        return ', '.join(f'{ROUTE}{source.name(w, ext)} {w}w' for w in widths)
+
+    return html.Picture([
+        html.Source(srcSet=srcset('webp'), type='image/webp', sizes=sizes),
+        html.Img(src=f'{ROUTE}{source.name(widths[-1], "png")}', srcSet=srcset('png'), sizes=sizes,
+                 alt=alt, width=display_width, height=height, style=style),
+    ])
+
+
+def init_app(app):
+    """Serve registered images and their variants under ``/static/img/``."""
+
+    @app.server.route(f'{ROUTE}<name>')
+    def _serve_image(name):
+        match = _NAME.match(name)
+        source = match and _images.get((match['stem'], match['digest']))
+        if not source:
+            abort(404)
+        width = int(match['width'])
+        if Image is None or width == 0:
+            path = source.path
+        elif width not in source.widths:
+            abort(404)
+        else:
+            path = _variant(source, width, match['ext'])
+        response = send_file(os.path.abspath(path), etag=True, conditional=True, max_age=MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def build_all():
+    """Write every variant referenced by a rendered picture; returns their paths."""
+    return [_variant(source, width, ext)
+            for source in list(_images.values())
+            for width in sorted(source.widths)
+            for ext in ('webp', 'png')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pre-generate resized and WebP image variants.')
+    parser.add_argument('command', choices=['build'])
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if Image is None:
+        print('Pillow is not installed; only original images are served')
+        return 1
+    from components.header import create_header
+    create_header()
+    for path in build_all():
+        print(f"{path:60s} {os.path.getsize(path):>10,d} bytes")
+    return 0
+
+
+if __name__ == '__main__':
+    # Run through the importable module so create_header() registers into the same registry
+    from components import images
+    sys.exit(images.main())
@@ -0,0 +1,270 @@
+"""Per-callback metrics exposed at ``/metrics`` in Prometheus text format.
+
+Every request to ``_dash-update-component`` is timed and attributed to its
+callback id (the output, e.g. ``ghg-racing-bar.figure``).  The ``display_page``
+router is additionally broken down per pathname.  For each callback we keep:
+
+* ``dash_callback_requests_total`` by status (``ok``, ``no_update``, ``error``);
+* ``dash_callback_exceptions_total``;
+* ``dash_callback_latency_seconds`` (histogram);
+* ``dash_callback_output_bytes`` (histogram of uncompressed response sizes);
+* ``dash_callback_cache_total`` by result (``hit``/``miss``) for callbacks
+  wrapped with :func:`components.cache.memoize`.
+
+With ``METRICS_DIR`` set (``gunicorn.conf.py`` gives each server start a
+fresh one) every worker also writes its numbers to ``<pid>.json`` there, at
+most every ``METRICS_FLUSH_SECONDS``, and ``/metrics`` reports the sum over
+all files.  Whichever worker answers the scrape then shows the whole
+server, including workers that have since exited, in the style of the
+Prometheus client's multiprocess mode.  Without it the numbers are the
+answering process's own.  ``METRICS=0`` disables the module.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_request_context, request
+
+from components import cache
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('METRICS', '1') != '0'
+FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 1))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 2e6, 5e6, 1e7)
+ROUTER_OUTPUT = 'page-content.children'
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Counters and histograms keyed by label tuples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.histograms = defaultdict(dict)
+        self.help = {}
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self.counters[name][tuple(sorted(labels.items()))] += value
+
+    def observe(self, name, labels, value, buckets):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            hist = self.histograms[name].get(key)
+            if hist is None:
+                hist = self.histograms[name][key] = Histogram(buckets)
+            hist.observe(value)
+
+    def snapshot(self):
+        """JSON-serialisable copy of every series."""
+        with self._lock:
+            return {
+                'counters': {name: [[list(labels), value] for labels, value in series.items()]
+                             for name, series in self.counters.items()},
+                'histograms': {name: [[list(labels), list(hist.buckets), list(hist.counts), hist.sum, hist.count]
+                                      for labels, hist in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+    def merge(self, snapshot):
+        """Add the series of a :meth:`snapshot` to this registry."""
+        for name, series in snapshot['counters'].items():
+            for labels, value in series:
+                self.inc(name, dict(labels), value)
+        with self._lock:
+            for name, series in snapshot['histograms'].items():
+                for labels, buckets, counts, total, count in series:
+                    key = tuple(tuple(label) for label in labels)
+                    hist = self.histograms[name].get(key)
+                    if hist is None:
+                        hist = self.histograms[name][key] = Histogram(tuple(buckets))
+                    hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+                    hist.sum += total
+                    hist.count += count
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f'# HELP {name} {self.help.get(name, name)}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(series.items()):
+                    lines.append(f'{name}{_labels(labels)} {value}')
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f'# HELP {name} {self.help.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, hist in sorted(series.items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {count}')
+                    lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {hist.count}')
+                    lines.append(f'{name}_sum{_labels(labels)} {_number(hist.sum)}')
+                    lines.append(f'{name}_count{_labels(labels)} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+REGISTRY = Registry()
+REGISTRY.help.update({
+    'dash_callback_requests_total': 'Callback invocations by outcome.',
+    'dash_callback_exceptions_total': 'Callback invocations that raised.',
+    'dash_callback_latency_seconds': 'Wall time of _dash-update-component requests.',
+    'dash_callback_output_bytes': 'Uncompressed size of callback responses.',
+    'dash_callback_cache_total': 'Memoized callback results served from (hit) or added to (miss) the cache.',
+    'dash_page_requests_total': 'display_page invocations per pathname.',
+    'dash_page_latency_seconds': 'Wall time of display_page per pathname.',
+})
+
+
+# ---------------------------------------------------------------------------
+# Sharing between workers
+# ---------------------------------------------------------------------------
+
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+
+
+def _metrics_dir():
+    # Read per call: gunicorn.conf.py sets it before the workers fork
+    return os.environ.get('METRICS_DIR')
+
+
+def flush(force=False):
+    """Write this process's series to ``METRICS_DIR/<pid>.json``."""
+    global _last_flush
+    directory = _metrics_dir()
+    if not directory or (not force and time.monotonic() - _last_flush < FLUSH_SECONDS):
+        return
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with _flush_lock:
+        _last_flush = time.monotonic()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            tmp = f'{path}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(REGISTRY.snapshot(), f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {directory}: {e}")
+
+
+def collect():
+    """Prometheus text of every worker sharing ``METRICS_DIR``, or of this process."""
+    directory = _metrics_dir()
+    if not directory:
+        return REGISTRY.render()
+    flush(force=True)
+    merged = Registry()
+    merged.help = REGISTRY.help
+    for entry in sorted(os.listdir(directory)):
+        if not entry.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, entry), 'r') as f:
+                merged.merge(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable metrics file {entry}: {e}")
+    return merged.render()
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+def _on_cache_lookup(name, hit):
+    # Attributed to the callback of the current request in _record_callback
+    if has_request_context():
+        g.setdefault('metrics_cache', []).append('hit' if hit else 'miss')
+
+
+def _status(code):
+    if code == 204:
+        return 'no_update'
+    return 'ok' if code < 400 else 'error'
+
+
+def init_app(app, pathnames=()):
+    """Time every callback request of ``app`` and add ``/metrics``.
+
+    ``pathnames`` are the router paths reported individually; any other
+    pathname is reported as ``other`` to keep the number of series bounded.
+    Register this after hooks that rewrite the body (compression) so the
+    recorded output bytes are uncompressed.
+    """
+    if not ENABLED:
+        return
+    server = app.server
+    known_paths = set(pathnames) | {'/'}
+    cache.listeners.append(_on_cache_lookup)
+
+    @server.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def _record_callback(response):
+        if not request.path.endswith('_dash-update-component') or 'metrics_start' not in g:
+            return response
+        elapsed = time.perf_counter() - g.metrics_start
+        body = request.get_json(silent=True) or {}
+        callback = {'callback': body.get('output', 'unknown')}
+        status = _status(response.status_code)
+
+        REGISTRY.inc('dash_callback_requests_total', dict(callback, status=status))
+        if status == 'error':
+            REGISTRY.inc('dash_callback_exceptions_total', callback)
+        REGISTRY.observe('dash_callback_latency_seconds', callback, elapsed, LATENCY_BUCKETS)
+        if status == 'ok' and not response.is_streamed:
+            REGISTRY.observe('dash_callback_output_bytes', callback,
+                             response.content_length or 0, BYTES_BUCKETS)
+        for result in g.get('metrics_cache', []):
+            REGISTRY.inc('dash_callback_cache_total', dict(callback, result=result))
+
+        if callback['callback'] == ROUTER_OUTPUT:
+            inputs = body.get('inputs') or [{}]
+            pathname = inputs[0].get('value') or '/'
+            page = {'pathname': pathname if pathname in known_paths else 'other'}
+            REGISTRY.inc('dash_page_requests_total', dict(page, status=status))
+            REGISTRY.observe('dash_page_latency_seconds', page, elapsed, LATENCY_BUCKETS)
+        flush()
+        return response
+
+    atexit.register(flush, force=True)
+
+    @server.route('/metrics')
+    def _metrics():
+        return Response(collect(), mimetype='text/plain', content_type='text/plain; version=0.0.4; charset=utf-8')
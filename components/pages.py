@@ -0,0 +1,106 @@
+"""Lazy page registry used by the ``display_page`` router.
+
+Every page's layout module builds its figures at import time, so importing
+them all up front keeps the server from answering anything until the slowest
+page is ready.  Pages are registered here by module path and factory name and
+are only imported and built on their first hit.  An optional warm-up thread
+pre-builds them in priority order once the server is up.
+"""
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Page:
+    def __init__(self, pathname, module, factory, priority):
+        self.pathname = pathname
+        self.module = module
+        self.factory = factory
+        self.priority = priority
+        self.layout = None
+        self.lock = threading.Lock()
+
+
+class PageRegistry:
+    """Maps pathnames to lazily imported, built-once page layouts."""
+
+    def __init__(self, default=None):
+        self._pages = {}
+        self._default = default
+        self._started = threading.Event()
+        self._warm_thread = None
+
+    def register(self, pathname, module, factory, priority=100):
+        """Register ``module.factory()`` as the layout for ``pathname``.
+
+        Lower ``priority`` values are warmed up first.
+        """
+        self._pages[pathname] = Page(pathname, module, factory, priority)
+
+    @property
+    def pathnames(self):
+        return list(self._pages)
+
+    def is_built(self, pathname):
+        page = self._pages.get(pathname)
+        return page is not None and page.layout is not None
+
+    def build(self, pathname):
+        """Import and build a page once; concurrent callers wait for the first."""
+        page = self._pages[pathname]
+        if page.layout is not None:
+            return page.layout
+        with page.lock:
+            if page.layout is None:
+                start = time.perf_counter()
+                factory = getattr(importlib.import_module(page.module), page.factory)
+                page.layout = factory()
+                logger.info(f"Built page {pathname} in {time.perf_counter() - start:.2f}s")
+        return page.layout
+
+    def render(self, pathname):
+        if pathname not in self._pages:
+            return self._default() if callable(self._default) else self._default
+        return self.build(pathname)
+
+    def build_all(self):
+        """Build every page in priority order; returns the pathnames that failed."""
+        failed = []
+        for page in sorted(self._pages.values(), key=lambda p: p.priority):
+            try:
+                self.build(page.pathname)
+            except Exception as e:
+                # A broken page must not take the others down with it.
+                logger.error(f"Building page {page.pathname} failed: {e}", exc_info=True)
+                failed.append(page.pathname)
+        return failed
+
+    # ------------------------------------------------------------------
+    # Background warm-up
+    # ------------------------------------------------------------------
+
+    def notify_serving(self):
+        """Signal that the server is accepting requests; releases the warm-up."""
+        self._started.set()
+
+    def start_warm_up(self, delay=5.0):
+        """Pre-build all pages in priority order on a daemon thread.
+
+        The thread starts on the first served request (see
+        :meth:`notify_serving`) or after ``delay`` seconds, whichever comes
+        first, so it never competes with binding the port.
+        """
+        if self._warm_thread is not None:
+            return self._warm_thread
+
+        def run():
+            self._started.wait(timeout=delay)
+            self.build_all()
+            logger.info("Page warm-up finished")
+
+        self._warm_thread = threading.Thread(target=run, name='page-warm-up', daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
@@ -0,0 +1,223 @@
+"""Figure payload accounting and per-graph budgets.
+
+Every callback response that leaves ``app.server`` is inspected for figures:
+``*.figure`` outputs and ``dcc.Graph`` components nested in returned layouts
+(which is how whole pages reach the browser through ``display_page``).  For
+each graph we record the serialised JSON size, the number of traces (frames
+included) and the number of data points, log it, and keep the latest numbers
+per graph for the ``/_debug/figures`` endpoint.  ``Patch`` updates are not
+whole figures; their size and number of operations are kept apart so they
+never overwrite a graph's figure stats, and budgets do not apply to them.
+
+Budgets are configured through the environment:
+
+``FIGURE_BUDGET_BYTES`` / ``FIGURE_BUDGET_POINTS``
+    Default per-graph limits (``0`` disables a limit).
+``FIGURE_BUDGETS``
+    JSON object with per-graph overrides, e.g.
+    ``{"choropleth-map11": {"bytes": 3000000}}``.
+``FIGURE_BUDGET_MODE``
+    ``warn`` (default) logs a warning, ``fail`` replaces the response with
+    a 500 carrying the budget message, ``off`` only records.
+``FIGURE_STATS``
+    Set to ``1`` to enable the instrumentation.  It parses every callback
+    response body again, so it is off by default and meant for development
+    and load tests.
+``FIGURE_STATS_ENDPOINT``
+    Set to ``1`` to serve ``/_debug/figures``; off by default so production
+    deployments do not expose it.
+"""
+import base64
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from flask import Response, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('FIGURE_STATS', '0') == '1'
+ENDPOINT = os.environ.get('FIGURE_STATS_ENDPOINT', '0') == '1'
+BUDGET_MODE = os.environ.get('FIGURE_BUDGET_MODE', 'warn')
+DEFAULT_BUDGET = {
+    'bytes': int(os.environ.get('FIGURE_BUDGET_BYTES', 2_000_000)),
+    'points': int(os.environ.get('FIGURE_BUDGET_POINTS', 200_000)),
+}
+BUDGETS = json.loads(os.environ.get('FIGURE_BUDGETS', '{}'))
+
+# Trace attributes that carry one entry per data point
+POINT_KEYS = ('x', 'y', 'z', 'lat', 'lon', 'locations', 'values', 'labels', 'r', 'theta')
+
+_latest = {}
+_patches = {}
+_lock = threading.Lock()
+
+
+class FigureBudgetExceeded(RuntimeError):
+    """Raised in ``fail`` mode when a graph goes over its payload budget."""
+
+
+# ---------------------------------------------------------------------------
+# Measuring
+# ---------------------------------------------------------------------------
+
+def _array_length(value):
+    if isinstance(value, dict) and 'bdata' in value:
+        # plotly's typed-array encoding of numpy data
+        if value.get('shape'):
+            return int(np.prod([int(s) for s in str(value['shape']).split(',')]))
+        return len(base64.b64decode(value['bdata'])) // np.dtype(value['dtype']).itemsize
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (list, tuple)):
+            return sum(len(row) for row in value)
+        return len(value)
+    return 0
+
+
+def _trace_points(trace):
+    return max((_array_length(trace.get(key)) for key in POINT_KEYS), default=0)
+
+
+def is_patch(value):
+    """Whether ``value`` is a serialised ``dash.Patch`` rather than a figure."""
+    return isinstance(value, dict) and '__dash_patch_update' in value
+
+
+def patch_stats(patch):
+    """Return ``{'bytes', 'operations'}`` for a serialised ``Patch``."""
+    return {
+        'bytes': len(json.dumps(patch, separators=(',', ':'))),
+        'operations': len(patch.get('operations') or []),
+    }
+
+
+def figure_stats(figure):
+    """Return ``{'bytes', 'traces', 'frames', 'points'}`` for a figure.
+
+    ``figure`` may be a plotly ``Figure`` or its JSON dict form.
+    """
+    if hasattr(figure, 'to_plotly_json'):
+        figure = json.loads(figure.to_json())
+    traces = list(figure.get('data') or [])
+    frames = figure.get('frames') or []
+    for frame in frames:
+        traces.extend(frame.get('data') or [])
+    return {
+        'bytes': len(json.dumps(figure, separators=(',', ':'))),
+        'traces': len(traces),
+        'frames': len(frames),
+        'points': sum(_trace_points(t) for t in traces),
+    }
+
+
+def iter_graphs(tree):
+    """Yield ``(graph id, figure)`` for every ``dcc.Graph`` in a serialised layout."""
+    if isinstance(tree, list):
+        for child in tree:
+            yield from iter_graphs(child)
+    elif isinstance(tree, dict):
+        props = tree.get('props')
+        if tree.get('type') == 'Graph' and isinstance(props, dict):
+            if props.get('figure'):
+                yield str(props.get('id')), props['figure']
+        if isinstance(props, dict):
+            yield from iter_graphs(props.get('children'))
+
+
+# ---------------------------------------------------------------------------
+# Recording and budgets
+# ---------------------------------------------------------------------------
+
+def budget_for(graph_id):
+    return dict(DEFAULT_BUDGET, **BUDGETS.get(graph_id, {}))
+
+
+def record(graph_id, stats, source):
+    """Store and log a graph's stats and enforce its budget."""
+    stats = dict(stats, source=source, timestamp=time.time())
+    with _lock:
+        _latest[graph_id] = stats
+    logger.info(f"Figure {graph_id} from {source}: {stats['bytes']:,} bytes, "
+                f"{stats['traces']} traces, {stats['frames']} frames, {stats['points']:,} points")
+
+    if BUDGET_MODE == 'off':
+        return
+    budget = budget_for(graph_id)
+    over = [f"{key} {stats[key]:,} > {limit:,}" for key, limit in budget.items()
+            if limit and stats[key] > limit]
+    if over:
+        message = f"Figure {graph_id} from {source} is over budget: {', '.join(over)}"
+        if BUDGET_MODE == 'fail':
+            raise FigureBudgetExceeded(message)
+        logger.warning(message)
+
+
+def record_patch(graph_id, stats, source):
+    """Store and log the size of a ``Patch`` sent to a graph."""
+    stats = dict(stats, source=source, timestamp=time.time())
+    with _lock:
+        _patches[graph_id] = stats
+    logger.info(f"Patch {graph_id} from {source}: {stats['bytes']:,} bytes, {stats['operations']} operations")
+
+
+def snapshot():
+    with _lock:
+        return dict(_latest)
+
+
+def patch_snapshot():
+    with _lock:
+        return dict(_patches)
+
+
+def record_response(body, source):
+    """Account for every figure in a ``_dash-update-component`` response body."""
+    for component_id, props in (body.get('response') or {}).items():
+        for prop, value in props.items():
+            if prop == 'figure' and is_patch(value):
+                record_patch(component_id, patch_stats(value), source)
+            elif prop == 'figure' and isinstance(value, dict):
+                record(component_id, figure_stats(value), source)
+            else:
+                for graph_id, figure in iter_graphs(value):
+                    record(graph_id, figure_stats(figure), source)
+
+
+def init_app(app):
+    """Hook the accounting into ``app.server`` and, if enabled, add ``/_debug/figures``."""
+    if not ENABLED:
+        return
+    server = app.server
+
+    @server.after_request
+    def _account_figures(response):
+        if not request.path.endswith('_dash-update-component') or response.status_code != 200:
+            return response
+        try:
+            body = json.loads(response.get_data())
+        except ValueError:
+            return response
+        source = (request.get_json(silent=True) or {}).get('output', 'callback')
+        try:
+            record_response(body, source)
+        except FigureBudgetExceeded as e:
+            # Raising here would only reach the client as a bare HTML 500
+            logger.error(str(e))
+            return Response(str(e), status=500, mimetype='text/plain')
+        return response
+
+    if not ENDPOINT:
+        return
+
+    @server.route('/_debug/figures')
+    def _debug_figures():
+        stats = snapshot()
+        return jsonify({
+            'budget_mode': BUDGET_MODE,
+            'default_budget': DEFAULT_BUDGET,
+            'graphs': {gid: dict(s, budget=budget_for(gid)) for gid, s in sorted(stats.items())},
+            'patches': dict(sorted(patch_snapshot().items())),
+        })
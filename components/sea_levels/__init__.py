@@ -1,9 +1,12 @@
 """Sea Levels component package.
 
-Importing this package will automatically register the Dash layout function and callbacks so that the main application only needs to import `components.sea_levels` and call `get_layout()` to include this section in the app.
+Importing this package will automatically register the callbacks so that the main application only needs to import `components.sea_levels` and call `get_layout()` to include this section in the app. The layout module itself is only imported on the first call to `get_layout()`.
 """
 
-from .layout import create_sea_levels_layout as get_layout  # re-export for convenience
-
 # Import callbacks to ensure they are registered with Dash on package import
 from . import callbacks  # noqa: F401  # Side-effect import to register callbacks
+
+
+def get_layout():
+    from .layout import create_sea_levels_layout
+    return create_sea_levels_layout()
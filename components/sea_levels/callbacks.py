@@ -1,5 +1,5 @@
 from dash.dependencies import Input, Output, State
-from dash import callback, html
+from dash import html
 import plotly.graph_objects as go
 import plotly.express as px
 import logging
@@ -7,6 +7,9 @@ from .data import load_sea_level_data, load_sea_ice_data, calculate_seasonal_cyc
 import pandas as pd
 import numpy as np
 
+from components import background
+from components.cache import memoize
+
 logger = logging.getLogger(__name__)
 
 def create_empty_figure(title="No data available"):
@@ -27,7 +30,29 @@ def create_empty_figure(title="No data available"):
     )
     return fig
 
-@callback(
+# dcc.Loading placeholders of the five figures, in output order
+LOADING_IDS = ['loading-sea-level-scatter', 'loading-sea-level-area', 'loading-seasonal',
+               'loading-trends', 'loading-extent']
+STEPS = ['Loading sea level and sea ice data', 'Building sea level charts',
+         'Computing the seasonal cycle', 'Computing monthly trends', 'Fitting the daily extent trend']
+
+
+def progress_spinner(step, label):
+    """Spinner shown in every placeholder while the figures compute."""
+    return html.Div([
+        html.Progress(value=str(step), max=str(len(STEPS)), style={'width': '240px'}),
+        html.Div(f"{label} ({step + 1}/{len(STEPS)})", style={'color': '#2c3e50', 'marginTop': '6px'}),
+    ], style={'textAlign': 'center', 'padding': '20px'})
+
+
+def _report(set_progress, step):
+    logger.info(f"Sea level figures: {STEPS[step]}")
+    set_progress([progress_spinner(step, STEPS[step])] * len(LOADING_IDS))
+
+
+# Runs as a background job: the datasets, rolling statistics, trend fit and
+# five figures take seconds on a cold cache
+@background.callback(
     [
         Output('sea-level-scatter', 'figure'),
         Output('sea-level-area', 'figure'),
@@ -35,27 +60,39 @@ def create_empty_figure(title="No data available"):
         Output('sea-ice-trends', 'figure'),
         Output('sea-ice-extent', 'figure')
     ],
-    [Input('Sea-Levels', 'children')]
+    [Input('Sea-Levels', 'children')],
+    progress=[Output(loading_id, 'custom_spinner') for loading_id in LOADING_IDS],
+    running=[(Output(loading_id, 'display'), 'show', 'auto') for loading_id in LOADING_IDS],
 )
-def update_sea_level_figures(_):
+def update_sea_level_figures(set_progress, _):
     """Update all sea level and sea ice figures."""
     try:
         logger.info("Starting to update sea level figures")
-        
+        _report(set_progress, 0)
+
         # Load data
         df_sea_level = load_sea_level_data()
         df_sea_ice = load_sea_ice_data()
     except Exception as e:
+        # Outside the memoized builder so a transient failure is never cached
         print(f"Error loading sea level data: {e}")
         return [create_empty_figure(title="Error loading data") for _ in range(5)]
 
     if df_sea_level.empty or df_sea_ice.empty:
         return [create_empty_figure() for _ in range(5)]
-        
+    return build_sea_level_figures(set_progress, df_sea_level, df_sea_ice)
+
+
+# The input only triggers the callback on page load; the result depends on the datasets alone
+@memoize(key=lambda *_: ())
+def build_sea_level_figures(set_progress, df_sea_level, df_sea_ice):
+    """The five sea level and sea ice figures from the loaded datasets."""
     # Create figures
+    _report(set_progress, 1)
     fig_scatter = px.scatter(df_sea_level, x='Year', y='Sea Level', title='Sea Level Change Over Time')
     fig_area = px.area(df_sea_level, x='Year', y='Sea Level', title='Cumulative Sea Level Change')
     
+    _report(set_progress, 2)
     seasonal_data = calculate_seasonal_cycle(df_sea_ice)
     
     fig_seasonal = go.Figure()
@@ -111,6 +148,7 @@ def update_sea_level_figures(_):
         hovermode='x unified'
     )
     
+    _report(set_progress, 3)
     monthly_avg_data, trends_df = calculate_monthly_trends(df_sea_ice)
     
     # Create heatmap for monthly sea ice extent
@@ -123,6 +161,7 @@ def update_sea_level_figures(_):
     )
     
     # Enhanced Daily Sea Ice Extent Plot
+    _report(set_progress, 4)
     # 1. Smoothing and variability
     df_sea_ice['Extent_smoothed'] = df_sea_ice['Extent'].rolling(window=30, center=True, min_periods=1).mean()
     df_sea_ice['Extent_std'] = df_sea_ice['Extent'].rolling(window=30, center=True, min_periods=1).std()
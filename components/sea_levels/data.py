@@ -4,10 +4,15 @@ from datetime import datetime
 import logging
 import os
 
+from components.dtypes import lean
+from components.store import prepared
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@prepared('sea_level', sources=['dataset/Global_sea_level_rise.csv'], version=2)
+@lean('sea_level')
 def load_sea_level_data():
     """Load and process sea level data with error handling."""
     try:
@@ -30,6 +35,8 @@ def load_sea_level_data():
         logger.error(f"Error loading sea level data: {e}")
         return pd.DataFrame(columns=['Year', 'Sea Level'])
 
+@prepared('sea_ice', sources=['dataset/seaice.csv'], version=2)
+@lean('sea_ice')
 def load_sea_ice_data():
     """Load and process sea ice data with robust error handling."""
     try:
@@ -0,0 +1,52 @@
+"""Load data once in a pre-fork master and share it with the workers.
+
+Under gunicorn with ``preload_app`` (see ``gunicorn.conf.py``) the master
+imports ``app`` and calls :func:`preload` before forking.  Forked workers
+then share, copy-on-write, everything built here:
+
+* the cached loader frames (``load_clean_data``, ``load_air_quality_data``).
+  When the prepared store holds them, their numeric columns are zero-copy
+  views of its memory-mapped Arrow files and stay shared even when a page is
+  touched.  Categorical codes, and whole frames whose loader bypasses the
+  store (``PREPARED_DATA=0``, a missing source file), are ordinary heap
+  memory, shared only until written;
+* the GHG query index (``ghg_table``), whose sorted columns are read-only;
+* every page layout and static figure, built through the page registry.
+
+:func:`preload` finishes with :func:`gc.freeze`, which moves all of these
+objects out of the collector's generations.  Otherwise the first collection
+in each worker writes to every object header and un-shares the pages.
+
+``python -m benchmarks.memory`` measures the unique memory per worker with
+and without this mode.
+"""
+import gc
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def cached_loaders():
+    """Loaders whose results every worker keeps for its whole life."""
+    from components.greenhouse_gas.data import load_clean_data
+    from components.greenhouse_gas.query import ghg_table
+    from components.air_quality.data import load_air_quality_data
+    return [load_clean_data, ghg_table, load_air_quality_data]
+
+
+def preload(pages):
+    """Load every cached dataset and build every page of ``pages``, then freeze."""
+    start = time.perf_counter()
+    for loader in cached_loaders():
+        try:
+            loader()
+        except Exception as e:
+            logger.error(f"Preloading {loader.__name__} failed: {e}")
+    failed = pages.build_all()
+
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded shared data in {time.perf_counter() - start:.2f}s "
+                f"({gc.get_freeze_count():,} objects frozen"
+                f"{', failed pages: ' + ', '.join(failed) if failed else ''})")
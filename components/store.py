@@ -0,0 +1,260 @@
+"""Prepared-dataset store shared by every component loader.
+
+Loaders re-parse raw CSVs and redo melts, renames and dtype fixes on every
+process start.  Wrapping a loader with :func:`prepared` persists its cleaned
+output as an uncompressed Arrow IPC file under ``PREPARED_DATA_DIR``.  The
+file name carries a fingerprint of the loader version and of every source
+file (size, mtime and content hash), so editing a CSV or bumping the loader
+version invalidates the entry automatically.  On a warm start the file is
+memory-mapped instead of re-parsing the raw data.
+
+Set ``PREPARED_DATA=0`` to bypass the store entirely.  When ``pyarrow`` is
+not installed the loaders simply run as before.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.environ.get('PREPARED_DATA_DIR', os.path.join('dataset', '.prepared'))
+ENABLED = os.environ.get('PREPARED_DATA', '1') != '0'
+
+_MANIFEST = 'hashes.json'
+# Bumped whenever the on-disk layout of the Arrow files changes
+FORMAT = 2
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Source fingerprints
+# ---------------------------------------------------------------------------
+
+def _load_manifest():
+    try:
+        with open(os.path.join(STORE_DIR, _MANIFEST), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp = os.path.join(STORE_DIR, f'.{_MANIFEST}.{os.getpid()}')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(STORE_DIR, _MANIFEST))
+
+
+def _hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """Return ``(size, mtime_ns, sha1)`` for a source file.
+
+    Content hashes are remembered in a small manifest keyed by size and mtime
+    so that a warm start only has to ``stat`` the raw files.
+    """
+    st = os.stat(path)
+    with _lock:
+        manifest = _load_manifest()
+        entry = manifest.get(path)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return st.st_size, st.st_mtime_ns, entry['sha1']
+        sha1 = _hash_file(path)
+        manifest[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': sha1}
+        try:
+            _save_manifest(manifest)
+        except OSError as e:
+            logger.warning(f"Could not update prepared-data manifest: {e}")
+    return st.st_size, st.st_mtime_ns, sha1
+
+
+def fingerprint(name, sources, version):
+    """Fingerprint of a loader: its name, version and all of its source files."""
+    digest = hashlib.sha1(f'{name}:{version}:{FORMAT}'.encode())
+    for path in sources:
+        size, mtime_ns, sha1 = file_fingerprint(path)
+        digest.update(f'|{path}:{size}:{mtime_ns}:{sha1}'.encode())
+    return digest.hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# Arrow IPC persistence
+# ---------------------------------------------------------------------------
+
+def _entry_paths(name, key, parts):
+    return [os.path.join(STORE_DIR, f'{name}-{key}.{i}.arrow') for i in range(parts)]
+
+
+def _write_frame(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    # Keep NaN as a float value rather than a null: columns without a validity
+    # bitmap can be handed to pandas without a copy (see _read_frame)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type) and table.column(i).null_count and field.name in df.columns:
+            values = df[field.name].to_numpy()
+            table = table.set_column(i, field, pa.array(values, type=field.type, from_pandas=False))
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _read_frame(path):
+    # The map stays open for as long as the table's buffers are referenced.
+    # With split_blocks numeric columns are zero-copy views of the mapped file,
+    # i.e. read-only pages shared through the page cache by every worker.
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def _remove_stale(name, key):
+    """Drop entries of the same loader that were written under an older key."""
+    prefix = f'{name}-'
+    try:
+        entries = os.listdir(STORE_DIR)
+    except OSError:
+        return
+    for entry in entries:
+        if not entry.startswith(prefix):
+            continue
+        other = entry[len(prefix):].split('.', 1)[0]
+        if other != key and len(other) == len(key) and all(c in '0123456789abcdef' for c in other):
+            try:
+                os.remove(os.path.join(STORE_DIR, entry))
+            except OSError:
+                pass
+
+
+def _cacheable(result):
+    frames = result if isinstance(result, tuple) else (result,)
+    # Empty frames are how our loaders report a failed read; never persist them.
+    return all(isinstance(f, pd.DataFrame) and not f.empty for f in frames)
+
+
+def prepared(name, sources, version=1):
+    """Persist a loader's cleaned output in the prepared-data store.
+
+    ``sources`` is either a list of raw file paths or a callable receiving the
+    loader's arguments and returning that list.  The loader may return a
+    DataFrame or a tuple of DataFrames.  Arguments are folded into the store
+    key, so parametrised loaders get one entry per argument set.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if pa is None or not ENABLED:
+                return func(*args, **kwargs)
+
+            paths = sources(*args, **kwargs) if callable(sources) else list(sources)
+            entry_name = name
+            if args or kwargs:
+                arg_key = hashlib.sha1(repr((args, sorted(kwargs.items()))).encode()).hexdigest()[:8]
+                entry_name = f'{name}_{arg_key}'
+            try:
+                key = fingerprint(entry_name, paths, version)
+            except OSError:
+                key = None
+            if key is None:
+                # Missing source: let the loader raise (or handle) it as usual.
+                return func(*args, **kwargs)
+
+            meta_path = os.path.join(STORE_DIR, f'{entry_name}-{key}.json')
+            if os.path.exists(meta_path):
+                try:
+                    with open(meta_path, 'r') as f:
+                        meta = json.load(f)
+                    frames = [_read_frame(p) for p in _entry_paths(entry_name, key, meta['parts'])]
+                    logger.debug(f"Loaded prepared data for {entry_name} ({key})")
+                    return tuple(frames) if meta['tuple'] else frames[0]
+                except (OSError, ValueError, KeyError, pa.ArrowException) as e:
+                    logger.warning(f"Discarding unreadable prepared data for {entry_name}: {e}")
+
+            result = func(*args, **kwargs)
+            if not _cacheable(result):
+                return result
+            frames = result if isinstance(result, tuple) else (result,)
+            try:
+                os.makedirs(STORE_DIR, exist_ok=True)
+                _remove_stale(entry_name, key)
+                for frame, path in zip(frames, _entry_paths(entry_name, key, len(frames))):
+                    _write_frame(frame, path)
+                tmp = f'{meta_path}.{os.getpid()}.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump({'parts': len(frames), 'tuple': isinstance(result, tuple),
+                               'sources': paths, 'version': version}, f)
+                os.replace(tmp, meta_path)
+                logger.info(f"Stored prepared data for {entry_name} ({key})")
+                # Hand back the mapped copy, as a warm start would, so a cold
+                # pre-fork master shares the file's pages with its workers too
+                frames = [_read_frame(p) for p in _entry_paths(entry_name, key, len(frames))]
+                result = tuple(frames) if isinstance(result, tuple) else frames[0]
+            except (OSError, pa.ArrowException) as e:
+                logger.warning(f"Could not store prepared data for {entry_name}: {e}")
+            return result
+
+        wrapper.store_name = name
+        return wrapper
+    return decorator
+
+
+@functools.lru_cache(maxsize=1)
+def dataset_version():
+    """Short hash identifying the current contents of ``dataset/``.
+
+    Derived from the size and mtime of every raw file and computed once per
+    process; ``DATASET_VERSION`` overrides it (e.g. with a release tag).
+    Callers use it to key caches of anything derived from the datasets.
+    """
+    if os.environ.get('DATASET_VERSION'):
+        return os.environ['DATASET_VERSION']
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk('dataset'):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            digest.update(f'{path}:{st.st_size}:{st.st_mtime_ns}|'.encode())
+    return digest.hexdigest()[:12]
+
+
+@functools.lru_cache(maxsize=1)
+def code_version():
+    """Short hash identifying the source of the ``components`` package.
+
+    Computed once per process from the contents of its modules;
+    ``CODE_VERSION`` overrides it (e.g. with a release tag).  Caches that
+    outlive a process (shared result caches, prebuilt artifacts) key on it
+    alongside :func:`dataset_version`, so a deploy that changes how results
+    are computed never serves the old ones.
+    """
+    if os.environ.get('CODE_VERSION'):
+        return os.environ['CODE_VERSION']
+    package = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(package):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(('.', '__')))
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, package).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:12]
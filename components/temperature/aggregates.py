@@ -0,0 +1,346 @@
+"""Per-country and per-region statistics shared by the temperature figures.
+
+Each table is computed in one grouped pass over its source.  It is then
+kept in the prepared store and memoised per process, so figures never scan
+the raw readings once per country or merge whole frames just to group
+them.  Every table has the same statistics of ``AverageTemperature``:
+``mean``, ``min``, ``max`` and ``count`` (non-null readings), plus the
+mean ``AverageTemperatureUncertainty`` as ``uncertainty``.
+
+The city file (``GlobalLandTemperaturesByCity.csv``) is never loaded whole.
+:func:`stream_city_year_stats` folds it chunk by chunk into per (country,
+city, year) running sums within ``STREAM_MEMORY_MB``.  Everything the pages
+need from it is derived from that table.  Run
+``python -m components.temperature.aggregates`` to stream the file and
+report its peak memory.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from components.dtypes import lean
+from components.store import prepared
+
+from .data import (
+    CITY_TEMPERATURES, load_continent_map, load_global_temps_by_country_v2, load_major_city_temps, load_temperatures_by_country,
+)
+
+# Continents and duplicated entries of the country file; the "(Europe)" rows
+# are the ones matching the country's borders on the globe
+EXCLUDED_COUNTRIES = ['Denmark', 'Antarctica', 'France', 'Europe', 'Netherlands', 'United Kingdom', 'Africa', 'South America']
+RENAMED_COUNTRIES = {
+    'Denmark (Europe)': 'Denmark',
+    'France (Europe)': 'France',
+    'Netherlands (Europe)': 'Netherlands',
+    'United Kingdom (Europe)': 'United Kingdom',
+}
+# Readings below this are sentinel values, not temperatures
+MIN_VALID_TEMPERATURE = -70
+
+logger = logging.getLogger(__name__)
+
+
+def summarize(df, keys):
+    """Temperature statistics of ``df`` grouped by ``keys`` (column names or Series)."""
+    stats = {
+        'mean': ('AverageTemperature', 'mean'),
+        'min': ('AverageTemperature', 'min'),
+        'max': ('AverageTemperature', 'max'),
+        'count': ('AverageTemperature', 'count'),
+    }
+    if 'AverageTemperatureUncertainty' in df.columns:
+        stats['uncertainty'] = ('AverageTemperatureUncertainty', 'mean')
+    return df.groupby(keys, observed=True).agg(**stats).reset_index()
+
+
+@lru_cache(maxsize=1)
+@prepared('temperature_country_stats', sources=['dataset/GlobalLandTemperaturesByCountry-2.csv'], version=1)
+@lean('temperature_country_stats')
+def country_stats():
+    """One row per country of the globe, sorted by ``Country``."""
+    df = load_global_temps_by_country_v2()
+    df = df[~df['Country'].isin(EXCLUDED_COUNTRIES)]
+    country = df['Country'].astype(str).replace(RENAMED_COUNTRIES).rename('Country')
+    return summarize(df, [country])
+
+
+@lru_cache(maxsize=1)
+@prepared('temperature_region_year_stats',
+          sources=['dataset/UpdatedMajorCity_temperatures.csv', 'dataset/continents2.csv.xls'], version=1)
+@lean('temperature_region_year_stats')
+def region_year_stats():
+    """One row per (``Region``, ``Year``) of the major-city readings."""
+    df = load_major_city_temps()
+    df = df[df['AverageTemperature'] > MIN_VALID_TEMPERATURE]
+    regions = load_continent_map().drop_duplicates('Country').set_index('Country')['Region']
+    # Look the region up per row instead of merging the whole frame
+    region = df['Country'].astype(str).map(regions.astype(str)).rename('Region')
+    return summarize(df, [region, 'Year'])
+
+
+@prepared('temperature_state_year_stats', sources=lambda data_file: [data_file], version=1)
+@lean('temperature_state_year_stats')
+def state_year_stats(data_file):
+    """One row per (``State``, ``Year``) of a country's state temperature file."""
+    df = load_temperatures_by_country(data_file)
+    # Dates are ISO strings; slicing the year is far cheaper than parsing them
+    year = df['dt'].astype(str).str.slice(0, 4).astype(int).rename('Year')
+    return summarize(df, ['State', year])
+
+
+class StateYearCube:
+    """Dense (year, state) arrays of :func:`state_year_stats` for indexed lookups.
+
+    ``states`` is sorted and fixes the order of every vector returned by
+    :meth:`year`.  Years without readings for a state are NaN.
+    """
+
+    def __init__(self, stats):
+        states = stats['State'].astype(str)
+        self.states = sorted(states.unique())
+        self.first_year = int(stats['Year'].min())
+        self.last_year = int(stats['Year'].max())
+        rows = stats['Year'].to_numpy(np.int64) - self.first_year
+        cols = pd.Categorical(states, categories=self.states).codes
+        shape = (self.last_year - self.first_year + 1, len(self.states))
+        self.mean = np.full(shape, np.nan, dtype=np.float32)
+        self.mean[rows, cols] = stats['mean'].to_numpy(np.float32)
+        self.uncertainty = np.full(shape, np.nan, dtype=np.float32)
+        if 'uncertainty' in stats.columns:
+            self.uncertainty[rows, cols] = stats['uncertainty'].to_numpy(np.float32)
+        self.range = (float(np.nanmin(self.mean)), float(np.nanmax(self.mean)))
+
+    def year(self, year):
+        """``(mean, uncertainty)`` vectors of ``year`` in ``states`` order."""
+        i = int(year) - self.first_year
+        if not 0 <= i < len(self.mean):
+            empty = np.full(len(self.states), np.nan, dtype=np.float32)
+            return empty, empty
+        return self.mean[i], self.uncertainty[i]
+
+
+@lru_cache(maxsize=None)
+def state_year_cube(data_file):
+    """:class:`StateYearCube` of a country's state temperature file, built once per process."""
+    return StateYearCube(state_year_stats(data_file))
+
+
+# ---------------------------------------------------------------------------
+# Streaming the city readings
+# ---------------------------------------------------------------------------
+
+# Budget for one parsed chunk plus the running aggregates
+STREAM_MEMORY_MB = float(os.environ.get('STREAM_MEMORY_MB', 64))
+_CITY_COLUMNS = ['dt', 'AverageTemperature', 'AverageTemperatureUncertainty', 'City', 'Country']
+_SAMPLE_ROWS = 10_000
+
+# Reports of every stream run in this process
+_stream_reports = []
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class CityYearAccumulator:
+    """Running sums of city readings per (country, city, year).
+
+    Cities get integer codes as they first appear.  Sums, counts and
+    extremes live in dense (city, year) numpy arrays updated in place, so
+    memory grows with cities x years and never with the number of rows.
+    """
+
+    # field -> (dtype, initial value)
+    FIELDS = {
+        'rows': (np.int16, 0),
+        'sum': (np.float64, 0),
+        'count': (np.int16, 0),
+        'min': (np.float32, np.inf),
+        'max': (np.float32, -np.inf),
+        'uncertainty_sum': (np.float64, 0),
+        'uncertainty_count': (np.int16, 0),
+    }
+
+    def __init__(self):
+        self.cities = {}
+        self.first_year = None
+        self.arrays = {name: np.full((0, 0), fill, dtype=dtype) for name, (dtype, fill) in self.FIELDS.items()}
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays.values())
+
+    def _grow(self, first_year, last_year):
+        capacity, width = self.arrays['rows'].shape
+        old_first = first_year if self.first_year is None else self.first_year
+        new_first = min(old_first, first_year)
+        new_last = max(old_first + width - 1 if width else last_year, last_year)
+        new_width = new_last - new_first + 1
+        new_capacity = capacity if len(self.cities) <= capacity else max(len(self.cities), capacity * 3 // 2 + 64)
+        if new_capacity == capacity and new_width == width:
+            return
+        offset = old_first - new_first
+        for name, (dtype, fill) in self.FIELDS.items():
+            grown = np.full((new_capacity, new_width), fill, dtype=dtype)
+            grown[:capacity, offset:offset + width] = self.arrays[name]
+            self.arrays[name] = grown
+        self.first_year = new_first
+
+    def add(self, chunk):
+        codes, keys = pd.MultiIndex.from_arrays([chunk['Country'], chunk['City']]).factorize()
+        rows = np.array([self.cities.setdefault(key, len(self.cities)) for key in keys], dtype=np.int64)[codes]
+        # dt is parsed once, as the year slice of its ISO string
+        year = chunk['dt'].str.slice(0, 4).astype(np.int64).to_numpy()
+        self._grow(int(year.min()), int(year.max()))
+
+        width = self.arrays['rows'].shape[1]
+        cells = rows * width + (year - self.first_year)
+        flat = {name: a.reshape(-1) for name, a in self.arrays.items()}
+        np.add.at(flat['rows'], cells, 1)
+
+        temperature = chunk['AverageTemperature'].to_numpy(np.float64)
+        valid = ~np.isnan(temperature)
+        at, values = cells[valid], temperature[valid]
+        np.add.at(flat['sum'], at, values)
+        np.add.at(flat['count'], at, 1)
+        np.fmin.at(flat['min'], at, values.astype(np.float32))
+        np.fmax.at(flat['max'], at, values.astype(np.float32))
+
+        uncertainty = chunk['AverageTemperatureUncertainty'].to_numpy(np.float64)
+        valid = ~np.isnan(uncertainty)
+        np.add.at(flat['uncertainty_sum'], cells[valid], uncertainty[valid])
+        np.add.at(flat['uncertainty_count'], cells[valid], 1)
+
+    def result(self):
+        """One row per (``Country``, ``City``, ``Year``) with readings."""
+        a = self.arrays
+        city, offset = np.nonzero(a['rows'])
+        keys = list(self.cities)
+        # Categorical labels: one string per country and city, not per row
+        labels = {}
+        for i, name in enumerate(('Country', 'City')):
+            names, codes = np.unique(np.array([k[i] for k in keys], dtype=object), return_inverse=True)
+            labels[name] = pd.Categorical.from_codes(codes[city], names)
+        count = a['count'][city, offset]
+        uncertainty_count = a['uncertainty_count'][city, offset]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats = pd.DataFrame({
+                'Country': labels['Country'],
+                'City': labels['City'],
+                'Year': offset + (self.first_year or 0),
+                'rows': a['rows'][city, offset],
+                'mean': np.where(count > 0, a['sum'][city, offset] / count, np.nan),
+                'min': np.where(count > 0, a['min'][city, offset], np.nan),
+                'max': np.where(count > 0, a['max'][city, offset], np.nan),
+                'count': count,
+                'uncertainty': np.where(uncertainty_count > 0,
+                                        a['uncertainty_sum'][city, offset] / uncertainty_count, np.nan),
+            })
+        return stats.sort_values(['Country', 'City', 'Year'], ignore_index=True)
+
+
+def stream_city_year_stats(path=CITY_TEMPERATURES, memory_mb=None):
+    """Statistics per (``Country``, ``City``, ``Year``) of the city readings, streamed.
+
+    Columns are those of :func:`summarize` plus ``rows`` (readings including
+    missing temperatures).  Chunks are sized from a sample of the file to
+    half of ``memory_mb`` (default ``STREAM_MEMORY_MB``); the other half is
+    left to the :class:`CityYearAccumulator`.
+    """
+    budget = int((memory_mb or STREAM_MEMORY_MB) * 1024 * 1024)
+    start = time.perf_counter()
+    sample = pd.read_csv(path, usecols=_CITY_COLUMNS, nrows=_SAMPLE_ROWS)
+    row_bytes = max(1, _frame_bytes(sample) / max(1, len(sample)))
+    chunk_rows = max(_SAMPLE_ROWS, int(budget / 2 / row_bytes))
+
+    accumulator = CityYearAccumulator()
+    rows = chunks = peak = 0
+    for chunk in pd.read_csv(path, usecols=_CITY_COLUMNS, chunksize=chunk_rows):
+        accumulator.add(chunk)
+        peak = max(peak, _frame_bytes(chunk) + accumulator.nbytes)
+        rows += len(chunk)
+        chunks += 1
+    stats = accumulator.result()
+
+    report = {'path': path, 'rows': rows, 'chunks': chunks, 'chunk_rows': chunk_rows,
+              'peak_bytes': peak, 'budget_bytes': budget, 'seconds': time.perf_counter() - start}
+    _stream_reports.append(report)
+    message = (f"Streamed {rows:,} rows of {path} in {chunks} chunks of {chunk_rows:,} rows: "
+               f"peak working set {peak / 2**20:.1f} MB of {budget / 2**20:.0f} MB, "
+               f"{len(stats):,} (country, city, year) groups")
+    if peak > budget:
+        logger.warning(f"{message}; raise STREAM_MEMORY_MB or expect more memory use")
+    else:
+        logger.info(message)
+    return stats
+
+
+def stream_reports():
+    """Reports of every :func:`stream_city_year_stats` run in this process."""
+    return list(_stream_reports)
+
+
+@lru_cache(maxsize=1)
+@prepared('temperature_city_year_stats', sources=[CITY_TEMPERATURES], version=1)
+@lean('temperature_city_year_stats')
+def city_year_stats():
+    """:func:`stream_city_year_stats` of the city file, stored and memoised."""
+    return stream_city_year_stats()
+
+
+@prepared('temperature_index', sources=[CITY_TEMPERATURES], version=2)
+@lean('temperature_index')
+def load_temperature_index():
+    """Row count and year range of every (``Country``, ``City``) in the city readings."""
+    return city_year_stats().groupby(['Country', 'City'], observed=True).agg(
+        rows=('rows', 'sum'), first_year=('Year', 'min'), last_year=('Year', 'max')).reset_index()
+
+
+@lru_cache(maxsize=1)
+def temperature_index():
+    """Countries, cities, year range and rows per country of the city readings.
+
+    Built once per process from :func:`load_temperature_index`, so pages never
+    touch the city CSV itself."""
+    df = load_temperature_index()
+    by_country = df.groupby('Country', observed=True)
+    return {
+        'countries': sorted(map(str, by_country.groups)),
+        'cities': {str(country): sorted(group['City'].astype(str)) for country, group in by_country},
+        'years': (int(df['first_year'].min()), int(df['last_year'].max())),
+        'rows': {str(country): int(rows) for country, rows in by_country['rows'].sum().items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream the city temperatures and report peak memory.')
+    parser.add_argument('--path', default=CITY_TEMPERATURES)
+    parser.add_argument('--memory-mb', type=float, default=None,
+                        help=f'memory budget (default STREAM_MEMORY_MB={STREAM_MEMORY_MB:g})')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    tracemalloc.start()
+    stats = stream_city_year_stats(args.path, args.memory_mb)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report = stream_reports()[-1]
+    print(f"rows              {report['rows']:>14,d}")
+    print(f"chunks            {report['chunks']:>14,d} x {report['chunk_rows']:,} rows")
+    print(f"groups            {len(stats):>14,d}")
+    print(f"budget            {report['budget_bytes'] / 2**20:>12.1f}MB")
+    print(f"peak working set  {report['peak_bytes'] / 2**20:>12.1f}MB")
+    print(f"peak allocated    {traced_peak / 2**20:>12.1f}MB (tracemalloc)")
+    print(f"time              {report['seconds']:>13.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
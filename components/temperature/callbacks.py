@@ -1,24 +1,81 @@
-from dash import Input, Output
-import plotly.graph_objects as go
-import pandas as pd
-import plotly.express as px
+from dash import ClientsideFunction, Input, Output, Patch, State
+from dash.exceptions import PreventUpdate
+import numpy as np
+
+from components.cache import memoize
+from components.figures import typed_array
+
+
+def state_map_year_patch(key, year):
+    """Patch moving the state map ``key`` to ``year`` with one row of its cube."""
+    # Imported here: callback modules load with the app, layouts on first use
+    from .aggregates import state_year_cube
+    from .layout import STATE_MAPS, state_map_title
+
+    mean, uncertainty = state_year_cube(STATE_MAPS[key][2]).year(year)
+    patch = Patch()
+    patch['data'][0]['z'] = typed_array(mean.astype(np.float64))
+    patch['data'][0]['customdata'] = typed_array(np.column_stack([mean, uncertainty]).astype(np.float64))
+    patch['layout']['title']['text'] = state_map_title(key, year)
+    return patch
+
+
+@memoize()
+def viewport_heatmap(ids):
+    """Heatmap of the city points ``ids``; views showing the same cities share it."""
+    from .heatmap import heatmap_for
+    return heatmap_for(ids)
 
-from .data import load_temps_by_city
-from .layout import fig11, fig21, fig31, fig41, fig51, fig61
 
 def register_temperature_callbacks(app):
-    @app.callback(Output('choropleth-map11', 'figure'),
-                  [Input('choro-dropdown', 'value')])
-    def update_choro(value):
-        if value == 'fig11':
-            return fig11
-        elif value == 'fig21':
-            return fig21
-        elif value == 'fig31':
-            return fig31
-        elif value == 'fig41':
-            return fig41
-        elif value == 'fig51':
-            return fig51
-        elif value == 'fig61':
-            return fig61
+    # Switching countries only swaps static figures, so it runs in the browser
+    # (assets/temperature_state_maps.js) against the URLs in 'choro-figure-urls'
+    app.clientside_callback(
+        ClientsideFunction(namespace='temperature', function_name='stateMap'),
+        Output('choropleth-map11', 'figure'),
+        Input('choro-dropdown', 'value'),
+        State('choro-figure-urls', 'data'),
+    )
+
+    # The static figures show each country's latest year: reset the slider to it
+    app.clientside_callback(
+        ClientsideFunction(namespace='temperature', function_name='stateYears'),
+        Output('choro-year-slider', 'min'),
+        Output('choro-year-slider', 'max'),
+        Output('choro-year-slider', 'value'),
+        Output('choro-year-slider', 'marks'),
+        Input('choro-dropdown', 'value'),
+        State('choro-year-ranges', 'data'),
+        State('choro-year-slider', 'value'),
+    )
+
+    @app.callback(
+        Output('choropleth-map11', 'figure', allow_duplicate=True),
+        Input('choro-year-slider', 'value'),
+        State('choro-dropdown', 'value'),
+        State('choro-year-ranges', 'data'),
+        prevent_initial_call=True,
+    )
+    def update_state_map_year(year, key, ranges):
+        if year is None or not ranges or key not in ranges:
+            raise PreventUpdate
+        return state_map_year_patch(key, year)
+
+    # Only the cities in view are sent; 'city-heatmap-points' holds the ones shown
+    @app.callback(
+        Output('city-heatmap', 'figure'),
+        Output('city-heatmap-points', 'data'),
+        Input('city-heatmap', 'relayoutData'),
+        State('city-heatmap-points', 'data'),
+        prevent_initial_call=True,
+    )
+    def update_heatmap_viewport(relayout, shown):
+        from .heatmap import viewport, visible_points
+
+        view = viewport(relayout)
+        if view is None:
+            raise PreventUpdate
+        ids = visible_points(view)
+        if ids == shown:
+            raise PreventUpdate
+        return viewport_heatmap(ids), ids
@@ -2,34 +2,51 @@ import pandas as pd
 import json
 import numpy as np
 
+from components.dtypes import lean
+from components.store import prepared
+
 def load_geojson(file_path):
     with open(file_path, "r") as f:
         return json.load(f)
 
+@prepared('temperatures_by_country', sources=lambda file_path: [file_path], version=2)
+@lean('temperatures_by_country')
 def load_temperatures_by_country(file_path):
     return pd.read_csv(file_path)
 
+MAJOR_CITY_TEMPERATURES = 'dataset/UpdatedMajorCity_temperatures.csv'
+
+@prepared('major_city_temps', sources=[MAJOR_CITY_TEMPERATURES], version=2)
+@lean('major_city_temps')
 def load_major_city_temps():
-    df = pd.read_csv('dataset/UpdatedMajorCity_temperatures.csv')
+    df = pd.read_csv(MAJOR_CITY_TEMPERATURES)
     df['Date'] = pd.to_datetime(df['dt'])
     df['Year'] = df['Date'].dt.year
     df['Month'] = df['Date'].dt.month
     df['Day'] = df['Date'].dt.day
     return df
 
-def load_temps_by_city():
-    return pd.read_csv("dataset/GlobalLandTemperaturesByCity.csv")
+CITY_TEMPERATURES = 'dataset/GlobalLandTemperaturesByCity.csv'
+# Never read whole: see stream_city_year_stats in aggregates.py and query in partitions.py
 
+@prepared('continent_map', sources=['dataset/continents2.csv.xls'], version=2)
+@lean('continent_map')
 def load_continent_map():
     continent_map = pd.read_csv("dataset/continents2.csv.xls")
     continent_map.rename(columns={'name': 'Country', 'region': 'Region'}, inplace=True)
     return continent_map
 
+@prepared('global_temps_by_country', sources=['dataset/GlobalLandTemperaturesByCountry.csv'], version=2)
+@lean('global_temps_by_country')
 def load_global_temps_by_country():
     return pd.read_csv('dataset/GlobalLandTemperaturesByCountry.csv')
 
+@prepared('global_temps_by_country_v2', sources=['dataset/GlobalLandTemperaturesByCountry-2.csv'], version=2)
+@lean('global_temps_by_country_v2')
 def load_global_temps_by_country_v2():
     return pd.read_csv('dataset/GlobalLandTemperaturesByCountry-2.csv')
 
+@prepared('avg_dataset', sources=['dataset/avg_dataset.csv'], version=2)
+@lean('avg_dataset')
 def load_avg_dataset():
     return pd.read_csv('dataset/avg_dataset.csv')
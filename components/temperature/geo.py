@@ -0,0 +1,110 @@
+"""Boundary files served by URL for the choropleths to reference.
+
+Plotly accepts a URL as a trace's ``geojson`` and fetches it in the browser.
+Before this, the state maps inlined their boundaries, which every figure
+response re-sent and the browser could never cache.
+
+:func:`register` declares a boundary asset: its geojson file, the property
+copied into each feature's ``id`` (``None`` keeps the file's own ids), the
+property naming each state, and the map zoom its level of detail is picked
+for (see :mod:`.geometry`).  On first use an asset is loaded, normalised
+(ids assigned, properties trimmed to the name) and serialised once.  It is
+served from ``/_geo/<content hash>/<name>.json`` with a one year
+``immutable`` Cache-Control, so changed boundaries always get a new URL.
+"""
+import hashlib
+import importlib
+import json
+import logging
+import os
+import threading
+
+from flask import Response, abort, request
+
+from . import geometry
+
+logger = logging.getLogger(__name__)
+
+ROUTE = '/_geo/'
+MAX_AGE = 365 * 24 * 3600
+
+# Modules whose import registers the boundary assets
+GEO_MODULES = ['components.temperature.layout']
+
+_assets = {}
+_lock = threading.Lock()
+
+
+class _Asset:
+    def __init__(self, path, id_prop, name_prop, zoom):
+        self.path = path
+        self.id_prop = id_prop
+        self.name_prop = name_prop
+        self.zoom = zoom
+        self._loaded = None
+
+    def load(self):
+        """``(body, digest, {state name: feature id})``, built once."""
+        if self._loaded is None:
+            with _lock:
+                if self._loaded is None:
+                    self._loaded = self._build()
+        return self._loaded
+
+    def _build(self):
+        props = [p for p in (self.id_prop, self.name_prop) if p]
+        states = geometry.for_zoom(self.path, self.zoom, properties=props)
+        ids = {}
+        for feature in states['features']:
+            if self.id_prop is not None:
+                feature['id'] = feature['properties'][self.id_prop]
+            ids[feature['properties'][self.name_prop]] = feature['id']
+            feature['properties'] = {self.name_prop: feature['properties'][self.name_prop]}
+        body = json.dumps(states, separators=(',', ':')).encode()
+        digest = hashlib.sha1(body).hexdigest()[:12]
+        logger.info(f"Boundary asset {self.path}: {len(ids)} features, {len(body):,} bytes")
+        return body, digest, ids
+
+
+def register(path, id_prop, name_prop, zoom, name=None):
+    """Declare the boundaries in ``path``; returns the asset name (default: file stem)."""
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    _assets.setdefault(name, _Asset(path, id_prop, name_prop, zoom))
+    return name
+
+
+def url(name):
+    """Versioned URL of the asset; safe for the browser to cache forever."""
+    _, digest, _ = _assets[name].load()
+    return f'{ROUTE}{digest}/{name}.json'
+
+
+def feature_ids(name):
+    """``{state name: feature id}`` of the asset, for a trace's ``locations``."""
+    return _assets[name].load()[2]
+
+
+def init_app(app):
+    """Serve registered boundary assets under ``/_geo/``."""
+
+    @app.server.route(f'{ROUTE}<digest>/<name>.json')
+    def _serve_geo(digest, name):
+        if name not in _assets:
+            for module in GEO_MODULES:
+                importlib.import_module(module)
+        if name not in _assets:
+            abort(404)
+        try:
+            body, current, _ = _assets[name].load()
+        except OSError:
+            abort(404)
+        response = Response(body, mimetype='application/geo+json')
+        if digest == current:
+            response.set_etag(current)
+            response.cache_control.public = True
+            response.cache_control.max_age = MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            # A figure built before the boundaries changed; serve the current ones uncached
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
@@ -0,0 +1,302 @@
+"""Simplified, quantised levels of detail of the state boundary files.
+
+The state choropleths used to embed their geojson at full resolution:
+hundreds of thousands of coordinates with 15 significant digits, most of
+which fall on the same screen pixel at the zoom the maps open with.  This
+module keeps one simplified copy of each file per tolerance in
+``GEOMETRY_TOLERANCES`` (degrees).  :func:`for_zoom` returns the coarsest
+copy whose error stays below ``GEOMETRY_PIXEL_TOLERANCE`` pixels at a
+given map zoom.
+
+Simplification is topology preserving the way TopoJSON does it.  Rings are
+cut into arcs at the points where neighbouring states meet.  Every arc is
+simplified once with Douglas-Peucker, so two states sharing a border get
+exactly the same simplified border, and no gaps or overlaps appear between
+them.  Coordinates are then rounded to the precision the tolerance allows.
+
+Levels are written to ``GEOMETRY_DIR`` (default ``build/geometry``) on first
+use, or ahead of time with ``python -m components.temperature.geometry build``.
+"""
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY_DIR = os.environ.get('GEOMETRY_DIR', os.path.join('build', 'geometry'))
+TOLERANCES = sorted((float(t) for t in os.environ.get('GEOMETRY_TOLERANCES', '0.2,0.1,0.05,0.02,0.01,0.005').split(',')),
+                    reverse=True)
+PIXEL_TOLERANCE = float(os.environ.get('GEOMETRY_PIXEL_TOLERANCE', 1.0))
+# Map tiles are 512 px wide at zoom 0
+TILE_SIZE = 512
+
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Simplification
+# ---------------------------------------------------------------------------
+
+def _douglas_peucker(points, tolerance):
+    """Vertices of the open polyline ``points`` kept at ``tolerance``."""
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        start, end = points[i], points[j]
+        inner = points[i + 1:j] - start
+        direction = end - start
+        length = math.hypot(*direction)
+        if length == 0:
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dist = np.abs(direction[0] * inner[:, 1] - direction[1] * inner[:, 0]) / length
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            keep[i + 1 + k] = True
+            stack.append((i, i + 1 + k))
+            stack.append((i + 1 + k, j))
+    return points[keep]
+
+
+def _key(point):
+    # Shared borders repeat the same coordinates, up to float noise
+    return (round(float(point[0]), 7), round(float(point[1]), 7))
+
+
+def _polygons(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def _ring_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))) / 2
+
+
+class _ArcSimplifier:
+    """Simplifies rings arc by arc so that shared arcs come out identical."""
+
+    def __init__(self, rings, tolerance):
+        self.tolerance = tolerance
+        self._cache = {}
+        neighbours = {}
+        for ring in rings:
+            keys = [_key(p) for p in ring]
+            for i, key in enumerate(keys):
+                entry = neighbours.setdefault(key, set())
+                entry.add(keys[i - 1])
+                entry.add(keys[(i + 1) % len(keys)])
+        # Where more than two distinct neighbours meet, borders join or split
+        self.junctions = {key for key, entry in neighbours.items() if len(entry) > 2}
+
+    def _arc(self, arc):
+        # Simplify each arc in one canonical direction, whichever ring it came from
+        first, last = _key(arc[0]), _key(arc[-1])
+        reverse = first > last or (first == last and _key(arc[1]) > _key(arc[-2]))
+        canonical = arc[::-1] if reverse else arc
+        cache_key = canonical.tobytes()
+        simplified = self._cache.get(cache_key)
+        if simplified is None:
+            simplified = self._cache[cache_key] = _douglas_peucker(canonical, self.tolerance)
+        return simplified[::-1] if reverse else simplified
+
+    def _closed_arc(self, ring):
+        # A ring without junctions: anchor it at its smallest point and
+        # simplify both halves around the vertex farthest from the anchor
+        start = min(range(len(ring)), key=lambda i: _key(ring[i]))
+        ring = np.concatenate([ring[start:], ring[:start], ring[start:start + 1]])
+        far = int(np.argmax(np.hypot(*(ring - ring[0]).T)))
+        if far in (0, len(ring) - 1):
+            return ring
+        return np.concatenate([self._arc(ring[:far + 1])[:-1], self._arc(ring[far:])])
+
+    def ring(self, ring):
+        """Simplified closed ring for ``ring`` given without its closing point."""
+        cuts = [i for i, point in enumerate(ring) if _key(point) in self.junctions]
+        if not cuts:
+            return self._closed_arc(ring)
+        ring = np.concatenate([ring[cuts[0]:], ring[:cuts[0] + 1]])
+        cuts = [c - cuts[0] for c in cuts] + [len(ring) - 1]
+        parts = [self._arc(ring[a:b + 1])[:-1] for a, b in zip(cuts, cuts[1:])]
+        return np.concatenate(parts + [ring[:1]])
+
+
+def decimals_for(tolerance):
+    """Decimal places that keep rounding error well below ``tolerance``."""
+    return max(0, math.ceil(-math.log10(tolerance / 10)))
+
+
+def _quantize(ring, decimals):
+    ring = np.round(ring, decimals)
+    changed = np.any(ring[1:] != ring[:-1], axis=1)
+    return ring[np.concatenate([[True], changed])]
+
+
+def simplify_geojson(geojson, tolerance):
+    """Copy of a FeatureCollection simplified at ``tolerance`` degrees.
+
+    Holes and extra polygons that collapse are dropped.  A feature always
+    keeps its largest polygon, unsimplified if necessary.
+    """
+    features = geojson['features']
+    parsed = []
+    for feature in features:
+        polygons = []
+        for polygon in _polygons(feature.get('geometry') or {'type': None}):
+            rings = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon]
+            # Work on open rings; the closing point is added back on output
+            polygons.append([ring[:-1] if len(ring) > 1 and (ring[0] == ring[-1]).all() else ring
+                             for ring in rings])
+        parsed.append(polygons)
+
+    simplifier = _ArcSimplifier([ring for polygons in parsed for polygon in polygons for ring in polygon
+                                 if len(ring) >= 3], tolerance)
+    decimals = decimals_for(tolerance)
+
+    out = dict(geojson, features=[])
+    for feature, polygons in zip(features, parsed):
+        if not polygons:
+            out['features'].append(feature)
+            continue
+        largest = max(range(len(polygons)), key=lambda i: _ring_area(polygons[i][0]) if len(polygons[i][0]) >= 3 else 0)
+        kept = []
+        for i, polygon in enumerate(polygons):
+            rings = []
+            for j, ring in enumerate(polygon):
+                simple = _quantize(simplifier.ring(ring), decimals) if len(ring) >= 3 else ring
+                if len(simple) < 4:
+                    if j == 0 and i == largest:
+                        simple = _quantize(np.concatenate([ring, ring[:1]]), decimals)
+                    elif j == 0:
+                        break
+                    else:
+                        continue
+                rings.append(simple.tolist())
+            else:
+                kept.append(rings)
+        geometry = ({'type': 'Polygon', 'coordinates': kept[0]}
+                    if feature['geometry']['type'] == 'Polygon'
+                    else {'type': 'MultiPolygon', 'coordinates': kept})
+        out['features'].append(dict(feature, geometry=geometry))
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Levels of detail
+# ---------------------------------------------------------------------------
+
+def degrees_per_pixel(zoom):
+    return 360 / (TILE_SIZE * 2 ** zoom)
+
+
+def tolerance_for_zoom(zoom):
+    """Coarsest configured tolerance that stays under ``PIXEL_TOLERANCE`` at ``zoom``."""
+    limit = degrees_per_pixel(zoom) * PIXEL_TOLERANCE
+    return next((t for t in TOLERANCES if t <= limit), TOLERANCES[-1])
+
+
+@lru_cache(maxsize=None)
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def _level_path(path, tolerance):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(GEOMETRY_DIR, f'{stem}-{_digest(path)}-{tolerance:g}.json')
+
+
+@lru_cache(maxsize=64)
+def level(path, tolerance):
+    """The geojson at ``path`` simplified at ``tolerance``, written on first use."""
+    out = _level_path(path, tolerance)
+    try:
+        with open(out, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    with open(path, 'r') as f:
+        simplified = simplify_geojson(json.load(f), tolerance)
+    with _lock:
+        try:
+            os.makedirs(GEOMETRY_DIR, exist_ok=True)
+            tmp = f'{out}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(simplified, f, separators=(',', ':'))
+            os.replace(tmp, out)
+        except OSError as e:
+            logger.warning(f"Could not store simplified geometry {out}: {e}")
+    return simplified
+
+
+def for_zoom(path, zoom, properties=None):
+    """Level of ``path`` suited to a map opened at ``zoom``.
+
+    Features are fresh dicts that callers may modify.  ``properties`` limits
+    each feature's properties to those names.
+    """
+    geojson = level(path, tolerance_for_zoom(zoom))
+    features = []
+    for feature in geojson['features']:
+        feature = dict(feature)
+        props = feature.get('properties') or {}
+        feature['properties'] = ({k: props[k] for k in properties if k in props}
+                                 if properties is not None else copy.copy(props))
+        features.append(feature)
+    return dict(geojson, features=features)
+
+
+def _vertices(geojson):
+    return sum(len(ring) for feature in geojson['features']
+               for polygon in _polygons(feature.get('geometry') or {'type': None}) for ring in polygon)
+
+
+def build_all(paths):
+    """Write every level of every file in ``paths``; returns the written paths."""
+    written = []
+    for path in paths:
+        for tolerance in TOLERANCES:
+            level(path, tolerance)
+            written.append(_level_path(path, tolerance))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pre-generate simplified levels of the state boundary files.')
+    parser.add_argument('command', choices=['build'])
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from components.temperature.layout import STATE_MAPS
+    paths = sorted({spec[1] for spec in STATE_MAPS.values() if os.path.exists(spec[1])})
+    build_all(paths)
+    print(f"{'file':40s} {'tolerance':>9s} {'vertices':>9s} {'bytes':>10s}")
+    for path in paths:
+        with open(path, 'r') as f:
+            original = json.load(f)
+        print(f"{path:40s} {'original':>9s} {_vertices(original):>9,d} {os.path.getsize(path):>10,d}")
+        for tolerance in TOLERANCES:
+            out = _level_path(path, tolerance)
+            print(f"{'':40s} {tolerance:>9g} {_vertices(level(path, tolerance)):>9,d} {os.path.getsize(out):>10,d}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
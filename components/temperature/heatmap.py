@@ -0,0 +1,259 @@
+"""Pre-aggregated cubes behind the city temperature heatmap.
+
+The major-city file has one row per city and month since the 1700s.
+Animating over every ``dt`` embeds thousands of frames in a single figure.
+:func:`heat_cube` averages the file down to a temporal resolution
+(``month``, ``year`` or ``decade``).  With ``cell_deg`` it also bins cities
+onto a grid of cells that many degrees wide.  :func:`build_heatmap` then
+animates over the cube's periods rather than the raw dates.  Cubes live in
+the prepared store, so each variant is computed once per dataset version.
+
+``HEATMAP_RESOLUTION`` (default ``year``) and ``HEATMAP_CELL_DEG`` (default
+``0``, one point per city) select the variant registered as
+``temperature.fig_heat``.  ``python -m components.temperature.heatmap``
+prints the frame count and payload of every variant.
+
+The map never receives every point of the cube.  :func:`points` keeps a
+:class:`~.spatial.GridIndex` over the cube's cities.  :func:`build_heatmap`
+draws only the cities inside a viewport, thinned to one per
+``HEATMAP_THIN_PX`` pixels at its zoom.  The page opens on the whole world
+at zoom 1.  A callback on the map's ``relayoutData`` redraws it for the new
+viewport as the user pans and zooms.
+"""
+import argparse
+import logging
+import math
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from components.dtypes import lean
+from components.store import prepared
+
+from . import spatial
+from .data import MAJOR_CITY_TEMPERATURES, load_major_city_temps
+from .geometry import TILE_SIZE
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = ('month', 'year', 'decade')
+RESOLUTION = os.environ.get('HEATMAP_RESOLUTION', 'year')
+CELL_DEG = float(os.environ.get('HEATMAP_CELL_DEG', 0))
+
+_TITLES = {'month': 'monthly', 'year': 'yearly', 'decade': 'decade'}
+
+THIN_PX = float(os.environ.get('HEATMAP_THIN_PX', 24))
+MAX_POINTS = int(os.environ.get('HEATMAP_MAX_POINTS', 2000))
+INITIAL_ZOOM = 1
+CENTER = {'lat': 20, 'lon': 0}
+# Size assumed for a viewport given only by its centre and zoom
+VIEW_PX = (1200, 600)
+WORLD = (-180, -90, 180, 90, INITIAL_ZOOM)
+
+
+# ---------------------------------------------------------------------------
+# Cubes
+# ---------------------------------------------------------------------------
+
+def _period(df, resolution):
+    """Integer key of each row's period, increasing with time."""
+    year = df['Year'].astype(int)
+    if resolution == 'decade':
+        return year // 10 * 10
+    if resolution == 'year':
+        return year
+    return year * 100 + df['Month'].astype(int)
+
+
+def period_labels(periods, resolution):
+    """Frame labels for the integer keys returned by :func:`_period`."""
+    periods = pd.Series(periods)
+    if resolution == 'decade':
+        return periods.astype(str) + 's'
+    if resolution == 'year':
+        return periods.astype(str)
+    return (periods // 100).astype(str) + '-' + (periods % 100).astype(str).str.zfill(2)
+
+
+def _cell_labels(df):
+    """Hover label per grid cell: its city, or a count and the first names."""
+    names = df.groupby(['Latitude', 'Longitude'], observed=True)['City'].agg(lambda s: sorted(set(map(str, s))))
+
+    def label(cities):
+        if len(cities) == 1:
+            return cities[0]
+        shown = ', '.join(cities[:3])
+        return f"{len(cities)} cities: {shown}{', ...' if len(cities) > 3 else ''}"
+    return names.map(label).rename('City')
+
+
+@prepared('temperature_heat_cube', sources=[MAJOR_CITY_TEMPERATURES], version=1)
+@lean('temperature_heat_cube')
+def heat_cube(resolution, cell_deg=0):
+    """Mean temperature per period and city (or grid cell of ``cell_deg`` degrees).
+
+    Columns: ``Period``, ``City``, ``Latitude``, ``Longitude``,
+    ``AverageTemperature`` and ``Samples`` (monthly readings averaged).
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown heatmap resolution {resolution!r}, expected one of {RESOLUTIONS}")
+    df = load_major_city_temps().dropna(subset=['AverageTemperature', 'Latitude_Float', 'Longitude_Float'])
+    df = pd.DataFrame({
+        'Period': _period(df, resolution).to_numpy(),
+        'City': df['City'].astype(str).to_numpy(),
+        'Latitude': df['Latitude_Float'].to_numpy(np.float64),
+        'Longitude': df['Longitude_Float'].to_numpy(np.float64),
+        'AverageTemperature': df['AverageTemperature'].to_numpy(np.float64),
+    })
+
+    if cell_deg:
+        # Snap every city to the centre of its cell
+        df['Latitude'] = (np.floor(df['Latitude'] / cell_deg) + 0.5) * cell_deg
+        df['Longitude'] = (np.floor(df['Longitude'] / cell_deg) + 0.5) * cell_deg
+        keys = ['Period', 'Latitude', 'Longitude']
+    else:
+        keys = ['Period', 'City', 'Latitude', 'Longitude']
+
+    cube = df.groupby(keys, observed=True).agg(
+        AverageTemperature=('AverageTemperature', 'mean'),
+        Samples=('AverageTemperature', 'size'),
+    ).reset_index()
+    if cell_deg:
+        cube = cube.join(_cell_labels(df), on=['Latitude', 'Longitude'])
+    logger.info(f"Heatmap cube {resolution}/{cell_deg or 'city'}: {len(df):,} readings -> {len(cube):,} points")
+    return cube[['Period', 'City', 'Latitude', 'Longitude', 'AverageTemperature', 'Samples']]
+
+
+# ---------------------------------------------------------------------------
+# Viewports
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def points(resolution=RESOLUTION, cell_deg=CELL_DEG):
+    """``(cube, points, index)`` of a cube variant.
+
+    ``cube`` is sorted by period with a ``Point`` code per row; ``points``
+    has one row per code (``City``, ``Latitude``, ``Longitude`` and total
+    ``Samples``) and ``index`` is a grid index over them.
+    """
+    cube = heat_cube(resolution, cell_deg).sort_values(['Period', 'Latitude', 'Longitude'], ignore_index=True)
+    keys = ['Latitude', 'Longitude'] if cell_deg else ['City', 'Latitude', 'Longitude']
+    cube['Point'] = cube.groupby(keys, observed=True, sort=True).ngroup().to_numpy(np.int32)
+    pts = cube.groupby('Point').agg(City=('City', 'first'), Latitude=('Latitude', 'first'),
+                                    Longitude=('Longitude', 'first'), Samples=('Samples', 'sum'))
+    return cube, pts, spatial.GridIndex(pts['Latitude'].to_numpy(), pts['Longitude'].to_numpy())
+
+
+def viewport(relayout):
+    """``(west, south, east, north, zoom)`` of a map's ``relayoutData``.
+
+    ``None`` when the event did not move the map (e.g. an animation step).
+    Longitudes may run past 180 when the view crosses the antimeridian.
+    """
+    relayout = relayout or {}
+    derived = relayout.get('map._derived') or {}
+    center = relayout.get('map.center')
+    zoom = relayout.get('map.zoom')
+    corners = derived.get('coordinates')
+    if corners:
+        lons, lats = zip(*corners)
+        west, east, south, north = min(lons), max(lons), min(lats), max(lats)
+        if zoom is None:
+            zoom = math.log2(360 * VIEW_PX[0] / (TILE_SIZE * max(east - west, 1e-6)))
+        return west, south, east, north, zoom
+    if center is None or zoom is None:
+        return None
+    half_lon = VIEW_PX[0] / 2 * 360 / (TILE_SIZE * 2 ** zoom)
+    half_lat = VIEW_PX[1] / 2 * 360 / (TILE_SIZE * 2 ** zoom)
+    return (center['lon'] - half_lon, center['lat'] - half_lat,
+            center['lon'] + half_lon, center['lat'] + half_lat, zoom)
+
+
+def visible_points(view=WORLD, resolution=RESOLUTION, cell_deg=CELL_DEG):
+    """Sorted point codes drawn for ``view``: inside it, thinned to its zoom."""
+    _, pts, index = points(resolution, cell_deg)
+    west, south, east, north, zoom = view
+    samples = pts['Samples'].to_numpy()
+    ids = spatial.thin(index, index.query(west, south, east, north), zoom, THIN_PX, priority=samples)
+    if len(ids) > MAX_POINTS:
+        ids = np.sort(ids[np.argsort(-samples[ids], kind='stable')[:MAX_POINTS]])
+    return ids.tolist()
+
+
+# ---------------------------------------------------------------------------
+# Figure
+# ---------------------------------------------------------------------------
+
+def heatmap_for(ids, resolution=RESOLUTION, cell_deg=CELL_DEG):
+    """Animated density map of the points ``ids``, one frame per period of the cube."""
+    cube, pts, _ = points(resolution, cell_deg)
+    # Colours stay comparable between viewports
+    range_color = (cube['AverageTemperature'].min(), cube['AverageTemperature'].max())
+    cube = cube[np.isin(cube['Point'].to_numpy(), np.asarray(ids, dtype=np.int32))].copy()
+    cube['Frame'] = period_labels(cube['Period'], resolution).to_numpy()
+    title = f'Average Temperature Heatmap by Cities ({_TITLES[resolution]} means'
+    title += f', {cell_deg:g}° cells' if cell_deg else ''
+    title += f', {len(ids):,} of {len(pts):,} shown)' if len(ids) < len(pts) else ')'
+
+    fig_heat = px.density_map(
+        cube, lat='Latitude', lon='Longitude', z='AverageTemperature',
+        hover_data={'City': True, 'Samples': True, 'Frame': False},
+        # Cells stand for several cities, so spread them over a wider radius
+        radius=8 if not cell_deg else max(8, int(cell_deg * 4)),
+        zoom=INITIAL_ZOOM, center=CENTER, map_style="carto-positron", animation_frame='Frame', opacity=0.5,
+        range_color=range_color,
+        title=title,
+    )
+
+    # Update the heatmap dimensions and styling
+    fig_heat.update_layout(
+        height=600,
+        margin=dict(l=20, r=20, t=40, b=20),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        title_x=0.5,
+        title_y=0.95,
+        title_font_size=20,
+        # Keep the user's pan and zoom when the callback swaps in a new viewport
+        uirevision='city-heatmap',
+    )
+    return fig_heat
+
+
+def build_heatmap(resolution=RESOLUTION, cell_deg=CELL_DEG, view=WORLD):
+    """Heatmap of the points visible in ``view`` (default: the world at the initial zoom)."""
+    return heatmap_for(visible_points(view, resolution, cell_deg), resolution, cell_deg)
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Frame count and payload of every heatmap variant.')
+    parser.add_argument('--cells', type=float, nargs='*', default=[0, 2, 5],
+                        help='grid cell sizes in degrees (0 = one point per city)')
+    parser.add_argument('--zoom', type=float, nargs='*', default=[INITIAL_ZOOM],
+                        help='zooms of the viewport around the initial centre')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    print(f"{'resolution':10s} {'cells':>6s} {'zoom':>5s} {'cities':>11s} {'frames':>7s} {'points':>9s} {'bytes':>13s}")
+    for resolution in RESOLUTIONS:
+        for cell_deg in args.cells:
+            for zoom in args.zoom:
+                ids = visible_points(viewport({'map.center': CENTER, 'map.zoom': zoom}), resolution, cell_deg)
+                fig = heatmap_for(ids, resolution, cell_deg)
+                drawn = sum(len(frame.data[0].lat) for frame in fig.frames) if fig.frames else len(fig.data[0].lat)
+                cities = f"{len(ids):,}/{len(points(resolution, cell_deg)[1]):,}"
+                print(f"{resolution:10s} {cell_deg or 'city':>6} {zoom:>5g} {cities:>11s} {len(fig.frames):>7,d} "
+                      f"{drawn:>9,d} {len(fig.to_json()):>13,d}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
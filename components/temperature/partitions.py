@@ -0,0 +1,322 @@
+"""Country-partitioned copies of the city temperature files.
+
+The city files hold one row per city and month since the 1700s, hundreds of
+MB for ``GlobalLandTemperaturesByCity.csv``.  Drilling into one city's
+monthly series used to mean reading all of it.  :func:`build` streams a file
+once and writes one Parquet file per country
+(``Country=<name>/part-0.parquet``, hive style).  Rows are sorted by
+``Year`` and split into row groups of ``PARTITION_ROW_GROUP_ROWS``, so the
+min/max year statistics of each row group are narrow.
+
+:func:`query` opens only the files of the requested country (or of the
+countries having the requested city) and reads only the row groups whose
+years overlap the requested range.  A worker never holds more than those row
+groups.  Building holds one country at a time; the largest country bounds
+its memory.
+
+Partitions are kept under ``PARTITION_DIR`` (default
+``dataset/.prepared/partitions``), keyed by the source fingerprint like the
+prepared store, and built on first query.  Build ahead of time with
+``python -m components.temperature.partitions build``.  Without ``pyarrow``,
+or with ``PREPARED_DATA=0``, queries scan the CSV in chunks instead.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from components import store
+
+from .data import CITY_TEMPERATURES, MAJOR_CITY_TEMPERATURES
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pc = pq = None
+
+logger = logging.getLogger(__name__)
+
+DATASETS = {
+    'city': CITY_TEMPERATURES,
+    'major_city': MAJOR_CITY_TEMPERATURES,
+}
+PARTITION_DIR = os.environ.get('PARTITION_DIR', os.path.join(store.STORE_DIR, 'partitions'))
+ROW_GROUP_ROWS = int(os.environ.get('PARTITION_ROW_GROUP_ROWS', 32_768))
+CHUNK_ROWS = int(os.environ.get('PARTITION_CHUNK_ROWS', 500_000))
+# Bumped whenever the layout of the partition files changes
+VERSION = 1
+
+# Leading underscore: pyarrow.dataset skips it when reading the directory as a hive dataset
+_MANIFEST = '_manifest.json'
+_lock = threading.Lock()
+
+
+def _enabled():
+    return pa is not None and store.ENABLED
+
+
+def _country_dir(country):
+    return f'Country={quote(country, safe="")}'
+
+
+def _chunks(path):
+    """The CSV in chunks, with ``Year``/``Month`` parsed once from ``dt``."""
+    for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS, dtype={'City': str, 'Country': str}):
+        chunk = chunk.dropna(subset=['Country'])
+        dt = chunk['dt'].astype(str)
+        chunk['Year'] = dt.str.slice(0, 4).astype(np.int16)
+        chunk['Month'] = dt.str.slice(5, 7).astype(np.int8)
+        chunk['dt'] = pd.to_datetime(dt, format='%Y-%m-%d')
+        for column in chunk.columns:
+            if chunk[column].dtype == np.float64:
+                chunk[column] = chunk[column].astype(np.float32)
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def build(dataset='city', directory=None):
+    """Write the country partitions of ``dataset`` and return their directory."""
+    source = DATASETS[dataset]
+    directory = directory or _partition_path(dataset)
+    staging = f'{directory}.{os.getpid()}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    start = time.perf_counter()
+
+    # Pass 1: append every chunk's rows to an Arrow stream per country
+    schema = None
+    writers = {}
+    try:
+        for chunk in _chunks(source):
+            for country, rows in chunk.groupby('Country', sort=False):
+                table = pa.Table.from_pandas(rows.drop(columns='Country'), preserve_index=False)
+                if schema is None:
+                    schema = table.schema.remove_metadata()
+                table = table.cast(schema)
+                if country not in writers:
+                    sink = pa.OSFile(os.path.join(staging, f'{_country_dir(country)}.arrows'), 'wb')
+                    writers[country] = (sink, pa.ipc.new_stream(sink, schema))
+                writers[country][1].write_table(table)
+    finally:
+        for sink, writer in writers.values():
+            writer.close()
+            sink.close()
+
+    # Pass 2: sort each country by year and write it with narrow row groups
+    countries = {}
+    for country in sorted(writers):
+        spill = os.path.join(staging, f'{_country_dir(country)}.arrows')
+        with pa.OSFile(spill, 'rb') as f:
+            table = pa.ipc.open_stream(f).read_all()
+        os.remove(spill)
+        table = table.sort_by([('Year', 'ascending'), ('City', 'ascending'), ('dt', 'ascending')])
+        table = table.set_column(table.schema.get_field_index('City'), 'City',
+                                 table.column('City').dictionary_encode())
+        out = os.path.join(staging, _country_dir(country))
+        os.makedirs(out)
+        pq.write_table(table, os.path.join(out, 'part-0.parquet'), row_group_size=ROW_GROUP_ROWS)
+        years = table.column('Year')
+        countries[country] = {
+            'rows': table.num_rows,
+            'first_year': int(pc.min(years).as_py()),
+            'last_year': int(pc.max(years).as_py()),
+            'cities': sorted(c for c in table.column('City').unique().dictionary.to_pylist() if c is not None),
+        }
+        del table
+
+    with open(os.path.join(staging, _MANIFEST), 'w') as f:
+        json.dump({'source': source, 'version': VERSION, 'columns': ['Country'] + schema.names,
+                   'countries': countries}, f)
+    try:
+        os.replace(staging, directory)
+    except OSError:
+        # Another process finished the same partitions first
+        shutil.rmtree(staging, ignore_errors=True)
+    _remove_stale(directory)
+    logger.info(f"Partitioned {source} into {len(countries)} countries "
+                f"({sum(c['rows'] for c in countries.values()):,} rows) in {time.perf_counter() - start:.1f}s")
+    return directory
+
+
+def _partition_path(dataset):
+    key = store.fingerprint(f'partitions_{dataset}', [DATASETS[dataset]], VERSION)
+    return os.path.join(PARTITION_DIR, f'{dataset}-{key}')
+
+
+def _remove_stale(directory):
+    """Drop partitions of the same dataset built from an older source."""
+    prefix = os.path.basename(directory).rsplit('-', 1)[0] + '-'
+    try:
+        entries = os.listdir(PARTITION_DIR)
+    except OSError:
+        return
+    for entry in entries:
+        path = os.path.join(PARTITION_DIR, entry)
+        if entry.startswith(prefix) and path != directory and '.' not in entry:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@lru_cache(maxsize=None)
+def partitions(dataset='city'):
+    """``(directory, manifest)`` of the partitions of ``dataset``, built on first use."""
+    directory = _partition_path(dataset)
+    if not os.path.exists(os.path.join(directory, _MANIFEST)):
+        with _lock:
+            if not os.path.exists(os.path.join(directory, _MANIFEST)):
+                os.makedirs(PARTITION_DIR, exist_ok=True)
+                build(dataset, directory)
+    with open(os.path.join(directory, _MANIFEST), 'r') as f:
+        return directory, json.load(f)
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=1024)
+def _row_group_years(path):
+    """``(first, last)`` year arrays of every row group of a partition file."""
+    metadata = pq.read_metadata(path)
+    column = metadata.schema.to_arrow_schema().get_field_index('Year')
+    first = np.empty(metadata.num_row_groups, dtype=np.int64)
+    last = np.empty(metadata.num_row_groups, dtype=np.int64)
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(column).statistics
+        first[i], last[i] = stats.min, stats.max
+    return first, last
+
+
+@lru_cache(maxsize=None)
+def _city_countries(dataset):
+    index = {}
+    for country, entry in partitions(dataset)[1]['countries'].items():
+        for city in entry['cities']:
+            index.setdefault(city, []).append(country)
+    return index
+
+
+def countries_of(city, dataset='city'):
+    """Countries having a city named ``city`` in ``dataset``."""
+    return list(_city_countries(dataset).get(city, []))
+
+
+def _query_partitions(dataset, countries, city, first, last, columns):
+    directory, manifest = partitions(dataset)
+    frames = []
+    read = total = 0
+    for country in countries:
+        if country not in manifest['countries']:
+            continue
+        path = os.path.join(directory, _country_dir(country), 'part-0.parquet')
+        group_first, group_last = _row_group_years(path)
+        groups = np.flatnonzero((group_last >= first) & (group_first <= last)).tolist()
+        read += len(groups)
+        total += len(group_first)
+        if not groups:
+            continue
+        table = pq.ParquetFile(path, read_dictionary=['City']).read_row_groups(groups, columns=columns)
+        df = table.to_pandas()
+        mask = (df['Year'] >= first) & (df['Year'] <= last)
+        if city is not None:
+            mask &= df['City'] == city
+        df = df[mask]
+        df.insert(0, 'Country', country)
+        frames.append(df)
+    logger.debug(f"Partition query {dataset} {countries} {city}: {read} of {total} row groups")
+    return frames
+
+
+def _query_csv(dataset, countries, city, first, last, columns):
+    frames = []
+    for chunk in _chunks(DATASETS[dataset]):
+        mask = (chunk['Year'] >= first) & (chunk['Year'] <= last)
+        if countries is not None:
+            mask &= chunk['Country'].isin(countries)
+        if city is not None:
+            mask &= chunk['City'] == city
+        if mask.any():
+            # Country first, as in the partitions
+            keep = columns if columns is not None else [c for c in chunk.columns if c != 'Country']
+            frames.append(chunk.loc[mask, ['Country'] + keep])
+    return frames
+
+
+def query(dataset='city', country=None, city=None, years=None, columns=None):
+    """Monthly readings of ``dataset`` for a country and/or city within ``years``.
+
+    ``years`` is an inclusive ``(first, last)`` pair; either end may be
+    ``None``.  Without ``country`` every country having ``city`` is read.
+    ``columns`` limits the returned columns (``Year`` and ``City`` are
+    always included).  Rows are ordered by year, city and date.
+    """
+    if country is None and city is None:
+        raise ValueError("query needs a country or a city; the full table is never loaded")
+    first, last = years or (None, None)
+    first = -sys.maxsize if first is None else int(first)
+    last = sys.maxsize if last is None else int(last)
+    if columns is not None:
+        columns = list(dict.fromkeys(['dt', 'Year', 'City'] + [c for c in columns if c != 'Country']))
+
+    if _enabled():
+        countries = [country] if country is not None else countries_of(city, dataset)
+        frames = _query_partitions(dataset, countries, city, first, last, columns)
+    else:
+        frames = _query_csv(dataset, [country] if country is not None else None, city, first, last, columns)
+
+    if not frames:
+        if columns is None:
+            columns = (partitions(dataset)[1]['columns'][1:] if _enabled()
+                       else list(pd.read_csv(DATASETS[dataset], nrows=0).columns.drop('Country')) + ['Year', 'Month'])
+        return pd.DataFrame(columns=['Country'] + columns)
+    df = pd.concat(frames, ignore_index=True)
+    df['Country'] = df['Country'].astype('category')
+    return df.sort_values(['Year', 'City', 'dt'], kind='stable', ignore_index=True)
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and query the country partitions of the city temperatures.')
+    parser.add_argument('command', choices=['build', 'query'])
+    parser.add_argument('--dataset', choices=sorted(DATASETS), default='city')
+    parser.add_argument('--country')
+    parser.add_argument('--city')
+    parser.add_argument('--years', type=int, nargs=2, metavar=('FIRST', 'LAST'))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'build':
+        directory, manifest = partitions(args.dataset)
+        files = [os.path.join(directory, _country_dir(c), 'part-0.parquet') for c in manifest['countries']]
+        groups = sum(len(_row_group_years(path)[0]) for path in files)
+        size = sum(os.path.getsize(path) for path in files)
+        print(f"{directory}: {len(files)} countries, {groups:,} row groups, {size / 2**20:.1f} MB")
+        return 0
+
+    partitions(args.dataset)
+    start = time.perf_counter()
+    df = query(args.dataset, country=args.country, city=args.city, years=args.years)
+    elapsed = time.perf_counter() - start
+    print(df.head(12).to_string())
+    print(f"{len(df):,} rows in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
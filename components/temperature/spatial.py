@@ -0,0 +1,82 @@
+"""Grid index over point coordinates for viewport queries.
+
+:class:`GridIndex` buckets points into cells of ``SPATIAL_CELL_DEG``
+degrees.  Point ids are sorted by cell, so a bounding box query only visits
+the cells it overlaps and checks the points in them exactly.  :func:`thin`
+then keeps at most one point per screen area of ``pixels`` pixels at a map
+zoom.  Zoomed out, nearby cities collapse into one point, and zooming in
+brings the detail back.
+"""
+import os
+
+import numpy as np
+
+from .geometry import degrees_per_pixel
+
+CELL_DEG = float(os.environ.get('SPATIAL_CELL_DEG', 5))
+
+
+class GridIndex:
+    """Points bucketed into a regular latitude/longitude grid."""
+
+    def __init__(self, lat, lon, cell_deg=CELL_DEG):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.rows = int(np.ceil(180 / cell_deg))
+        self.cols = int(np.ceil(360 / cell_deg))
+        cells = self._row(self.lat) * self.cols + self._col(self.lon)
+        self._order = np.argsort(cells, kind='stable')
+        # Points of cell c are _order[_starts[c]:_starts[c + 1]]
+        self._starts = np.searchsorted(cells[self._order], np.arange(self.rows * self.cols + 1))
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _row(self, lat):
+        return np.clip(((np.asarray(lat) + 90) // self.cell_deg).astype(np.int64), 0, self.rows - 1)
+
+    def _col(self, lon):
+        return np.clip(((np.asarray(lon) + 180) // self.cell_deg).astype(np.int64), 0, self.cols - 1)
+
+    def _box(self, west, south, east, north):
+        rows = np.arange(self._row(south), self._row(north) + 1)
+        cols = np.arange(self._col(west), self._col(east) + 1)
+        cells = (rows[:, None] * self.cols + cols[None, :]).ravel()
+        ids = np.concatenate([self._order[self._starts[c]:self._starts[c + 1]] for c in cells])
+        inside = ((self.lat[ids] >= south) & (self.lat[ids] <= north)
+                  & (self.lon[ids] >= west) & (self.lon[ids] <= east))
+        return ids[inside]
+
+    def query(self, west, south, east, north):
+        """Sorted ids of the points inside the box; ``west > east`` crosses the antimeridian."""
+        south, north = max(south, -90), min(north, 90)
+        if north < south:
+            return np.empty(0, dtype=np.int64)
+        if east - west >= 360:
+            west, east = -180, 180
+        else:
+            west = (west + 180) % 360 - 180
+            east = (east + 180) % 360 - 180
+        if west <= east:
+            ids = self._box(west, south, east, north)
+        else:
+            ids = np.concatenate([self._box(west, south, 180, north), self._box(-180, south, east, north)])
+        return np.sort(ids)
+
+
+def thin(index, ids, zoom, pixels, priority=None):
+    """Subset of ``ids`` keeping one point per ``pixels`` square at map ``zoom``.
+
+    Within a square the point with the highest ``priority`` (indexed by
+    point id) wins, the first one without it.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return ids
+    if priority is not None:
+        ids = ids[np.argsort(-np.asarray(priority)[ids], kind='stable')]
+    size = degrees_per_pixel(zoom) * pixels
+    keys = np.column_stack([np.floor(index.lat[ids] / size), np.floor(index.lon[ids] / size)])
+    _, first = np.unique(keys, axis=0, return_index=True)
+    return np.sort(ids[first])
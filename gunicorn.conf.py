@@ -0,0 +1,39 @@
+"""gunicorn settings for serving the dashboard.
+
+    gunicorn -c gunicorn.conf.py app:server
+
+The app and all of its data are loaded once in the master and shared with
+the forked workers (see ``components/shared.py``).  ``SHARED_DATA=0`` makes
+every worker load its own copy instead.
+
+Workers write their callback metrics to ``METRICS_DIR`` so that ``/metrics``
+reports the whole server (see ``components/metrics.py``).  It is emptied on
+every start, in a fresh temporary directory unless set.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+# Pages are built in the master; a warm-up thread would not survive the fork
+os.environ.setdefault('PAGE_WARM_UP', '0')
+
+# Set before the app is imported and inherited by every worker
+if os.environ.get('METRICS_DIR'):
+    for _path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(_path)
+else:
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(
+        prefix='cs661-metrics-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+bind = os.environ.get('BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = os.environ.get('SHARED_DATA', '1') != '0'
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker forks
+    if preload_app:
+        import app
+        from components import shared
+        shared.preload(app.pages)
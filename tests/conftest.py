@@ -0,0 +1,12 @@
+import pytest
+
+from components import store
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """An empty, enabled prepared-data store in a temporary directory."""
+    directory = tmp_path / 'prepared'
+    monkeypatch.setattr(store, 'STORE_DIR', str(directory))
+    monkeypatch.setattr(store, 'ENABLED', True)
+    return directory
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.temperature import aggregates
+
+
+@pytest.fixture
+def city_csv(tmp_path):
+    """Readings of 120 cities in random order, the first ones all from 1900.
+
+    Later rows reach both earlier and later years and more cities than the
+    accumulator's initial capacity, so it has to grow in every direction.
+    Two countries have a city called ``Springfield``.
+    """
+    rng = np.random.default_rng(1)
+    cities = [(f'Country{i % 3}', f'City{i}') for i in range(118)]
+    cities += [('Country0', 'Springfield'), ('Country1', 'Springfield')]
+    n = 1500
+    picks = rng.integers(0, len(cities), n)
+    years = rng.integers(1750, 2014, n)
+    years[:40] = 1900
+    picks[:40] = rng.integers(0, 10, 40)
+    temperature = rng.normal(12, 8, n).round(3)
+    temperature[rng.random(n) < 0.1] = np.nan
+    uncertainty = rng.uniform(0.1, 3, n).round(3)
+    uncertainty[rng.random(n) < 0.1] = np.nan
+    df = pd.DataFrame({
+        'dt': [f'{y}-{m:02d}-01' for y, m in zip(years, rng.integers(1, 13, n))],
+        'AverageTemperature': temperature,
+        'AverageTemperatureUncertainty': uncertainty,
+        'City': [cities[i][1] for i in picks],
+        'Country': [cities[i][0] for i in picks],
+        'Latitude': '1.00N',
+    })
+    path = tmp_path / 'cities.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def expected_stats(path):
+    df = pd.read_csv(path)
+    df['Year'] = df['dt'].str.slice(0, 4).astype(int)
+    return df.groupby(['Country', 'City', 'Year']).agg(
+        rows=('dt', 'size'),
+        mean=('AverageTemperature', 'mean'),
+        min=('AverageTemperature', 'min'),
+        max=('AverageTemperature', 'max'),
+        count=('AverageTemperature', 'count'),
+        uncertainty=('AverageTemperatureUncertainty', 'mean'),
+    ).reset_index()
+
+
+def assert_matches(stats, expected):
+    stats = stats.astype({'Country': str, 'City': str})
+    pd.testing.assert_frame_equal(stats, expected, check_dtype=False, rtol=1e-5)
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 100, 10_000])
+def test_accumulator_matches_groupby(city_csv, chunk_rows):
+    accumulator = aggregates.CityYearAccumulator()
+    for chunk in pd.read_csv(city_csv, usecols=aggregates._CITY_COLUMNS, chunksize=chunk_rows):
+        accumulator.add(chunk)
+    assert_matches(accumulator.result(), expected_stats(city_csv))
+
+
+def test_grow_keeps_earlier_cells():
+    accumulator = aggregates.CityYearAccumulator()
+
+    def chunk(city, year, temperature):
+        return pd.DataFrame({'dt': [f'{year}-01-01'], 'AverageTemperature': [temperature],
+                             'AverageTemperatureUncertainty': [1.0], 'City': [city], 'Country': ['X']})
+
+    accumulator.add(chunk('A', 1900, 1.0))
+    accumulator.add(chunk('B', 1850, 2.0))
+    accumulator.add(chunk('C', 1950, 3.0))
+    for i in range(100):
+        accumulator.add(chunk(f'D{i}', 1900, 4.0))
+
+    assert accumulator.first_year == 1850
+    assert accumulator.arrays['rows'].shape[0] >= 103
+    assert accumulator.arrays['rows'].shape[1] == 101
+    stats = accumulator.result().set_index(['City', 'Year'])
+    assert stats.loc[('A', 1900), 'mean'] == 1.0
+    assert stats.loc[('B', 1850), 'mean'] == 2.0
+    assert stats.loc[('C', 1950), 'mean'] == 3.0
+    assert len(stats) == 103
+
+
+def test_stream_matches_groupby_within_budget(city_csv):
+    stats = aggregates.stream_city_year_stats(city_csv, memory_mb=1)
+    assert_matches(stats, expected_stats(city_csv))
+    report = aggregates.stream_reports()[-1]
+    assert report['rows'] == 1500 and report['path'] == city_csv
@@ -0,0 +1,151 @@
+import os
+import time
+
+import plotly.graph_objects as go
+import pytest
+
+from components import cache
+
+
+@pytest.fixture
+def tiers(tmp_path, monkeypatch):
+    """Fresh memory and disk tiers with fixed dataset and code versions."""
+    backends = [cache.MemoryBackend(1 << 20, 60), cache.DiskBackend(str(tmp_path / 'shared'), 1 << 20)]
+    monkeypatch.setattr(cache, 'BACKENDS', backends)
+    monkeypatch.setattr(cache, 'dataset_version', lambda: 'data-1')
+    monkeypatch.setattr(cache, 'code_version', lambda: 'code-1')
+    monkeypatch.setattr(cache, 'listeners', [])
+    return backends
+
+
+def counted(func):
+    def wrapper(*args, **kwargs):
+        wrapper.calls += 1
+        return func(*args, **kwargs)
+    wrapper.calls = 0
+    wrapper.__name__ = wrapper.__qualname__ = func.__name__
+    return wrapper
+
+
+def test_memory_tier_evicts_least_recently_used():
+    backend = cache.MemoryBackend(max_bytes=10, ttl=60)
+    expires = time.time() + 60
+    backend.set('a', b'aaaa', expires)
+    backend.set('b', b'bbbb', expires)
+    backend.get('a')
+    backend.set('c', b'cccc', expires)
+
+    assert backend.get('a') == b'aaaa'
+    assert backend.get('b') is None
+    assert backend.get('c') == b'cccc'
+
+
+def test_memory_tier_expires_and_skips_oversized_values():
+    backend = cache.MemoryBackend(max_bytes=10, ttl=60)
+    backend.set('old', b'x', time.time() - 1)
+    backend.set('big', b'x' * 11, time.time() + 60)
+    assert backend.get('old') is None
+    assert backend.get('big') is None
+
+
+def test_disk_tier_expires_entries(tmp_path):
+    backend = cache.DiskBackend(str(tmp_path), max_bytes=1 << 20)
+    backend.set('fresh', b'value', time.time() + 60)
+    backend.set('stale', b'value', time.time() - 1)
+
+    assert backend.get('fresh') == b'value'
+    assert backend.get('stale') is None
+    assert sorted(os.listdir(tmp_path)) == ['fresh']
+
+
+def test_disk_sweep_drops_least_recently_used(tmp_path):
+    # Each file is 40 bytes plus its expiry line; room for two
+    backend = cache.DiskBackend(str(tmp_path), max_bytes=150, sweep_every=1000)
+    for i, key in enumerate(['old', 'used', 'new']):
+        backend.set(key, b'x' * 40, time.time() + 60)
+        os.utime(tmp_path / key, (1000 + i, 1000 + i))
+    backend.get('used')
+    backend.sweep()
+
+    assert sorted(os.listdir(tmp_path)) == ['new', 'used']
+
+
+def test_memoize_serves_repeat_calls_from_the_cache(tiers):
+    @cache.memoize()
+    @counted
+    def square(x):
+        return {'value': x * x}
+
+    assert square(3) == {'value': 9}
+    assert square(3) == {'value': 9}
+    assert square(4) == {'value': 16}
+    assert square.__wrapped__.calls == 2
+
+
+def test_shared_tier_hit_is_promoted_to_memory(tiers, monkeypatch):
+    @cache.memoize()
+    @counted
+    def build(x):
+        return [x]
+
+    build(1)
+    # Another worker: empty memory tier, same shared directory
+    memory = cache.MemoryBackend(1 << 20, 60)
+    monkeypatch.setattr(cache, 'BACKENDS', [memory, tiers[1]])
+    hits = []
+    cache.listeners.append(lambda name, hit: hits.append(hit))
+
+    assert build(1) == [1]
+    assert build.__wrapped__.calls == 1
+    assert hits == [True]
+    assert len(memory._entries) == 1
+
+
+def test_new_data_or_code_misses(tiers, monkeypatch):
+    @cache.memoize()
+    @counted
+    def build(x):
+        return x
+
+    build(1)
+    monkeypatch.setattr(cache, 'dataset_version', lambda: 'data-2')
+    build(1)
+    monkeypatch.setattr(cache, 'code_version', lambda: 'code-2')
+    build(1)
+    assert build.__wrapped__.calls == 3
+
+
+def test_ttl_expires_results(tiers, monkeypatch):
+    @cache.memoize(ttl=10)
+    @counted
+    def build(x):
+        return x
+
+    now = time.time()
+    monkeypatch.setattr(cache.time, 'time', lambda: now)
+    build(1)
+    monkeypatch.setattr(cache.time, 'time', lambda: now + 11)
+    build(1)
+    assert build.__wrapped__.calls == 2
+
+
+def test_key_selects_the_identifying_arguments(tiers):
+    @cache.memoize(key=lambda trigger, gas: (gas,))
+    @counted
+    def build(trigger, gas):
+        return gas
+
+    build('page-load', 'CO2')
+    build('refresh', 'CO2')
+    build('refresh', 'CH4')
+    assert build.__wrapped__.calls == 2
+
+
+def test_figures_are_cached_as_dicts(tiers):
+    @cache.memoize()
+    def figure(x):
+        return go.Figure(go.Scatter(x=[x], y=[x])), go.Figure()
+
+    first, second = figure(2)
+    assert isinstance(first, dict) and isinstance(second, dict)
+    assert figure(2) == (first, second)
@@ -0,0 +1,97 @@
+import json
+
+import numpy as np
+import pytest
+
+from components.temperature import geometry
+
+
+def wiggly_border(points=400, seed=0):
+    """A noisy line from (1, 0) to (1, 1), listed bottom to top."""
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, points)
+    x = 1 + 0.05 * np.sin(y * 25) + rng.normal(0, 0.002, points)
+    x[0] = x[-1] = 1
+    return [[float(a), float(b)] for a, b in zip(x, y)]
+
+
+def two_states():
+    """Two squares meeting along a wiggly border, plus an island with no neighbours."""
+    border = wiggly_border()
+    west = [[0, 0]] + border + [[0, 1], [0, 0]]
+    east = border[::-1] + [[2, 0], [2, 1], [1, 1]]
+    theta = np.linspace(0, 2 * np.pi, 300, endpoint=False)
+    island = [[5 + 0.5 * np.cos(t), 5 + 0.5 * np.sin(t)] for t in theta]
+    island.append(island[0])
+
+    def feature(name, rings):
+        return {'type': 'Feature', 'properties': {'name': name, 'unused': 1},
+                'geometry': {'type': 'Polygon', 'coordinates': rings}}
+
+    return {'type': 'FeatureCollection',
+            'features': [feature('west', [west]), feature('east', [east]), feature('island', [island])]}
+
+
+def simplify(tolerance):
+    return geometry.simplify_geojson(two_states(), tolerance)
+
+
+def on_border(ring):
+    return {tuple(p) for p in ring if 0.8 < p[0] < 1.2}
+
+
+@pytest.mark.parametrize('tolerance', geometry.TOLERANCES)
+def test_shared_border_is_identical(tolerance):
+    simplified = simplify(tolerance)
+    west, east, _ = (f['geometry']['coordinates'][0] for f in simplified['features'])
+
+    assert on_border(west) == on_border(east)
+    assert (1.0, 0.0) in on_border(west) and (1.0, 1.0) in on_border(west)
+
+
+@pytest.mark.parametrize('tolerance', geometry.TOLERANCES)
+def test_rings_stay_closed_and_lose_vertices(tolerance):
+    original = two_states()
+    simplified = simplify(tolerance)
+    for before, after in zip(original['features'], simplified['features']):
+        ring = after['geometry']['coordinates'][0]
+        assert ring[0] == ring[-1]
+        assert 4 <= len(ring) < len(before['geometry']['coordinates'][0])
+
+
+def test_coarser_tolerances_keep_fewer_vertices():
+    counts = [geometry._vertices(simplify(t)) for t in sorted(geometry.TOLERANCES)]
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_coordinates_are_rounded_to_the_tolerance():
+    tolerance = 0.05
+    decimals = geometry.decimals_for(tolerance)
+    for feature in simplify(tolerance)['features']:
+        for x, y in feature['geometry']['coordinates'][0]:
+            assert round(x, decimals) == x and round(y, decimals) == y
+
+
+def test_zoom_picks_the_coarsest_level_within_a_pixel():
+    for zoom in range(0, 10):
+        tolerance = geometry.tolerance_for_zoom(zoom)
+        assert tolerance in geometry.TOLERANCES
+        if tolerance != geometry.TOLERANCES[-1]:
+            assert tolerance <= geometry.degrees_per_pixel(zoom) * geometry.PIXEL_TOLERANCE
+    tolerances = [geometry.tolerance_for_zoom(zoom) for zoom in range(0, 10)]
+    assert tolerances == sorted(tolerances, reverse=True)
+
+
+def test_for_zoom_writes_levels_and_filters_properties(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry, 'GEOMETRY_DIR', str(tmp_path / 'levels'))
+    path = tmp_path / 'states.json'
+    path.write_text(json.dumps(two_states()))
+
+    geojson = geometry.for_zoom(str(path), 3, properties=['name'])
+    assert [f['properties'] for f in geojson['features']] == [{'name': 'west'}, {'name': 'east'}, {'name': 'island'}]
+    assert len(list((tmp_path / 'levels').iterdir())) == 1
+
+    # Callers may modify the features without touching the cached level
+    geojson['features'][0]['properties']['name'] = 'changed'
+    again = geometry.for_zoom(str(path), 3)
+    assert again['features'][0]['properties'] == {'name': 'west', 'unused': 1}
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.greenhouse_gas.query import GHGTable
+
+
+@pytest.fixture(scope='module')
+def frame():
+    """A sparse GHG table: not every country reports every gas or year."""
+    rng = np.random.default_rng(3)
+    rows = [(country, year, gas, float(rng.uniform(0, 100)))
+            for gas in ['CH4', 'CO2', 'N2O']
+            for country in ['Brazil', 'Chile', 'India', 'Kenya', 'Peru']
+            for year in range(1990, 2021)
+            if rng.random() < 0.7 and not (gas == 'CH4' and country == 'Brazil')]
+    df = pd.DataFrame(rows, columns=['country', 'year', 'gas', 'value'])
+    return df.sample(frac=1, random_state=0, ignore_index=True)
+
+
+@pytest.fixture(scope='module')
+def table(frame):
+    return GHGTable(frame)
+
+
+def masked(frame, by, **equal):
+    mask = pd.Series(True, index=frame.index)
+    for column, value in equal.items():
+        mask &= frame[column].isin(value) if isinstance(value, list) else frame[column] == value
+    return frame[mask].sort_values(by, ignore_index=True)
+
+
+def assert_rows(result, expected):
+    result = result.astype({'country': str})
+    pd.testing.assert_frame_equal(result, expected[['country', 'year', 'value']], check_dtype=False)
+
+
+@pytest.mark.parametrize('gas', ['CH4', 'CO2', 'N2O', 'SF6'])
+def test_gas_rows(table, frame, gas):
+    assert_rows(table.gas_rows(gas), masked(frame, ['country', 'year'], gas=gas))
+
+
+@pytest.mark.parametrize('gas', ['CH4', 'CO2'])
+@pytest.mark.parametrize('country', ['Brazil', 'Kenya', 'Atlantis'])
+def test_series(table, frame, gas, country):
+    years, values = table.series(gas, country)
+    expected = masked(frame, 'year', gas=gas, country=country)
+    np.testing.assert_array_equal(years, expected['year'])
+    np.testing.assert_array_equal(values, expected['value'])
+
+
+def test_missing_series_is_empty(table):
+    years, values = table.series('CH4', 'Brazil')
+    assert len(years) == len(values) == 0
+
+
+@pytest.mark.parametrize('year', [1989, 1990, 2005, 2020, 2021])
+def test_cross_section(table, frame, year):
+    for gas in ['CH4', 'CO2', 'N2O']:
+        assert_rows(table.cross_section(gas, year), masked(frame, 'country', gas=gas, year=year))
+
+
+def test_countries_rows_keep_the_requested_order(table, frame):
+    countries = ['Peru', 'Brazil', 'Atlantis', 'Chile', 'Peru']
+    result = table.countries_rows('CH4', countries)
+    expected = masked(frame, ['year'], gas='CH4', country=countries)
+    order = {c: i for i, c in enumerate(dict.fromkeys(countries))}
+    expected = expected.sort_values(['country', 'year'], key=lambda s: s.map(order) if s.name == 'country' else s,
+                                    ignore_index=True)
+    assert_rows(result, expected)
+    assert table.countries_rows('CH4', ['Brazil']).empty
+
+
+def test_years(table, frame):
+    for gas in ['CH4', 'CO2', 'N2O']:
+        years = frame.loc[frame['gas'] == gas, 'year']
+        assert table.years(gas) == (years.min(), years.max())
+    assert table.years('SF6') is None
+
+
+def test_results_are_read_only_views(table):
+    years, values = table.series('CO2', 'Chile')
+    assert not values.flags.writeable
+    assert np.shares_memory(values, table.value)
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import store
+from components.temperature import partitions
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+@pytest.fixture
+def city_dataset(tmp_path, monkeypatch, store_dir):
+    """A small city file partitioned into row groups of 20 rows."""
+    rng = np.random.default_rng(2)
+    rows = []
+    for country, cities in [('France', ['Paris', 'Lyon', 'Springfield']), ('Chile', ['Santiago']),
+                            ('United States', ['Springfield', 'Boston'])]:
+        for city in cities:
+            for year in range(1900, 1920):
+                for month in (1, 7):
+                    rows.append((f'{year}-{month:02d}-01', round(rng.normal(10, 5), 3),
+                                 round(rng.uniform(0.1, 2), 3), city, country))
+    df = pd.DataFrame(rows, columns=['dt', 'AverageTemperature', 'AverageTemperatureUncertainty', 'City', 'Country'])
+    path = tmp_path / 'cities.csv'
+    df.sample(frac=1, random_state=0).to_csv(path, index=False)
+
+    monkeypatch.setattr(partitions, 'DATASETS', {'city': str(path)})
+    monkeypatch.setattr(partitions, 'PARTITION_DIR', str(tmp_path / 'partitions'))
+    monkeypatch.setattr(partitions, 'ROW_GROUP_ROWS', 20)
+    monkeypatch.setattr(partitions, 'CHUNK_ROWS', 100)
+    partitions.partitions.cache_clear()
+    partitions._city_countries.cache_clear()
+    yield str(path)
+    partitions.partitions.cache_clear()
+    partitions._city_countries.cache_clear()
+
+
+@pytest.fixture
+def row_groups_read(monkeypatch):
+    """Row group indices read from each partition file, by country directory."""
+    read = {}
+
+    class ParquetFile(pq.ParquetFile):
+        def read_row_groups(self, row_groups, **kwargs):
+            read[self._path] = list(row_groups)
+            return super().read_row_groups(row_groups, **kwargs)
+
+        def __init__(self, path, **kwargs):
+            super().__init__(path, **kwargs)
+            self._path = path
+
+    monkeypatch.setattr(partitions.pq, 'ParquetFile', ParquetFile)
+    return read
+
+
+def expected_rows(path, country=None, city=None, years=(None, None)):
+    df = pd.read_csv(path)
+    year = df['dt'].str.slice(0, 4).astype(int)
+    mask = pd.Series(True, index=df.index)
+    if country is not None:
+        mask &= df['Country'] == country
+    if city is not None:
+        mask &= df['City'] == city
+    if years[0] is not None:
+        mask &= year >= years[0]
+    if years[1] is not None:
+        mask &= year <= years[1]
+    return df[mask]
+
+
+def normalized(df):
+    df = df.astype({'Country': str, 'City': str})
+    return df.sort_values(['Country', 'City', 'dt'], ignore_index=True)
+
+
+def test_query_reads_only_overlapping_row_groups(city_dataset, row_groups_read):
+    df = partitions.query(country='France', years=(1905, 1906))
+
+    expected = expected_rows(city_dataset, country='France', years=(1905, 1906))
+    assert len(df) == len(expected) == 12
+    assert set(df['Year']) == {1905, 1906}
+    assert (df['Country'] == 'France').all()
+
+    (path, groups), = row_groups_read.items()
+    first, last = partitions._row_group_years(path)
+    assert len(first) == 6
+    assert groups == [i for i in range(len(first)) if last[i] >= 1905 and first[i] <= 1906]
+    assert len(groups) < len(first)
+
+
+def test_city_query_covers_every_country_with_the_city(city_dataset, row_groups_read):
+    df = partitions.query(city='Springfield')
+
+    assert sorted(partitions.countries_of('Springfield')) == ['France', 'United States']
+    assert sorted(df['Country'].unique()) == ['France', 'United States']
+    assert len(df) == len(expected_rows(city_dataset, city='Springfield'))
+    assert len(row_groups_read) == 2
+    assert list(df['Year']) == sorted(df['Year'])
+
+
+def test_partitions_match_the_csv_scan(city_dataset, monkeypatch):
+    cases = [dict(country='Chile'), dict(country='France', city='Lyon', years=(1910, None)),
+             dict(city='Boston', years=(None, 1902), columns=['AverageTemperature'])]
+    indexed = [partitions.query(**case) for case in cases]
+    monkeypatch.setattr(store, 'ENABLED', False)
+    for case, df in zip(cases, indexed):
+        scanned = partitions.query(**case)
+        assert list(df.columns) == list(scanned.columns)
+        pd.testing.assert_frame_equal(normalized(df), normalized(scanned), check_dtype=False)
+
+
+def test_empty_results_keep_the_columns(city_dataset):
+    df = partitions.query(country='France', years=(1800, 1850))
+    assert df.empty
+    assert 'AverageTemperature' in df.columns and 'Year' in df.columns
+
+
+def test_query_needs_a_country_or_a_city(city_dataset):
+    with pytest.raises(ValueError):
+        partitions.query()
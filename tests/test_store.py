@@ -0,0 +1,109 @@
+import os
+
+import pandas as pd
+import pytest
+
+from components import store
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'source.csv'
+    path.write_text('country,year,value\nA,2000,1.5\nA,2001,\nB,2000,3.0\n')
+    return str(path)
+
+
+def counting_loader(sources, version=1, name='test_loader'):
+    calls = []
+
+    @store.prepared(name, sources=sources, version=version)
+    def load(path=None):
+        calls.append(path)
+        return pd.read_csv(path or sources[0])
+
+    return load, calls
+
+
+def entries(directory):
+    return sorted(os.listdir(directory)) if directory.exists() else []
+
+
+def test_fingerprint_tracks_version_and_source(store_dir, source):
+    key = store.fingerprint('loader', [source], 1)
+    assert store.fingerprint('loader', [source], 1) == key
+    assert store.fingerprint('loader', [source], 2) != key
+    assert store.fingerprint('other', [source], 1) != key
+
+    with open(source, 'a') as f:
+        f.write('C,2000,4.0\n')
+    assert store.fingerprint('loader', [source], 1) != key
+
+
+def test_warm_call_reads_the_store(store_dir, source):
+    load, calls = counting_loader([source])
+    cold = load()
+    warm = load()
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(cold, warm)
+    pd.testing.assert_frame_equal(warm, pd.read_csv(source))
+    assert any(entry.endswith('.arrow') for entry in entries(store_dir))
+
+
+def test_source_change_invalidates_and_removes_old_entry(store_dir, source):
+    load, calls = counting_loader([source])
+    load()
+    before = [e for e in entries(store_dir) if e.startswith('test_loader-')]
+
+    with open(source, 'a') as f:
+        f.write('C,2000,4.0\n')
+    df = load()
+
+    assert len(calls) == 2
+    assert len(df) == 4
+    after = [e for e in entries(store_dir) if e.startswith('test_loader-')]
+    assert len(after) == len(before)
+    assert not set(before) & set(after)
+
+
+def test_version_bump_invalidates(store_dir, source):
+    load, calls = counting_loader([source], version=1)
+    load()
+    load_v2, calls_v2 = counting_loader([source], version=2)
+    load_v2()
+    assert len(calls) == 1 and len(calls_v2) == 1
+
+
+def test_callable_sources_receive_keyword_arguments(store_dir, source, tmp_path):
+    other = tmp_path / 'other.csv'
+    other.write_text('country,year,value\nZ,1999,9.0\n')
+    load, calls = counting_loader(lambda path: [path])
+
+    assert load(path=source)['country'].tolist() == ['A', 'A', 'B']
+    assert load(path=str(other))['country'].tolist() == ['Z']
+    load(path=source)
+    assert calls == [source, str(other)]
+
+
+def test_empty_results_are_not_stored(store_dir, source):
+    @store.prepared('empty_loader', sources=[source])
+    def load():
+        calls.append(1)
+        return pd.DataFrame()
+
+    calls = []
+    load()
+    load()
+    assert len(calls) == 2
+    assert not [e for e in entries(store_dir) if e.startswith('empty_loader-')]
+
+
+def test_disabled_store_always_runs_the_loader(store_dir, source, monkeypatch):
+    monkeypatch.setattr(store, 'ENABLED', False)
+    load, calls = counting_loader([source])
+    load()
+    load()
+    assert len(calls) == 2
+    assert entries(store_dir) == []